@@ -7,8 +7,9 @@ function mapRecetasFromMcp(mcpResult) {
   return list.map((r, i) => ({
     name: r.title || `Receta ${i + 1}`,
     description: r.snippet || '',
-    cost: null,
-    ingredients: [],
+    cost: r.cost != null ? r.cost : null,
+    calories: r.calories != null ? r.calories : null,
+    ingredients: (r.ingredientes || []).map(name => ({ name })),
     url: r.url || null
   }));
 }
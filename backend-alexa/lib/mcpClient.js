@@ -1,6 +1,8 @@
 /**
  * Cliente para llamar a recetario-mcp (MCP_BASE_URL).
  * POST a /mcp/recetario.<tool> con body JSON; devuelve result o lanza.
+ * POST a /mcp/batch para varias tools en una sola ronda (callMcpBatch).
+ * POST con Accept: application/x-ndjson para prices_search / stores_search en streaming (callMcpStream).
  */
 const baseUrl = () => process.env.MCP_BASE_URL || '';
 
@@ -9,6 +11,17 @@ function isConfigured() {
   return typeof url === 'string' && url.length > 0;
 }
 
+/**
+ * Cabeceras comunes de las llamadas al MCP (JSON y X-API-Key si hay MCP_API_KEY).
+ * @returns {object}
+ */
+function mcpHeaders() {
+  const headers = { 'Content-Type': 'application/json' };
+  const mcpKey = process.env.MCP_API_KEY || '';
+  if (mcpKey.length > 0) headers['X-API-Key'] = mcpKey;
+  return headers;
+}
+
 /**
  * Llama a una tool del MCP.
  * @param {string} toolPath - Ej: "recetario.recipes_search"
@@ -20,9 +33,7 @@ async function callMcp(toolPath, params = {}) {
   const path = toolPath.startsWith('/') ? toolPath : `/mcp/${toolPath}`;
   const url = `${base}${path}`;
 
-  const headers = { 'Content-Type': 'application/json' };
-  const mcpKey = process.env.MCP_API_KEY || '';
-  if (mcpKey.length > 0) headers['X-API-Key'] = mcpKey;
+  const headers = mcpHeaders();
 
   const res = await fetch(url, {
     method: 'POST',
@@ -40,4 +51,105 @@ async function callMcp(toolPath, params = {}) {
   return { success: true, result: data.result || data };
 }
 
-module.exports = { isConfigured, callMcp };
+/**
+ * Llama a varias tools del MCP en una sola peticion (POST /mcp/batch).
+ * @param {Array<{tool: string, params: object}>} calls - Ej: [{ tool: "recetario.recipes_search", params: {...} }]
+ * @returns {Promise<Array<object>>} un { success, result } o { success: false, error } por llamada, en el mismo orden
+ */
+async function callMcpBatch(calls) {
+  const base = baseUrl().replace(/\/$/, '');
+  const res = await fetch(`${base}/mcp/batch`, {
+    method: 'POST',
+    headers: mcpHeaders(),
+    body: JSON.stringify({ calls })
+  });
+
+  const data = await res.json().catch(() => ({}));
+  if (!res.ok || data.success === false) {
+    const error = data.detail || data.error || res.statusText || 'MCP error';
+    return calls.map(() => ({ success: false, error }));
+  }
+  const results = Array.isArray(data.results) ? data.results : [];
+  return calls.map((_, i) => {
+    const r = results[i] || {};
+    if (!r.success) return { success: false, error: r.error || 'MCP error' };
+    return { success: true, result: r.result || r };
+  });
+}
+
+/**
+ * Llama a una tool en streaming (NDJSON) y arma el resultado conforme llegan los eventos:
+ * "results" (hits de Brave), "price" (un precio por URL), "done" (respuesta completa) o "error".
+ * Si pasan budgetMs antes de "done", corta la peticion y devuelve lo que haya llegado con partial: true
+ * (p. ej. para responder dentro del timeout de Alexa con los precios que ya esten).
+ * @param {string} toolPath - Ej: "recetario.prices_search"
+ * @param {object} params - Body del POST
+ * @param {number} budgetMs - Tiempo maximo de espera (0 = sin limite)
+ * @returns {Promise<object>} { success, result, partial } o { success: false, error }
+ */
+async function callMcpStream(toolPath, params = {}, budgetMs = 0) {
+  const base = baseUrl().replace(/\/$/, '');
+  const path = toolPath.startsWith('/') ? toolPath : `/mcp/${toolPath}`;
+  const controller = new AbortController();
+  let timedOut = false;
+  const timer = budgetMs > 0 ? setTimeout(() => { timedOut = true; controller.abort(); }, budgetMs) : null;
+  let result = null;
+
+  const apply = (event, data) => {
+    if (event === 'results') {
+      result = data;
+    } else if (event === 'price' && result && Array.isArray(result.precios)) {
+      const { index, ...precio } = data;
+      if (index >= 0 && index < result.precios.length) result.precios[index] = precio;
+    } else if (event === 'done') {
+      return data.success === false
+        ? { success: false, error: data.error || 'MCP error' }
+        : { success: true, result: data.result || data, partial: false };
+    } else if (event === 'error') {
+      return { success: false, error: data.error || 'MCP error' };
+    }
+    return null;
+  };
+
+  try {
+    const res = await fetch(`${base}${path}`, {
+      method: 'POST',
+      headers: { ...mcpHeaders(), Accept: 'application/x-ndjson' },
+      body: JSON.stringify(params),
+      signal: controller.signal
+    });
+    if (!res.ok) {
+      const data = await res.json().catch(() => ({}));
+      return { success: false, error: data.detail || data.error || res.statusText };
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (!line) continue;
+        let record;
+        try { record = JSON.parse(line); } catch (_) { continue; }
+        const out = apply(record.event, record.data || {});
+        if (out) {
+          controller.abort();
+          return out;
+        }
+      }
+    }
+    return result ? { success: true, result, partial: true } : { success: false, error: 'MCP stream ended early' };
+  } catch (e) {
+    if (timedOut && result) return { success: true, result, partial: true };
+    return { success: false, error: timedOut ? 'MCP timeout' : String(e.message || e) };
+  } finally {
+    if (timer) clearTimeout(timer);
+  }
+}
+
+module.exports = { isConfigured, callMcp, callMcpBatch, callMcpStream };
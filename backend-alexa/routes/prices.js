@@ -1,10 +1,12 @@
 /**
  * Rutas: Precios / Compras (MCP /api/mcp/prices).
  * GET: si MCP_BASE_URL está definido, llama a recetario-mcp (prices_search); si no, datos demo.
+ * Con MCP_PRICES_BUDGET_MS usa la variante en streaming y responde a ese tiempo con los precios que ya
+ * llegaron (partial: true), sin esperar a la tienda mas lenta.
  */
 const { send } = require('../lib/response');
 const { getPrices } = require('../data/prices');
-const { isConfigured, callMcp } = require('../lib/mcpClient');
+const { isConfigured, callMcp, callMcpStream } = require('../lib/mcpClient');
 const { mapPreciosFromMcp } = require('../lib/mapMcp');
 
 async function handlePrices(req, res) {
@@ -14,17 +16,17 @@ async function handlePrices(req, res) {
 
   if (isConfigured()) {
     try {
-      const out = await callMcp('recetario.prices_search', {
-        query,
-        scraping: true,
-        topK: 10
-      });
+      const params = { query, scraping: true, topK: 10 };
+      const budgetMs = parseInt(process.env.MCP_PRICES_BUDGET_MS || '0', 10) || 0;
+      const out = budgetMs > 0
+        ? await callMcpStream('recetario.prices_search', params, budgetMs)
+        : await callMcp('recetario.prices_search', params);
       if (!out.success) {
         send(res, 502, { error: out.error || 'MCP error', prices: getPrices(userId) });
         return;
       }
       const prices = mapPreciosFromMcp(out.result).map(p => ({ ...p, userId }));
-      send(res, 200, { prices });
+      send(res, 200, out.partial ? { prices, partial: true } : { prices });
       return;
     } catch (e) {
       send(res, 502, { error: String(e.message || e), prices: getPrices(userId) });
@@ -1,6 +1,7 @@
 /**
  * Rutas: Recetas (MCP /api/mcp/recipes).
  * Si MCP_BASE_URL está definido, llama a recetario-mcp; si no, usa datos demo.
+ * Con ingredientes en el body usa recetario.recipes_by_ingredients (gustos/disgustos incluidos).
  */
 const { send } = require('../lib/response');
 const { getRecetas } = require('../data/recipes');
@@ -12,11 +13,19 @@ async function handleRecipes(body, res) {
 
   if (isConfigured()) {
     try {
-      const out = await callMcp('recetario.recipes_search', {
-        query: 'recetas mexicanas',
-        tipo_comida: tipoComida,
-        topK: 10
-      });
+      const hasIngredientes = Array.isArray(body.ingredientes) ? body.ingredientes.length > 0 : Boolean(body.ingredientes);
+      const out = hasIngredientes
+        ? await callMcp('recetario.recipes_by_ingredients', {
+          ingredientes: body.ingredientes,
+          gustos: body.gustos,
+          disgustos: body.disgustos,
+          topK: 10
+        })
+        : await callMcp('recetario.recipes_search', {
+          query: 'recetas mexicanas',
+          tipo_comida: tipoComida,
+          topK: 10
+        });
       if (!out.success) {
         send(res, 502, { error: out.error || 'MCP error', recetas: getRecetas(tipoComida) });
         return;
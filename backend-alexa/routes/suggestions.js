@@ -1,27 +1,51 @@
 /**
  * Rutas: Sugerencias / Menu del dia (MCP /api/mcp/suggestions).
- * Si MCP_BASE_URL está definido, llama a recetario-mcp por cada tipo (desayuno, comida, cena); si no, datos demo.
+ * Si MCP_BASE_URL está definido, llama a recetario-mcp en una sola peticion /mcp/batch (un recipes_search por tipo); si no, datos demo.
+ * Con presupuesto u objetivo en el body usa recetario.menu_optimize (una receta por tipo dentro del presupuesto).
  */
 const { send } = require('../lib/response');
 const { getMenu } = require('../data/suggestions');
-const { isConfigured, callMcp } = require('../lib/mcpClient');
+const { isConfigured, callMcp, callMcpBatch } = require('../lib/mcpClient');
 const { mapRecetasFromMcp } = require('../lib/mapMcp');
 
 async function handleSuggestions(body, res) {
   const tiposComida = Array.isArray(body.tiposComida) ? body.tiposComida : ['desayuno', 'comida', 'cena'];
 
+  if (isConfigured() && (body.presupuesto || body.objetivo)) {
+    try {
+      const out = await callMcp('recetario.menu_optimize', {
+        tipos_comida: tiposComida,
+        presupuestoDiario: body.presupuesto,
+        objetivo: body.objetivo
+      });
+      if (!out.success) {
+        send(res, 502, { error: out.error || 'MCP error', menu: getMenu(tiposComida) });
+        return;
+      }
+      const result = out.result || {};
+      const menu = {};
+      Object.keys(result.menu || {}).forEach((tipo) => {
+        menu[tipo] = mapRecetasFromMcp({ recetas: [result.menu[tipo]] });
+      });
+      send(res, 200, { menu, totalCost: result.total_cost, dentroPresupuesto: result.dentro_presupuesto });
+      return;
+    } catch (e) {
+      send(res, 502, { error: String(e.message || e), menu: getMenu(tiposComida) });
+      return;
+    }
+  }
+
   if (isConfigured()) {
     try {
       const menu = {};
-      for (const t of tiposComida) {
-        const tipo = ['desayuno', 'comida', 'cena'].includes(t) ? t : t.toLowerCase();
-        const out = await callMcp('recetario.recipes_search', {
-          query: 'recetas mexicanas',
-          tipo_comida: tipo,
-          topK: 5
-        });
-        menu[tipo] = out.success ? mapRecetasFromMcp(out.result) : [];
-      }
+      const tipos = tiposComida.map((t) => (['desayuno', 'comida', 'cena'].includes(t) ? t : t.toLowerCase()));
+      const outs = await callMcpBatch(tipos.map((tipo) => ({
+        tool: 'recetario.recipes_search',
+        params: { query: 'recetas mexicanas', tipo_comida: tipo, topK: 5 }
+      })));
+      tipos.forEach((tipo, i) => {
+        menu[tipo] = outs[i].success ? mapRecetasFromMcp(outs[i].result) : [];
+      });
       send(res, 200, { menu });
       return;
     } catch (e) {
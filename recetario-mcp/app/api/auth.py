@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """
 Validacion de API key para proteger el MCP.
-Si API_KEY esta definida, las rutas /mcp/* y /tools requieren cabecera X-API-Key o Authorization: Bearer <key>.
-/health queda abierto para probes.
+Si API_KEY esta definida, las rutas /mcp/*, /admin/*, /tools, /stats, /metrics y /quota requieren cabecera X-API-Key o Authorization: Bearer <key>.
+/health queda abierto para probes. La comparacion de la clave es de tiempo constante (hmac.compare_digest).
 """
+import hmac
 import os
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
 from fastapi import Request, HTTPException
 
@@ -18,17 +19,45 @@ def is_protected() -> bool:
     return len(get_api_key()) > 0
 
 
+PROTECTED_PREFIXES = ("/mcp/", "/admin/")
+PROTECTED_PATHS = ("/tools", "/stats", "/metrics", "/quota")
+
+
+def is_protected_path(path: str) -> bool:
+    return path.startswith(PROTECTED_PREFIXES) or path in PROTECTED_PATHS
+
+
+def _strip_bearer(api_key: str) -> str:
+    if api_key.lower().startswith("bearer "):
+        return api_key[7:].strip()
+    return api_key.strip()
+
+
 def key_from_request(request: Request) -> str:
     api_key = request.headers.get("X-API-Key") or request.headers.get("Authorization") or ""
-    if isinstance(api_key, str) and api_key.lower().startswith("bearer "):
-        return api_key[7:].strip()
-    return (api_key or "").strip()
+    return _strip_bearer(api_key if isinstance(api_key, str) else "")
+
+
+def key_from_scope_headers(headers: Iterable[Tuple[bytes, bytes]]) -> str:
+    """Igual que key_from_request pero sobre scope["headers"] de ASGI (nombres en minusculas)."""
+    api_key = authorization = b""
+    for name, value in headers:
+        if name == b"x-api-key" and not api_key:
+            api_key = value
+        elif name == b"authorization" and not authorization:
+            authorization = value
+    return _strip_bearer((api_key or authorization).decode("latin-1"))
+
+
+def key_matches(provided: Optional[str]) -> bool:
+    """provided == API_KEY en tiempo constante (no filtra por tiempos cuantos caracteres coinciden)."""
+    if not provided:
+        return False
+    return hmac.compare_digest(provided.encode("utf-8"), get_api_key().encode("utf-8"))
 
 
 def require_api_key(request: Request) -> None:
     if not is_protected():
         return
-    key = get_api_key()
-    provided = key_from_request(request)
-    if not provided or provided != key:
+    if not key_matches(key_from_request(request)):
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Camino rapido ASGI para las tools: POST /mcp/recetario.<tool>, /mcp/call y /mcp/batch.
+Middleware ASGI puro (sin BaseHTTPMiddleware, sin router ni validacion de FastAPI): lee el cuerpo,
+comprueba la API key (tiempo constante), parsea y serializa con app/codec.py (orjson) y llama
+directo a RecetarioMCPServer (o a handle_stream, con Accept de streaming; app/api/stream.py).
+Mismas respuestas que las rutas de app/api/routes.py, que siguen atendiendo lo demas: otros
+metodos y rutas, tools desconocidas (404) y peticiones con Origin (para que CORSMiddleware
+agregue sus cabeceras).
+
+Variables de entorno:
+- MCP_FAST_PATH: 0 desactiva el camino rapido (todo pasa por FastAPI; para comparar)
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app import codec
+from app.api import stream
+from app.api.auth import is_protected, key_from_scope_headers, key_matches
+from app.mcp.server import recetario_mcp_server
+
+ENABLED: bool = (os.getenv("MCP_FAST_PATH") or "1").strip().lower() not in ("0", "false", "no")
+
+TOOL_PREFIX = "/mcp/"
+DEADLINE_HEADER = b"x-request-deadline"
+DEBUG_HEADER = b"x-debug-timing"
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _respond(send: Send, status: int, payload: Any) -> None:
+    body = codec.dumps(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", codec.CONTENT_TYPE),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _body_error(kind: str, msg: str, value: Any = None) -> Dict[str, Any]:
+    """Error 422 con la forma del de FastAPI para un cuerpo Dict[str, Any] invalido."""
+    return {"detail": [{"type": kind, "loc": ["body"], "msg": msg, "input": value}]}
+
+
+async def _wait_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _respond_stream(send: Send, receive: Receive, fmt: str, events: Any) -> None:
+    """Cada evento sale en su propio chunk; si el cliente se desconecta se corta (y se cancela la tool)."""
+    headers = [(b"content-type", stream.MEDIA_TYPES[fmt].encode("latin-1"))]
+    headers += [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stream.HEADERS]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    chunks = stream.encoded(fmt, events)
+    try:
+        async for chunk in chunks:
+            if disconnected.done():
+                return
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        disconnected.cancel()
+        await chunks.aclose()
+
+
+def _headers(scope: Scope) -> Tuple[Optional[str], bool, bool, Optional[str]]:
+    """(X-Request-Deadline, X-Debug-Timing activo, trae Origin, Accept)."""
+    deadline_ms = None
+    debug = False
+    origin = False
+    accept = None
+    for name, value in scope.get("headers") or ():
+        if name == DEADLINE_HEADER:
+            deadline_ms = value.decode("latin-1")
+        elif name == DEBUG_HEADER:
+            debug = value.decode("latin-1").strip().lower() not in ("", "0", "false", "no")
+        elif name == b"origin":
+            origin = True
+        elif name == b"accept":
+            accept = value.decode("latin-1")
+    return deadline_ms, debug, origin, accept
+
+
+class McpFastPath:
+    """Middleware ASGI: atiende las tools sin pasar por Starlette/FastAPI."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route(self, path: str) -> Optional[str]:
+        """Nombre de la tool, "call", "batch" o None (no es del camino rapido)."""
+        if not path.startswith(TOOL_PREFIX):
+            return None
+        name = path[len(TOOL_PREFIX):]
+        if name in ("call", "batch") or name in recetario_mcp_server.tools:
+            return name
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not ENABLED or scope["type"] != "http" or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+        name = self._route(scope.get("path") or "")
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        deadline_ms, debug, origin, accept = _headers(scope)
+        if origin:
+            await self.app(scope, receive, send)
+            return
+
+        if is_protected() and not key_matches(key_from_scope_headers(scope.get("headers") or ())):
+            await _respond(send, 401, {"detail": "Unauthorized"})
+            return
+
+        raw = await _read_body(receive)
+        if not raw:
+            await _respond(send, 422, _body_error("missing", "Field required"))
+            return
+        try:
+            data = codec.loads(raw)
+        except codec.DecodeError:
+            await _respond(send, 422, _body_error("json_invalid", "JSON decode error"))
+            return
+        if not isinstance(data, dict):
+            await _respond(send, 422, _body_error("dict_type", "Input should be a valid dictionary", data))
+            return
+
+        server = recetario_mcp_server
+        if name == "call":
+            if deadline_ms and "deadline_ms" not in data:
+                data["deadline_ms"] = deadline_ms
+            if debug:
+                data["debug_timing"] = True
+            try:
+                result = await server.handle_request(data)
+            except Exception as e:
+                await _respond(send, 500, {"detail": str(e)})
+                return
+        elif name == "batch":
+            result = await server.handle_batch(
+                data.get("calls") or [],
+                data.get("max_concurrency"),
+                deadline_ms=data.get("deadline_ms") or deadline_ms,
+                debug_timing=debug,
+            )
+        else:
+            call = {"tool": name, "params": data, "deadline_ms": deadline_ms, "debug_timing": debug}
+            fmt = stream.stream_format(accept) if name in server.stream_tools else None
+            if fmt is not None:
+                await _respond_stream(send, receive, fmt, server.handle_stream(call))
+                return
+            result = await server.handle_request(call)
+        await _respond(send, 200, result)
@@ -1,17 +1,129 @@
 #!/usr/bin/env python3
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
+from app import profiler
+from app.api import stream
+
+from app.capture import capture
 from app.mcp.server import recetario_mcp_server
+from app.metrics import Sample, registry
+from app.net.client import http_client
+from app.scraping.parser_pool import parser_pool
+from app.scraping.scheduler import scrape_scheduler
+from app.scraping.store import price_store
+from app.scraping.supermarkets import scrape_stats
+from app.search.by_ingredients import ingredient_index
+from app.search.canonical import canonicalizer
+from app.search.local_index import local_index
+from app.search.price_history import price_history
+from app.search.provider import provider_search
 
 router = APIRouter()
 
+DEADLINE_HEADER = "X-Request-Deadline"
+DEBUG_HEADER = "X-Debug-Timing"
+
+
+def _debug(request: Request) -> bool:
+    return (request.headers.get(DEBUG_HEADER) or "").strip().lower() not in ("", "0", "false", "no")
+
+
+async def _call_tool(tool: str, data: Dict[str, Any], request: Request) -> Dict[str, Any]:
+    return await recetario_mcp_server.handle_request(
+        {"tool": tool, "params": data, "deadline_ms": request.headers.get(DEADLINE_HEADER), "debug_timing": _debug(request)}
+    )
+
+
+async def _call_tool_maybe_stream(tool: str, data: Dict[str, Any], request: Request):
+    """Con Accept: application/x-ndjson o text/event-stream responde en streaming (app/api/stream.py)."""
+    fmt = stream.stream_format(request.headers.get("accept"))
+    if fmt is None:
+        return await _call_tool(tool, data, request)
+    events = recetario_mcp_server.handle_stream(
+        {"tool": tool, "params": data, "deadline_ms": request.headers.get(DEADLINE_HEADER), "debug_timing": _debug(request)}
+    )
+    return StreamingResponse(stream.encoded(fmt, events), media_type=stream.MEDIA_TYPES[fmt], headers=dict(stream.HEADERS))
+
+
+def _collect() -> Iterable[Sample]:
+    """Contadores y gauges de /metrics a partir de los stats de cada componente (se leen al exportar)."""
+    out: List[Sample] = []
+
+    def add(name: str, kind: str, help: str, value: float, how: str = "sum", **labels: str) -> None:
+        out.append((name, kind, help, labels, float(value), how))
+
+    server = recetario_mcp_server.stats
+    add("recetario_requests_total", "counter", "Llamadas a tools MCP.", server["requests"])
+    add("recetario_request_errors_total", "counter", "Llamadas a tools que terminaron en excepcion.", server["errors"])
+    for tool, n in recetario_mcp_server.in_flight.items():
+        add("recetario_tool_in_flight", "gauge", "Llamadas a tools en curso.", n, tool=tool)
+
+    cache = provider_search.cache.stats
+    for result, key in (("hit_l1", "hits_l1"), ("hit_l2", "hits_l2"), ("stale", "stale_hits"), ("miss", "misses")):
+        add("recetario_search_cache_lookups_total", "counter", "Consultas al cache de busquedas por resultado.", cache[key], result=result)
+    add("recetario_search_cache_entries", "gauge", "Entradas en el cache L1 de busquedas.", len(provider_search.cache._entries))
+    sf = provider_search.singleflight.snapshot()
+    add("recetario_singleflight_collapsed_total", "counter", "Busquedas identicas que esperaron a otra en vuelo.", sf["collapsed"])
+    add("recetario_singleflight_in_flight", "gauge", "Busquedas a Brave en vuelo (claves distintas).", sf["in_flight"])
+    canon = canonicalizer.stats
+    for outcome in ("new_keys", "repeats", "collapsed"):
+        add("recetario_query_canonical_total", "counter", "Consultas canonicalizadas por resultado (collapsed: variante nueva de una clave ya vista).", canon[outcome], outcome=outcome)
+    add("recetario_swr_served_total", "counter", "Respuestas stale servidas mientras se renuevan.", provider_search.stats["swr_served"])
+
+    limiter = provider_search.limiter
+    for priority, n in limiter.stats["admitted"].items():
+        add("recetario_brave_admitted_total", "counter", "Llamadas a Brave admitidas por el rate limiter.", n, priority=priority)
+    for priority, n in limiter.stats["rejected_rate"].items():
+        add("recetario_brave_rejected_total", "counter", "Llamadas a Brave rechazadas.", n, priority=priority, reason="rate")
+    add("recetario_brave_rejected_total", "counter", "Llamadas a Brave rechazadas.", limiter.stats["rejected_quota"], priority="any", reason="quota")
+    # Cuota: con Redis todos los workers ven el mismo contador -> max, no suma
+    used = provider_search.planner.used
+    add("recetario_brave_quota_limit", "gauge", "Cuota mensual de Brave.", limiter.monthly_quota, how="max")
+    add("recetario_brave_quota_used", "gauge", "Cuota de Brave gastada en el mes.", used, how="max")
+    add("recetario_brave_quota_remaining", "gauge", "Cuota de Brave restante en el mes.", max(0, limiter.monthly_quota - used), how="min")
+
+    http = http_client.stats
+    add("recetario_http_requests_total", "counter", "Peticiones del cliente HTTP compartido.", http["requests"])
+    add("recetario_http_errors_total", "counter", "Peticiones HTTP con error.", http["errors"])
+    add("recetario_http_in_flight", "gauge", "Peticiones HTTP en curso.", http["in_flight"])
+
+    for key in ("fetches", "bytes_read", "early_exits", "truncated", "dom_fallbacks", "early_unparsed", "errors"):
+        add(f"recetario_scrape_{key}_total", "counter", f"Scraping: {key}.", scrape_stats[key])
+    for domain, state in scrape_scheduler._domains.items():
+        add("recetario_scrape_in_flight", "gauge", "Descargas de scraping en curso por dominio.", state.in_flight, domain=domain)
+        add("recetario_scrape_breaker_open", "gauge", "1 si el circuit breaker del dominio no esta cerrado.", int(state.breaker.state != "closed"), how="max", domain=domain)
+
+    pool = parser_pool.snapshot()
+    add("recetario_parser_queue_depth", "gauge", "Paginas esperando parseo.", pool["queue_depth"])
+    add("recetario_parser_jobs_total", "counter", "Paginas enviadas al pool de parseo.", pool["jobs"])
+    add("recetario_parser_timeouts_total", "counter", "Paginas cuyo parseo vencio.", pool["timeouts"])
+    return out
+
+
+def _hit_ratio(families: Dict[str, Any]) -> Iterable[Tuple[Dict[str, str], float]]:
+    values = families.get("recetario_search_cache_lookups_total", {}).get("values", {})
+    by_result = {dict(k)["result"]: v for k, v in values.items()}
+    lookups = sum(by_result.values())
+    hits = by_result.get("hit_l1", 0) + by_result.get("hit_l2", 0)
+    return [({}, round(hits / lookups, 4) if lookups else 0.0)]
+
+
+registry.register(_collect)
+registry.derive("recetario_search_cache_hit_ratio", "Aciertos frescos (L1 + L2) / consultas al cache de busquedas, todos los workers.", _hit_ratio)
+
 
 @router.get("/health")
 async def health():
-    return {"status": "healthy", "service": "recetario-mcp", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "service": "recetario-mcp",
+        "timestamp": datetime.now().isoformat(),
+        "scraping_breakers": scrape_scheduler.breaker_states(),
+    }
 
 
 @router.get("/tools")
@@ -19,29 +131,108 @@ async def tools():
     return {"tools": recetario_mcp_server.get_tools(), "count": len(recetario_mcp_server.get_tools())}
 
 
+@router.get("/stats")
+async def stats():
+    return {
+        "server": recetario_mcp_server.stats,
+        "http": http_client.pool_stats(),
+        "search_cache": provider_search.cache.snapshot(),
+        "singleflight": provider_search.singleflight.snapshot(),
+        "canonical": canonicalizer.snapshot(),
+        "swr": provider_search.stats,
+        "prewarm": provider_search.prewarmer.snapshot(),
+        "local_index": await local_index.snapshot(),
+        "ingredient_index": ingredient_index.snapshot(),
+        "price_history": price_history.snapshot(),
+        "rate_limit": provider_search.limiter.snapshot(),
+        "price_store": price_store.stats,
+        "scraping": scrape_stats,
+        "scraping_domains": scrape_scheduler.snapshot(),
+        "parser_pool": parser_pool.snapshot(),
+        "capture": capture.snapshot(),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Formato texto de Prometheus; con METRICS_DIR suma todos los workers."""
+    return PlainTextResponse(await registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(seconds: float = 5.0, interval_ms: float = 5.0, loop_only: bool = False):
+    """Profiler por muestreo: pilas colapsadas durante `seconds` (solo con PROFILE_ENABLED)."""
+    if not profiler.ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        text, samples, elapsed = await profiler.profile(seconds, interval_ms, loop_only)
+    except profiler.Busy:
+        raise HTTPException(status_code=409, detail="profile already running")
+    return PlainTextResponse(text, headers={"X-Profile-Samples": str(samples), "X-Profile-Seconds": f"{elapsed:.2f}"})
+
+
+@router.get("/quota")
+async def quota():
+    return await provider_search.planner.snapshot()
+
+
 @router.post("/mcp/call")
-async def call(req: Dict[str, Any]):
+async def call(req: Dict[str, Any], request: Request):
     try:
+        if request.headers.get(DEADLINE_HEADER) and "deadline_ms" not in req:
+            req = {**req, "deadline_ms": request.headers.get(DEADLINE_HEADER)}
+        if _debug(request):
+            req = {**req, "debug_timing": True}
         return await recetario_mcp_server.handle_request(req)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/mcp/batch")
+async def batch(req: Dict[str, Any], request: Request):
+    return await recetario_mcp_server.handle_batch(
+        req.get("calls") or [],
+        req.get("max_concurrency"),
+        deadline_ms=req.get("deadline_ms") or request.headers.get(DEADLINE_HEADER),
+        debug_timing=_debug(request),
+    )
+
+
 @router.post("/mcp/recetario.recipes_search")
-async def recipes_search(data: Dict[str, Any]):
-    return await recetario_mcp_server.handle_request({"tool": "recetario.recipes_search", "params": data})
+async def recipes_search(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.recipes_search", data, request)
 
 
 @router.post("/mcp/recetario.ingredients_search")
-async def ingredients_search(data: Dict[str, Any]):
-    return await recetario_mcp_server.handle_request({"tool": "recetario.ingredients_search", "params": data})
+async def ingredients_search(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.ingredients_search", data, request)
 
 
 @router.post("/mcp/recetario.prices_search")
-async def prices_search(data: Dict[str, Any]):
-    return await recetario_mcp_server.handle_request({"tool": "recetario.prices_search", "params": data})
+async def prices_search(data: Dict[str, Any], request: Request):
+    return await _call_tool_maybe_stream("recetario.prices_search", data, request)
 
 
 @router.post("/mcp/recetario.stores_search")
-async def stores_search(data: Dict[str, Any]):
-    return await recetario_mcp_server.handle_request({"tool": "recetario.stores_search", "params": data})
+async def stores_search(data: Dict[str, Any], request: Request):
+    return await _call_tool_maybe_stream("recetario.stores_search", data, request)
+
+
+@router.post("/mcp/recetario.menu_search")
+async def menu_search(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.menu_search", data, request)
+
+
+@router.post("/mcp/recetario.recipes_by_ingredients")
+async def recipes_by_ingredients(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.recipes_by_ingredients", data, request)
+
+
+@router.post("/mcp/recetario.price_history")
+async def price_history_search(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.price_history", data, request)
+
+
+@router.post("/mcp/recetario.menu_optimize")
+async def menu_optimize(data: Dict[str, Any], request: Request):
+    return await _call_tool("recetario.menu_optimize", data, request)
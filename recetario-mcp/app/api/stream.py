@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Respuestas en streaming de las tools (prices_search, stores_search), elegidas por la cabecera Accept:
+- application/x-ndjson: una linea JSON por evento, {"event": "...", "data": {...}}
+- text/event-stream: Server-Sent Events, "event: ...\ndata: {...}\n\n"
+Eventos: "results" (hits de Brave), "price" (un precio en cuanto se scrapea), y al final "done"
+(la misma respuesta que sin streaming) o "error".
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app import codec
+
+NDJSON = "ndjson"
+SSE = "sse"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", SSE: "text/event-stream"}
+# Sin buffering en proxies (nginx) ni caches intermedios
+HEADERS: List[Tuple[str, str]] = [("cache-control", "no-cache"), ("x-accel-buffering", "no")]
+
+
+def stream_format(accept: Optional[str]) -> Optional[str]:
+    """NDJSON o SSE segun Accept; None si el cliente no pidio streaming."""
+    accept = (accept or "").lower()
+    if "application/x-ndjson" in accept or "application/jsonl" in accept:
+        return NDJSON
+    if "text/event-stream" in accept:
+        return SSE
+    return None
+
+
+def encode(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    if fmt == SSE:
+        return b"event: " + event.encode("utf-8") + b"\ndata: " + codec.dumps(data) + b"\n\n"
+    return codec.dumps({"event": event, "data": data}) + b"\n"
+
+
+async def encoded(fmt: str, events: Any) -> AsyncIterator[bytes]:
+    """Eventos de RecetarioMCPServer.handle_stream ya codificados; al cortar se cierra el generador (cancela la tool)."""
+    try:
+        async for event, data in events:
+            yield encode(fmt, event, data)
+    finally:
+        await events.aclose()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Captura opcional de trafico real para reproducirlo despues (bench/replay.py).
+Con CAPTURE_FILE, RecetarioMCPServer.handle_request anota cada llamada a tool (tool, params, llegada)
+en un log JSONL de solo agregado; bench/replay.py lo vuelve a lanzar contra el servicio.
+
+- Anonimizado: de params solo quedan las claves que definen la carga (ALLOWED_PARAMS; ids de usuario,
+  sesion, dispositivo, etc. se descartan), los textos se recortan a CAPTURE_MAX_STR y se enmascaran
+  correos y numeros largos (telefonos, tarjetas).
+- Compacto: una linea por llamada {"t": epoch s (ms), "k": tool sin "recetario.", "p": params, "d": deadline_ms}.
+  "d" son los ms que le quedaban a la llamada al llegar (cabecera, params["deadline_ms"] o el del lote),
+  asi un deadline absoluto tambien se reproduce.
+- Barato: record() solo agrega a un buffer en memoria; se escribe cada CAPTURE_FLUSH_S desde un hilo
+  (un write con O_APPEND por lote, asi varios workers pueden compartir el archivo).
+
+Variables de entorno:
+- CAPTURE_FILE: log de captura (sin definir = captura apagada)
+- CAPTURE_SAMPLE_RATE: fraccion de llamadas capturadas (default 1.0)
+- CAPTURE_FLUSH_S: intervalo de escritura (default 1)
+- CAPTURE_MAX_BUFFER: llamadas pendientes maximas; las de mas se descartan y se cuentan (default 10000)
+- CAPTURE_MAX_STR: largo maximo de cada texto (default 120)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+TOOL_PREFIX = "recetario."
+
+# Claves de params que describen la carga; el resto no se guarda
+ALLOWED_PARAMS = frozenset({
+    "query", "q", "tipo_comida", "tipos_comida", "tiposComida", "topK", "source", "location",
+    "ingredientes", "ingredients", "gustos", "disgustos", "presupuesto", "presupuestoDiario", "budget",
+    "objetivo", "calorias", "caloriasObjetivo", "candidatos", "candidates", "product", "store", "points",
+    "country", "freshness", "priority", "scraping",
+})
+# Dentro de candidatos (menu_optimize) solo se conservan los datos de la receta
+ALLOWED_NESTED = frozenset({
+    "title", "name", "cost", "costo", "calories", "calorias", "score", "tipo", "tipo_comida",
+    "ingredients", "ingredientes", "share",
+})
+MAX_ITEMS = 50
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_LONG_NUMBER = re.compile(r"\d[\d\s-]{5,}\d")
+_SPACES = re.compile(r"\s+")
+
+
+class Capture:
+    def __init__(self):
+        self.path: str = os.getenv("CAPTURE_FILE", "")
+        self.sample_rate: float = float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0"))
+        self.flush_s: float = float(os.getenv("CAPTURE_FLUSH_S", "1"))
+        self.max_buffer: int = int(os.getenv("CAPTURE_MAX_BUFFER", "10000"))
+        self.max_str: int = int(os.getenv("CAPTURE_MAX_STR", "120"))
+        self._buffer: List[str] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.stats: Dict[str, int] = {"captured": 0, "dropped": 0, "flushes": 0, "write_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _text(self, value: str) -> str:
+        value = _SPACES.sub(" ", value).strip()
+        value = _EMAIL.sub("<email>", value)
+        value = _LONG_NUMBER.sub("<num>", value)
+        return value[: self.max_str]
+
+    def _clean(self, value: Any, allowed: frozenset, depth: int = 0) -> Any:
+        if isinstance(value, str):
+            return self._text(value)
+        if isinstance(value, bool) or value is None or isinstance(value, (int, float)):
+            return value
+        if depth >= 4:
+            return None
+        if isinstance(value, dict):
+            return {k: self._clean(v, ALLOWED_NESTED, depth + 1) for k, v in value.items() if k in allowed}
+        if isinstance(value, (list, tuple)):
+            return [self._clean(v, ALLOWED_NESTED, depth + 1) for v in list(value)[:MAX_ITEMS]]
+        return None
+
+    def anonymize(self, params: Any) -> Dict[str, Any]:
+        """params -> solo claves permitidas, textos recortados y enmascarados."""
+        if not isinstance(params, dict):
+            return {}
+        out = self._clean(params, ALLOWED_PARAMS)
+        for key in ("candidatos", "candidates"):
+            raw = params.get(key)
+            if isinstance(raw, dict):
+                # Candidatos por tipo de comida ({"desayuno": [...]}): la clave es el tipo, no un dato
+                out[key] = {self._text(str(t)): self._clean(v, ALLOWED_NESTED, 1) for t, v in list(raw.items())[:MAX_ITEMS]}
+        return out
+
+    def record(self, tool: str, params: Any, deadline_ms: Any = None) -> None:
+        """Anota una llamada (no bloquea: se escribe en el siguiente flush)."""
+        if not self.path or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self.stats["dropped"] += 1
+            return
+        item: Dict[str, Any] = {
+            "t": round(time.time(), 3),
+            "k": tool[len(TOOL_PREFIX):] if tool.startswith(TOOL_PREFIX) else tool,
+            "p": self.anonymize(params),
+        }
+        if deadline_ms not in (None, ""):
+            item["d"] = deadline_ms
+        try:
+            self._buffer.append(json.dumps(item, ensure_ascii=False, separators=(",", ":"), default=str))
+        except (TypeError, ValueError):
+            self.stats["dropped"] += 1
+            return
+        self.stats["captured"] += 1
+
+    def _write_sync(self, lines: List[str]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write_sync, lines)
+            self.stats["flushes"] += 1
+        except OSError:
+            self.stats["write_errors"] += 1
+
+    def start(self) -> None:
+        if not self.path or self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_s)
+            await self.flush()
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        await self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "path": self.path or None, "buffered": len(self._buffer), **self.stats}
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    """Lineas validas del log en orden de llegada (t), con el nombre completo de la tool."""
+    out: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(item, dict) or "k" not in item or "t" not in item:
+                continue
+            tool = str(item["k"])
+            item["tool"] = tool if tool.startswith(TOOL_PREFIX) else TOOL_PREFIX + tool
+            out.append(item)
+    out.sort(key=lambda x: float(x["t"]))
+    return out
+
+
+capture = Capture()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Codec JSON de las respuestas de tools: orjson si esta instalado (serializa en C, datetime y numpy
+nativos), json de la biblioteca estandar si no. Mismo resultado que JSONResponse de FastAPI
+(UTF-8 sin escapar, separadores compactos); tipos no JSON (set, numpy, objetos) se convierten en default().
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+CONTENT_TYPE = b"application/json"
+
+
+def default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "item") and callable(obj.item):  # escalares numpy
+        return obj.item()
+    if hasattr(obj, "tolist") and callable(obj.tolist):  # arrays numpy
+        return obj.tolist()
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", "replace")
+    return str(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+
+    def loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default).encode("utf-8")
+
+    def loads(data: bytes) -> Any:
+        return json.loads(data)
+
+
+# Errores de loads() en ambos casos (orjson.JSONDecodeError hereda de ValueError)
+DecodeError = ValueError
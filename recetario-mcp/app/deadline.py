@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de tiempo de extremo a extremo (deadline) por peticion.
+Se fija en RecetarioMCPServer.handle_request a partir de la cabecera X-Request-Deadline o del
+parametro deadline_ms y viaja en un ContextVar (las tareas asyncio lo heredan).
+Cada etapa (rate limit, Brave, scraping) recorta sus timeouts con clamp(), salta trabajo opcional
+si el tiempo no alcanza y anota el recorte con cut(); la respuesta dice que etapas se recortaron.
+
+Formato de X-Request-Deadline / deadline_ms: milisegundos restantes (ej. 2500) o instante absoluto
+en epoch ms (valores > 10^12).
+"""
+import asyncio
+import contextvars
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional
+
+_ABSOLUTE_MS = 10 ** 12
+
+
+class Deadline:
+    __slots__ = ("budget_s", "expires_at", "cuts")
+
+    def __init__(self, budget_s: float):
+        self.budget_s = max(0.0, budget_s)
+        self.expires_at = time.monotonic() + self.budget_s
+        self.cuts: List[Dict[str, str]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp(self, timeout: float) -> float:
+        return min(timeout, self.remaining())
+
+    def cut(self, stage: str, reason: str) -> None:
+        self.cuts.append({"stage": stage, "reason": reason})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": round(self.budget_s * 1000.0, 1),
+            "remaining_ms": round(self.remaining() * 1000.0, 1),
+            "cut": list(self.cuts),
+        }
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("recetario_deadline", default=None)
+
+
+def parse_deadline(value: Any) -> Optional[float]:
+    """Segundos de presupuesto a partir de ms restantes o epoch ms absoluto. None si no es valido."""
+    if value is None or value == "":
+        return None
+    try:
+        ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    if ms > _ABSOLUTE_MS:
+        ms = ms - time.time() * 1000.0
+    return max(0.0, ms / 1000.0)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def start(budget_s: float):
+    """Fija el deadline del contexto actual; devuelve el token para reset()."""
+    return _current.set(Deadline(budget_s))
+
+
+def reset(token) -> None:
+    _current.reset(token)
+
+
+def clamp(timeout: float) -> float:
+    """timeout recortado al tiempo restante (sin deadline: timeout tal cual)."""
+    dl = _current.get()
+    return timeout if dl is None else dl.clamp(timeout)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    dl = _current.get()
+    return default if dl is None else dl.remaining()
+
+
+def cut(stage: str, reason: str) -> None:
+    dl = _current.get()
+    if dl is not None:
+        dl.cut(stage, reason)
+
+
+def detach(coro: Awaitable[Any]) -> "asyncio.Future[Any]":
+    """Lanza coro como tarea sin deadline (trabajo que debe terminar aunque la peticion ya respondio)."""
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, None)
+    return ctx.run(asyncio.ensure_future, coro)
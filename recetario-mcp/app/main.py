@@ -3,8 +3,8 @@
 Recetario MCP - Punto de entrada FastAPI.
 Motor: Brave Search API + scraping supermercados (Walmart, Soriana, Chedraui).
 """
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from contextlib import asynccontextmanager
+
 from starlette.responses import JSONResponse
 
 from dotenv import load_dotenv
@@ -14,26 +14,63 @@ from fastapi.middleware.cors import CORSMiddleware
 load_dotenv()
 
 from app.api.routes import router
-from app.api.auth import get_api_key, is_protected, key_from_request
+from app.api.auth import is_protected, is_protected_path, key_from_scope_headers, key_matches
+from app.api.fast import McpFastPath
+from app.capture import capture
+from app.metrics import registry as metrics_registry
+from app.net.client import http_client
+from app.scraping.parser_pool import parser_pool
+from app.scraping.store import price_store
+from app.search.local_index import local_index
+from app.search.price_history import price_history
+from app.search.provider import provider_search
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Recursos compartidos por proceso: pool HTTP (Brave + scraping), pool de parseo, almacen e
+    historial de precios, indice local, prewarmer, metricas y captura de trafico.
+    """
+    await http_client.start()
+    parser_pool.start()
+    provider_search.prewarmer.start()
+    metrics_registry.start()
+    capture.start()
+    await price_history.load()
+    price_history.start()
+    try:
+        yield
+    finally:
+        await capture.close()
+        await price_history.close()
+        await metrics_registry.close()
+        await provider_search.prewarmer.close()
+        await http_client.close()
+        parser_pool.close()
+        price_store.close()
+        local_index.close()
+
+
+app = FastAPI(title="Recetario MCP", version="1.0.0", lifespan=lifespan)
 
-app = FastAPI(title="Recetario MCP", version="1.0.0")
 
+class ApiKeyMiddleware:
+    """
+    Si API_KEY esta definida, exige X-API-Key o Authorization: Bearer en /mcp/*, /admin/*, /tools,
+    /stats, /metrics y /quota. /health libre. ASGI puro.
+    """
 
-class ApiKeyMiddleware(BaseHTTPMiddleware):
-    """Si API_KEY esta definida, exige X-API-Key o Authorization: Bearer en /mcp/* y /tools. /health libre."""
+    def __init__(self, app):
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next):
-        path = (request.scope.get("path") or "").strip()
-        if not is_protected():
-            return await call_next(request)
-        if path == "/health" or path == "/":
-            return await call_next(request)
-        if path.startswith("/mcp/") or path == "/tools":
-            key = get_api_key()
-            provided = key_from_request(request)
-            if not provided or provided != key:
-                return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
-        return await call_next(request)
+    async def __call__(self, scope, receive, send):
+        path = (scope.get("path") or "").strip()
+        if scope["type"] == "http" and is_protected() and is_protected_path(path):
+            if not key_matches(key_from_scope_headers(scope.get("headers") or ())):
+                await JSONResponse(status_code=401, content={"detail": "Unauthorized"})(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
 
 
 app.add_middleware(ApiKeyMiddleware)
@@ -44,6 +81,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Va por fuera de CORS y de la auth: las tools (sin Origin) no pasan por el resto de la pila
+app.add_middleware(McpFastPath)
 
 app.include_router(router)
 
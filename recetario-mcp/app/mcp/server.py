@@ -3,20 +3,45 @@
 Recetario MCP - Servidor MCP para recetas, ingredientes, precios y supermercados (MX).
 Tools: Brave Search API + scraping supermercados (Walmart, Soriana, Chedraui).
 """
+import asyncio
+import json
 import logging
+import os
 import time
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from app import deadline, tracing
+from app.capture import capture
+from app.metrics import STREAM_FIRST_EVENT, TOOL_LATENCY
 from app.search.recipes import recipes_search
 from app.search.ingredients import ingredients_search
-from app.search.prices import prices_search
-from app.search.stores import stores_search
+from app.search.prices import prices_search, prices_search_events
+from app.search.stores import stores_search, stores_search_events
+from app.search.menu import menu_search
+from app.search.by_ingredients import recipes_by_ingredients
+from app.search.price_history import price_history_search
+from app.search.menu_optimize import menu_optimize
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _positive_int(value: Any) -> Optional[int]:
+    """Entero >= 1 de un valor del cliente (int o texto numerico); 0 si no vino; None si es invalido."""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if not number.is_integer() or number < 1:
+        return None
+    return int(number)
+
+
 class RecetarioMCPServer:
     def __init__(self):
         self.tools = {
@@ -24,47 +49,255 @@ class RecetarioMCPServer:
             "recetario.ingredients_search": self._ingredients_search,
             "recetario.prices_search": self._prices_search,
             "recetario.stores_search": self._stores_search,
+            "recetario.menu_search": self._menu_search,
+            "recetario.recipes_by_ingredients": self._recipes_by_ingredients,
+            "recetario.price_history": self._price_history,
+            "recetario.menu_optimize": self._menu_optimize,
+        }
+        # Tools con variante en streaming: generan (evento, datos) y terminan con ("done", resultado)
+        self.stream_tools = {
+            "recetario.prices_search": prices_search_events,
+            "recetario.stores_search": stores_search_events,
         }
         self.stats = {
             "requests": 0,
             "errors": 0,
             "start_time": datetime.now().isoformat(),
             "tool_metrics": {},
+            "batches": 0,
+            "batch_calls": 0,
+            "batch_deduplicated": 0,
+            "streams": 0,
         }
+        # Llamadas en curso por tool (gauge de /metrics)
+        self.in_flight: Dict[str, int] = {}
+        self.batch_max_calls: int = int(os.getenv("MCP_BATCH_MAX_CALLS", "20"))
+        self.batch_concurrency: int = int(os.getenv("MCP_BATCH_CONCURRENCY", "4"))
 
     def get_tools(self) -> List[str]:
         return list(self.tools.keys())
 
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        token = None
+        trace_token = None
         try:
             self.stats["requests"] += 1
             tool = request.get("tool", "")
             params = request.get("params", {})
+            token = self._start_deadline(request, params)
+            trace_token = tracing.start(f"tool {tool}", debug=bool(request.get("debug_timing")), tool=tool)
 
             if tool not in self.tools:
                 return {"success": False, "error": f"Tool not found: {tool}", "available_tools": self.get_tools()}
+            capture.record(tool, params, self._deadline_left_ms())
 
             start = time.perf_counter()
-            result = await self.tools[tool](params)
+            self.in_flight[tool] = self.in_flight.get(tool, 0) + 1
+            status = "error"
+            try:
+                result = await self.tools[tool](params)
+                status = "ok"
+            finally:
+                self.in_flight[tool] -= 1
+                TOOL_LATENCY.observe(time.perf_counter() - start, tool, status)
             duration_ms = (time.perf_counter() - start) * 1000.0
+            self._record_call(tool, duration_ms)
+            return self._envelope(tool, result, duration_ms)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error("Error: %s", e)
+            out = {"success": False, "error": str(e)}
+            if tracing.debugging():
+                out["timing"] = tracing.summary()
+            return out
+        finally:
+            tracing.finish(trace_token)
+            if token is not None:
+                deadline.reset(token)
+
+    def _record_call(self, tool: str, duration_ms: float) -> None:
+        tm = self.stats["tool_metrics"].setdefault(tool, {"calls": 0, "total_ms": 0.0, "avg_ms": 0.0, "last_ms": 0.0})
+        tm["calls"] += 1
+        tm["total_ms"] += duration_ms
+        tm["last_ms"] = duration_ms
+        tm["avg_ms"] = tm["total_ms"] / max(1, tm["calls"])
+
+    def _envelope(self, tool: str, result: Any, duration_ms: float) -> Dict[str, Any]:
+        out = {
+            "success": True,
+            "result": result,
+            "tool": tool,
+            "duration_ms": round(duration_ms, 2),
+            "timestamp": datetime.now().isoformat(),
+        }
+        dl = deadline.current()
+        if dl is not None:
+            out["deadline"] = dl.summary()
+        if tracing.debugging():
+            out["timing"] = tracing.summary()
+        return out
+
+    async def handle_stream(self, request: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Variante en streaming de handle_request para las tools de stream_tools: genera los eventos
+        de la tool en cuanto ocurren y termina con ("done", misma respuesta que handle_request) o
+        ("error", {"success": False, "error": ...}). La tool corre en su propia tarea (su deadline y
+        su traza no se mezclan con las del consumidor); si el consumidor deja de iterar se cancela.
+        """
+        queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+        producer = asyncio.ensure_future(self._produce_stream(request, queue))
+        try:
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("done", "error"):
+                    break
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def _produce_stream(self, request: Dict[str, Any], queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]") -> None:
+        token = None
+        trace_token = None
+        try:
+            self.stats["requests"] += 1
+            self.stats["streams"] += 1
+            tool = request.get("tool", "")
+            params = request.get("params", {})
+            token = self._start_deadline(request, params)
+            trace_token = tracing.start(f"stream {tool}", debug=bool(request.get("debug_timing")), tool=tool)
+
+            if tool not in self.stream_tools:
+                queue.put_nowait(("error", {"success": False, "error": f"Tool not streamable: {tool}", "streamable_tools": list(self.stream_tools)}))
+                return
+            capture.record(tool, params, self._deadline_left_ms())
 
-            tm = self.stats["tool_metrics"].setdefault(tool, {"calls": 0, "total_ms": 0.0, "avg_ms": 0.0, "last_ms": 0.0})
-            tm["calls"] += 1
-            tm["total_ms"] += duration_ms
-            tm["last_ms"] = duration_ms
-            tm["avg_ms"] = tm["total_ms"] / max(1, tm["calls"])
-
-            return {
-                "success": True,
-                "result": result,
-                "tool": tool,
-                "duration_ms": round(duration_ms, 2),
-                "timestamp": datetime.now().isoformat(),
-            }
+            start = time.perf_counter()
+            first = True
+            self.in_flight[tool] = self.in_flight.get(tool, 0) + 1
+            status = "error"
+            result: Dict[str, Any] = {}
+            try:
+                async for event, data in self.stream_tools[tool](params):
+                    if first:
+                        STREAM_FIRST_EVENT.observe(time.perf_counter() - start, tool)
+                        first = False
+                    if event == "done":
+                        result = data
+                    else:
+                        queue.put_nowait((event, data))
+                status = "ok"
+            finally:
+                self.in_flight[tool] -= 1
+                TOOL_LATENCY.observe(time.perf_counter() - start, tool, status)
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            self._record_call(tool, duration_ms)
+            queue.put_nowait(("done", self._envelope(tool, result, duration_ms)))
         except Exception as e:
             self.stats["errors"] += 1
             logger.error("Error: %s", e)
-            return {"success": False, "error": str(e)}
+            out = {"success": False, "error": str(e)}
+            if tracing.debugging():
+                out["timing"] = tracing.summary()
+            queue.put_nowait(("error", out))
+        finally:
+            tracing.finish(trace_token)
+            if token is not None:
+                deadline.reset(token)
+
+    @staticmethod
+    def _deadline_left_ms() -> Optional[int]:
+        """ms que le quedan al deadline actual (el de la llamada o el del lote); None sin deadline."""
+        dl = deadline.current()
+        return None if dl is None else int(round(dl.remaining() * 1000.0))
+
+    def _start_deadline(self, request: Dict[str, Any], params: Any):
+        """Deadline desde request["deadline_ms"] (cabecera X-Request-Deadline) o params["deadline_ms"]."""
+        raw = request.get("deadline_ms")
+        if raw is None and isinstance(params, dict):
+            raw = params.get("deadline_ms")
+        budget = deadline.parse_deadline(raw)
+        if budget is None:
+            return None
+        outer = deadline.current()
+        if outer is not None:
+            budget = min(budget, outer.remaining())
+        return deadline.start(budget)
+
+    async def handle_batch(
+        self,
+        calls: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        deadline_ms: Any = None,
+        debug_timing: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta varias tools en una sola ronda: [{tool, params}, ...].
+        Corren concurrentes (como maximo MCP_BATCH_CONCURRENCY a la vez); las llamadas identicas
+        se ejecutan una sola vez. Resultados en el mismo orden, cada uno con success/error y duration_ms.
+        deadline_ms aplica a todo el lote (cada llamada puede traer uno menor).
+        debug_timing: cada resultado trae su desglose de tiempos ("timing").
+        """
+        token = self._start_deadline({"deadline_ms": deadline_ms}, None)
+        try:
+            return await self._run_batch(calls, max_concurrency, debug_timing)
+        finally:
+            if token is not None:
+                deadline.reset(token)
+
+    async def _run_batch(self, calls: List[Dict[str, Any]], max_concurrency: Optional[int], debug_timing: bool = False) -> Dict[str, Any]:
+        if not isinstance(calls, list) or not calls:
+            return {"success": False, "error": "calls must be a non-empty list"}
+        if len(calls) > self.batch_max_calls:
+            return {"success": False, "error": f"Too many calls: {len(calls)} > {self.batch_max_calls}"}
+        for i, call in enumerate(calls):
+            if not isinstance(call, dict):
+                return {"success": False, "error": f"calls[{i}] must be an object with tool and params"}
+            if not isinstance(call.get("params") or {}, dict):
+                return {"success": False, "error": f"calls[{i}].params must be an object"}
+        requested = _positive_int(max_concurrency)
+        if requested is None:
+            return {"success": False, "error": "max_concurrency must be a positive integer"}
+
+        limit = min(requested or self.batch_concurrency, self.batch_concurrency)
+        semaphore = asyncio.Semaphore(limit)
+        self.stats["batches"] += 1
+        self.stats["batch_calls"] += len(calls)
+
+        async def run(call: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.handle_request({**call, "debug_timing": debug_timing})
+
+        start = time.perf_counter()
+        unique: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        order: List[tuple] = []
+        for call in calls:
+            normalized = {"tool": call.get("tool", ""), "params": call.get("params") or {}}
+            key = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+            duplicate = key in unique
+            if not duplicate:
+                unique[key] = asyncio.ensure_future(run(normalized))
+            else:
+                self.stats["batch_deduplicated"] += 1
+            order.append((key, duplicate))
+
+        await asyncio.gather(*unique.values())
+        results: List[Dict[str, Any]] = []
+        for i, (key, duplicate) in enumerate(order):
+            out = dict(unique[key].result())
+            out["index"] = i
+            out["deduplicated"] = duplicate
+            results.append(out)
+
+        return {
+            "success": True,
+            "results": results,
+            "count": len(results),
+            "unique_calls": len(unique),
+            "duration_ms": round((time.perf_counter() - start) * 1000.0, 2),
+            "timestamp": datetime.now().isoformat(),
+        }
 
     async def _recipes_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
         return await recipes_search(params)
@@ -78,5 +311,17 @@ class RecetarioMCPServer:
     async def _stores_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
         return await stores_search(params)
 
+    async def _menu_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await menu_search(params)
+
+    async def _recipes_by_ingredients(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await recipes_by_ingredients(params)
+
+    async def _price_history(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await price_history_search(params)
+
+    async def _menu_optimize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await menu_optimize(params)
+
 
 recetario_mcp_server = RecetarioMCPServer()
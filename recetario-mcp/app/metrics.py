@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Metricas en formato texto de Prometheus (GET /metrics).
+- Histogramas de latencia con cubetas fijas (segundos): observe() es un bisect y tres sumas sobre listas,
+  sin locks (un event loop por worker). Etiquetas como tupla; mas de METRICS_MAX_SERIES combinaciones
+  por histograma caen en "_other".
+- Contadores y gauges salen de los stats que ya lleva cada componente: collectors registrados con
+  register() que se leen solo al exportar (no cuestan nada en el camino caliente).
+- Varios workers de uvicorn: con METRICS_DIR cada worker escribe su estado en METRICS_DIR/worker-<pid>.json
+  cada METRICS_FLUSH_S; /metrics suma los archivos recientes (mtime < METRICS_STALE_S) con el estado en
+  memoria del worker que responde. Contadores e histogramas se suman; cada gauge declara como se
+  combina (sum | max | min: la cuota compartida via Redis no se suma).
+
+Variables de entorno:
+- METRICS_DIR: directorio compartido por los workers (sin definir = solo el proceso que responde)
+- METRICS_FLUSH_S: cada cuanto escribe su estado cada worker (default 5)
+- METRICS_STALE_S: archivos mas viejos se ignoran, p. ej. workers muertos (default 60)
+- METRICS_MAX_SERIES: combinaciones de etiquetas por histograma (default 200)
+"""
+import asyncio
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Cubetas por defecto (segundos): de 1 ms a 30 s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+OTHER = "_other"
+
+# Muestra de un collector: (nombre, tipo counter|gauge, ayuda, etiquetas, valor, combinacion sum|max|min)
+Sample = Tuple[str, str, str, Dict[str, str], float, str]
+
+
+class Histogram:
+    __slots__ = ("name", "help", "labelnames", "bounds", "max_series", "_series")
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self.max_series: int = int(os.getenv("METRICS_MAX_SERIES", "200"))
+        # etiquetas -> [conteos por cubeta (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                labels = (OTHER,) * len(self.labelnames)
+                series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "bounds": list(self.bounds),
+            "series": [[list(k), list(v[0]), v[1], v[2]] for k, v in self._series.items()],
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.dir: Optional[str] = os.getenv("METRICS_DIR") or None
+        self.flush_s: float = float(os.getenv("METRICS_FLUSH_S", "5"))
+        self.stale_s: float = float(os.getenv("METRICS_STALE_S", "60"))
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._derived: List[Tuple[str, str, Callable[[Dict[str, Any]], Iterable[Tuple[Dict[str, str], float]]]]] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms[name] = Histogram(name, help, labelnames, buckets)
+        return hist
+
+    def register(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """collector() -> muestras (ver Sample); se llama al exportar y al escribir el archivo del worker."""
+        self._collectors.append(collector)
+
+    def derive(self, name: str, help: str, fn: Callable[[Dict[str, Any]], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """Gauge calculado despues de combinar los workers: fn(familias) -> [(etiquetas, valor)] (p. ej. ratios)."""
+        self._derived.append((name, help, fn))
+
+    def state(self) -> Dict[str, Any]:
+        """Estado del proceso serializable (histogramas + muestras de los collectors)."""
+        samples: List[Sample] = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                continue
+        return {
+            "pid": os.getpid(),
+            "ts": time.time(),
+            "histograms": {name: h.state() for name, h in self._histograms.items()},
+            "samples": [list(s) for s in samples],
+        }
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.dir or "", f"worker-{pid}.json")
+
+    def _write_sync(self, state: Dict[str, Any]) -> None:
+        os.makedirs(self.dir or ".", exist_ok=True)
+        path = self._path(state["pid"])
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _read_others_sync(self) -> List[Dict[str, Any]]:
+        if not self.dir:
+            return []
+        own = self._path(os.getpid())
+        now = time.time()
+        out: List[Dict[str, Any]] = []
+        for path in glob.glob(os.path.join(self.dir, "worker-*.json")):
+            if path == own:
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.stale_s:
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def start(self) -> None:
+        """Escritura periodica del estado del worker (solo con METRICS_DIR)."""
+        if not self.dir or self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._write_sync, self.state())
+            except Exception:
+                pass
+            await asyncio.sleep(self.flush_s)
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        try:
+            os.remove(self._path(os.getpid()))
+        except OSError:
+            pass
+
+    async def render(self) -> str:
+        """Texto Prometheus con este worker + los archivos de los demas."""
+        states = [self.state()]
+        if self.dir:
+            states.extend(await asyncio.to_thread(self._read_others_sync))
+        agg = aggregate(states)
+        for name, help, fn in self._derived:
+            try:
+                values = {tuple(sorted(labels.items())): value for labels, value in fn(agg["families"])}
+            except Exception:
+                continue
+            agg["families"][name] = {"kind": "gauge", "help": help, "how": "sum", "values": values}
+        return render(agg, workers=len(states))
+
+
+def aggregate(states: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combina estados de varios workers: histogramas y contadores se suman; gauges segun su combinacion."""
+    hists: Dict[str, Dict[str, Any]] = {}
+    for state in states:
+        for name, h in (state.get("histograms") or {}).items():
+            agg = hists.setdefault(name, {"help": h["help"], "labelnames": h["labelnames"], "bounds": h["bounds"], "series": {}})
+            if agg["bounds"] != h["bounds"]:
+                continue
+            for labels, counts, total, count in h["series"]:
+                cur = agg["series"].get(tuple(labels))
+                if cur is None:
+                    agg["series"][tuple(labels)] = [list(counts), total, count]
+                else:
+                    cur[0] = [a + b for a, b in zip(cur[0], counts)]
+                    cur[1] += total
+                    cur[2] += count
+
+    families: Dict[str, Dict[str, Any]] = {}
+    for state in states:
+        for name, kind, help, labels, value, how in state.get("samples") or []:
+            fam = families.setdefault(name, {"kind": kind, "help": help, "how": how, "values": {}})
+            key = tuple(sorted(labels.items()))
+            cur = fam["values"].get(key)
+            if cur is None or kind == "counter" or how == "sum":
+                fam["values"][key] = value if cur is None else cur + value
+            elif how == "max":
+                fam["values"][key] = max(cur, value)
+            elif how == "min":
+                fam["values"][key] = min(cur, value)
+    return {"histograms": hists, "families": families}
+
+
+def _fmt_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(agg: Dict[str, Any], workers: int = 1) -> str:
+    lines: List[str] = [
+        "# HELP recetario_metrics_workers Workers incluidos en esta exportacion.",
+        "# TYPE recetario_metrics_workers gauge",
+        f"recetario_metrics_workers {workers}",
+    ]
+    for name in sorted(agg["families"]):
+        fam = agg["families"][name]
+        lines.append(f"# HELP {name} {fam['help']}")
+        lines.append(f"# TYPE {name} {fam['kind']}")
+        for key in sorted(fam["values"]):
+            lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(fam['values'][key])}")
+    for name in sorted(agg["histograms"]):
+        h = agg["histograms"][name]
+        lines.append(f"# HELP {name} {h['help']}")
+        lines.append(f"# TYPE {name} histogram")
+        bounds = [_fmt_value(b) for b in h["bounds"]] + ["+Inf"]
+        for labels in sorted(h["series"]):
+            counts, total, count = h["series"][labels]
+            base = list(zip(h["labelnames"], labels))
+            running = 0
+            for le, n in zip(bounds, counts):
+                running += n
+                lines.append(f"{name}_bucket{_fmt_labels(base + [('le', le)])} {running}")
+            lines.append(f"{name}_sum{_fmt_labels(base)} {_fmt_value(round(total, 6))}")
+            lines.append(f"{name}_count{_fmt_labels(base)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+TOOL_LATENCY = registry.histogram(
+    "recetario_tool_duration_seconds", "Duracion de cada llamada a tool MCP.", ("tool", "status"))
+STREAM_FIRST_EVENT = registry.histogram(
+    "recetario_stream_first_event_seconds", "Tiempo hasta el primer evento de una tool en streaming (NDJSON / SSE).", ("tool",))
+BRAVE_RATE_WAIT = registry.histogram(
+    "recetario_brave_rate_wait_seconds", "Espera en el rate limiter de Brave antes de la llamada HTTP.", ("priority",))
+BRAVE_HTTP = registry.histogram(
+    "recetario_brave_http_seconds", "Llamada HTTP a Brave Search (envio + respuesta JSON).", ("status",))
+SCRAPE_FETCH = registry.histogram(
+    "recetario_scrape_fetch_seconds", "Cada intento de descarga de una pagina de supermercado.", ("domain", "outcome"))
+PARSE = registry.histogram(
+    "recetario_parse_seconds", "Parseo de una pagina en el pool de parseo (tiempo en el worker).", ("mode",))
+PARSE_WAIT = registry.histogram(
+    "recetario_parse_wait_seconds", "Cola + IPC del pool de parseo por lote (sin el parseo).", ("mode",))
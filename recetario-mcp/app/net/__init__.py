@@ -0,0 +1,3 @@
+from app.net.client import HttpClient, http_client
+
+__all__ = ["HttpClient", "http_client"]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP compartido (aiohttp) para Brave y scraping de supermercados.
+Una sola ClientSession por proceso: keep-alive, limite de conexiones por host, cache DNS y timeouts configurables.
+Se abre en el arranque de FastAPI (lifespan en app/main.py) y se cierra al apagar.
+
+Variables de entorno:
+- HTTP_POOL_LIMIT: conexiones totales (default 100)
+- HTTP_POOL_LIMIT_PER_HOST: conexiones por host (default 10)
+- HTTP_DNS_TTL: segundos de cache DNS (default 300)
+- HTTP_KEEPALIVE_TIMEOUT: segundos que una conexion ociosa sigue abierta (default 30)
+- HTTP_CONNECT_TIMEOUT / HTTP_TOTAL_TIMEOUT: timeouts por defecto en segundos (default 5 / 15)
+"""
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+
+class HttpClient:
+    def __init__(self):
+        self.limit: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+        self.limit_per_host: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+        self.dns_ttl: int = int(os.getenv("HTTP_DNS_TTL", "300"))
+        self.keepalive_timeout: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+        self.connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+        self.total_timeout: float = float(os.getenv("HTTP_TOTAL_TIMEOUT", "15"))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.stats: Dict[str, Any] = {
+            "sessions_opened": 0,
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+        }
+
+    def timeout(self, total: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """Timeout por peticion; total=None usa HTTP_TOTAL_TIMEOUT."""
+        total_s = self.total_timeout if total is None else float(total)
+        return aiohttp.ClientTimeout(total=total_s, sock_connect=min(self.connect_timeout, total_s))
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self.stats["sessions_opened"] += 1
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout())
+
+    async def start(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+
+    async def close(self) -> None:
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Sesion compartida; si no se abrio en el arranque (scripts, tests) se crea aqui."""
+        if self._session is not None and not self._session.closed:
+            return self._session
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._new_session()
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs) -> "_TrackedRequest":
+        """Uso: async with http_client.request("GET", url, timeout=...) as r: ..."""
+        timeout = kwargs.pop("timeout", None)
+        if timeout is not None and not isinstance(timeout, aiohttp.ClientTimeout):
+            timeout = self.timeout(timeout)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return _TrackedRequest(self, method, url, kwargs)
+
+    def get(self, url: str, **kwargs) -> "_TrackedRequest":
+        return self.request("GET", url, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        session = self._session
+        out["open"] = session is not None and not session.closed
+        out["limit"] = self.limit
+        out["limit_per_host"] = self.limit_per_host
+        connector = session.connector if session is not None else None
+        if connector is not None:
+            acquired = getattr(connector, "_acquired", None) or ()
+            idle = getattr(connector, "_conns", None) or {}
+            out["connections_in_use"] = len(acquired)
+            out["connections_idle"] = sum(len(v) for v in idle.values())
+            out["idle_hosts"] = len(idle)
+        return out
+
+
+class _TrackedRequest:
+    """Context manager que cuenta peticiones en vuelo y errores sobre la sesion compartida."""
+
+    def __init__(self, client: HttpClient, method: str, url: str, kwargs: Dict[str, Any]):
+        self._client = client
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._ctx = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        stats = self._client.stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        try:
+            session = await self._client.session()
+            self._ctx = session.request(self._method, self._url, **self._kwargs)
+            return await self._ctx.__aenter__()
+        except BaseException:
+            stats["in_flight"] -= 1
+            stats["errors"] += 1
+            self._ctx = None
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        stats = self._client.stats
+        stats["in_flight"] -= 1
+        if exc_type is not None:
+            stats["errors"] += 1
+        if self._ctx is not None:
+            await self._ctx.__aexit__(exc_type, exc, tb)
+
+
+http_client = HttpClient()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Profiler por muestreo bajo demanda (GET /admin/profile).
+Un hilo toma la pila de los hilos del proceso (sys._current_frames) cada interval_ms durante seconds
+segundos y devuelve las pilas colapsadas ("modulo:funcion;modulo:funcion N" por linea, raiz primero),
+listas para flamegraph.pl o speedscope. El event loop sigue atendiendo peticiones mientras se muestrea.
+El parseo en el pool de procesos no aparece (otros procesos).
+
+Variables de entorno:
+- PROFILE_ENABLED: habilita /admin/profile (default 0; ademas requiere API_KEY si esta definida)
+- PROFILE_MAX_S: duracion maxima de una sesion (default 30)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+ENABLED: bool = (os.getenv("PROFILE_ENABLED") or "0").strip().lower() in ("1", "true", "yes")
+MAX_S: float = float(os.getenv("PROFILE_MAX_S", "30"))
+MIN_INTERVAL_MS = 1.0
+
+_running = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def _sample(stacks: Counter, stop: threading.Event, interval_s: float, thread_ids: Optional[set]) -> None:
+    me = threading.get_ident()
+    names: Dict[int, str] = {}
+    while not stop.is_set():
+        for t in threading.enumerate():
+            names[t.ident] = t.name
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (thread_ids is not None and ident not in thread_ids):
+                continue
+            parts = []
+            while frame is not None:
+                parts.append(_frame_label(frame))
+                frame = frame.f_back
+            parts.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(parts))] += 1
+        stop.wait(interval_s)
+
+
+class Busy(Exception):
+    """Ya hay una sesion de profiling en curso."""
+
+
+async def profile(seconds: float, interval_ms: float = 5.0, loop_only: bool = False) -> Tuple[str, int, float]:
+    """
+    Muestrea seconds segundos (tope PROFILE_MAX_S). Devuelve (pilas colapsadas ordenadas por conteo,
+    muestras, segundos reales).
+    """
+    seconds = max(0.1, min(float(seconds), MAX_S))
+    interval_s = max(MIN_INTERVAL_MS, float(interval_ms)) / 1000.0
+    if not _running.acquire(blocking=False):
+        raise Busy()
+    try:
+        stacks: Counter = Counter()
+        stop = threading.Event()
+        thread_ids = {threading.get_ident()} if loop_only else None
+        sampler = threading.Thread(target=_sample, args=(stacks, stop, interval_s, thread_ids), name="profiler", daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+        elapsed = time.perf_counter() - started
+    finally:
+        _running.release()
+    text = "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+    return text, sum(stacks.values()), elapsed
@@ -1,3 +1,4 @@
-from app.scraping.supermarkets import scrape_prices_supermarkets, fetch_html
+from app.scraping.supermarkets import scrape_prices_supermarkets, scrape_price, fetch_html, fetch_page
+from app.scraping.store import price_store
 
-__all__ = ["scrape_prices_supermarkets", "fetch_html"]
+__all__ = ["scrape_prices_supermarkets", "scrape_price", "fetch_html", "fetch_page", "price_store"]
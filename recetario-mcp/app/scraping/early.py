@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Extraccion temprana de precio y nombre mientras llegan los bytes de la pagina.
+Busca marcadores estructurados sin construir el DOM:
+- schema.org JSON-LD (<script type="application/ld+json"> con Product/offers.price)
+- itemprop="price" / itemprop="name" (atributo content)
+- data-price="..."
+- <meta property="og:title"> y <h1> para el nombre
+En cuanto hay precio y nombre, done es True y la descarga puede cortarse.
+"""
+import html as html_lib
+import json
+import re
+from typing import Any, Dict, Optional
+
+_OVERLAP = 512  # bytes re-escaneados entre chunks para no partir un marcador
+
+_LD_OPEN = re.compile(rb'<script[^>]+type=["\']application/ld\+json["\'][^>]*>', re.I)
+_LD_CLOSE = re.compile(rb"</script\s*>", re.I)
+_ITEMPROP_PRICE = re.compile(rb'itemprop=["\']price["\'][^>]*?content=["\']([^"\']+)["\']|content=["\']([^"\']+)["\'][^>]*?itemprop=["\']price["\']', re.I)
+_DATA_PRICE = re.compile(rb'data-price=["\']([^"\']+)["\']', re.I)
+_ITEMPROP_NAME = re.compile(rb'itemprop=["\']name["\'][^>]*?content=["\']([^"\']+)["\']', re.I)
+_OG_TITLE = re.compile(rb'<meta[^>]+property=["\']og:title["\'][^>]*?content=["\']([^"\']+)["\']', re.I)
+_H1 = re.compile(rb"<h1[^>]*>(.*?)</h1>", re.I | re.S)
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _text(raw: bytes, encoding: str) -> str:
+    text = raw.decode(encoding, errors="replace")
+    return " ".join(html_lib.unescape(_TAGS.sub(" ", text)).split())
+
+
+def _product_from_ld(data: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(data, list):
+        for item in data:
+            found = _product_from_ld(item)
+            if found:
+                return found
+        return None
+    if not isinstance(data, dict):
+        return None
+    if "@graph" in data:
+        return _product_from_ld(data["@graph"])
+    kind = data.get("@type")
+    kinds = kind if isinstance(kind, list) else [kind]
+    if "Product" not in kinds:
+        return None
+    offers = data.get("offers")
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    price = None
+    if isinstance(offers, dict):
+        price = offers.get("price") or offers.get("lowPrice")
+    return {"name": data.get("name"), "price": None if price is None else str(price)}
+
+
+class EarlyExtractor:
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self.buffer = bytearray()
+        self.price: Optional[str] = None
+        self.name: Optional[str] = None
+        self.source: Optional[str] = None
+        self._scan_from = 0
+        self._ld_from = 0
+
+    @property
+    def done(self) -> bool:
+        return bool(self.price and self.name)
+
+    def feed(self, chunk: bytes) -> bool:
+        """Agrega bytes y busca marcadores en la parte nueva. Devuelve done."""
+        self.buffer.extend(chunk)
+        if self.done:
+            return True
+        self._scan_ld()
+        start = max(0, self._scan_from - _OVERLAP)
+        view = bytes(self.buffer[start:])
+        self._scan_from = len(self.buffer)
+        if not self.price:
+            m = _ITEMPROP_PRICE.search(view) or _DATA_PRICE.search(view)
+            if m:
+                self.price = _text(next(g for g in m.groups() if g), self.encoding)
+                self.source = self.source or "markup"
+        if not self.name:
+            m = _ITEMPROP_NAME.search(view) or _OG_TITLE.search(view) or _H1.search(view)
+            if m:
+                name = _text(m.group(1), self.encoding)
+                if name and len(name) < 300:
+                    self.name = name[:200]
+        return self.done
+
+    def _scan_ld(self) -> None:
+        while True:
+            m_open = _LD_OPEN.search(self.buffer, self._ld_from)
+            if not m_open:
+                self._ld_from = max(self._ld_from, len(self.buffer) - _OVERLAP)
+                return
+            m_close = _LD_CLOSE.search(self.buffer, m_open.end())
+            if not m_close:
+                self._ld_from = m_open.start()
+                return
+            self._ld_from = m_close.end()
+            try:
+                data = json.loads(bytes(self.buffer[m_open.end():m_close.start()]).decode(self.encoding, errors="replace"))
+            except Exception:
+                continue
+            product = _product_from_ld(data)
+            if product:
+                if product.get("price") and not self.price:
+                    self.price = product["price"]
+                    self.source = "json-ld"
+                if product.get("name") and not self.name:
+                    self.name = str(product["name"])[:200]
+                if self.done:
+                    return
+
+    def result(self) -> Dict[str, Any]:
+        return {"price": self.price, "name": self.name, "source": self.source}
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Ejecucion del parseo HTML fuera del event loop.
+El parseo lxml de una pagina de 1-2 MB bloquea el worker de uvicorn decenas de ms;
+aqui los trabajos se despachan a un pool de procesos (o hilos).
+
+- Micro-batching: parse() junta los trabajos que llegan dentro de PARSER_BATCH_WINDOW_MS
+  (hasta PARSER_BATCH_MAX) y los envia en una sola ronda IPC; parse_many() envia un lote explicito.
+- Limite por trabajo: PARSER_JOB_TIMEOUT_S (un lote de n paginas tiene n * limite). Si vence, los
+  trabajos del lote devuelven resultado vacio; en modo process el worker termina su trabajo en segundo plano.
+- Metricas: profundidad de cola, trabajos, lotes, timeouts y tiempos de parseo (snapshot()).
+
+Variables de entorno:
+- PARSER_POOL_MODE: process | thread | inline (default process)
+- PARSER_POOL_WORKERS: procesos/hilos (default min(4, CPUs)); un lote se reparte entre los workers
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.metrics import PARSE, PARSE_WAIT
+
+
+def _parse_batch(jobs: List[Tuple[str, str]]) -> List[Tuple[Dict[str, Any], float]]:
+    """Corre en el worker: parsea cada (html, url) y devuelve (resultado, ms)."""
+    from app.scraping.rules import extract
+
+    out: List[Tuple[Dict[str, Any], float]] = []
+    for html, url in jobs:
+        start = time.perf_counter()
+        try:
+            parsed = extract(html, url)
+        except Exception:
+            parsed = extract("", url)
+        out.append((parsed, (time.perf_counter() - start) * 1000.0))
+    return out
+
+
+class ParserPool:
+    def __init__(self):
+        self.mode: str = (os.getenv("PARSER_POOL_MODE") or "process").strip().lower()
+        self.workers: int = int(os.getenv("PARSER_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.job_timeout_s: float = float(os.getenv("PARSER_JOB_TIMEOUT_S", "2.0"))
+        self.batch_window_s: float = float(os.getenv("PARSER_BATCH_WINDOW_MS", "5")) / 1000.0
+        self.batch_max: int = int(os.getenv("PARSER_BATCH_MAX", "8"))
+        self._executor: Optional[Executor] = None
+        self._pending: List[Tuple[str, str, "asyncio.Future[Dict[str, Any]]"]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._queue_depth: int = 0
+        self.stats: Dict[str, Any] = {
+            "jobs": 0,
+            "batches": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "parse_ms_total": 0.0,
+            "parse_ms_max": 0.0,
+            "wait_ms_total": 0.0,
+        }
+
+    def start(self) -> None:
+        if self._executor is not None or self.mode == "inline":
+            return
+        if self.mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parser")
+        else:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, html: str, url: str) -> Dict[str, Any]:
+        """Encola un trabajo; se agrupa con otros que lleguen en la misma ventana."""
+        loop = asyncio.get_running_loop()
+        fut: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        self._pending.append((html, url, fut))
+        self._queue_depth += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue_depth)
+        if len(self._pending) >= self.batch_max:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window_s, self._flush)
+        return await fut
+
+    async def parse_many(self, jobs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Lote explicito: una sola ronda IPC para varias paginas."""
+        if not jobs:
+            return []
+        self._queue_depth += len(jobs)
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue_depth)
+        return await self._run_batch(jobs)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        async def run() -> None:
+            results = await self._run_batch([(html, url) for html, url, _ in batch])
+            for (_, _, fut), parsed in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(parsed)
+
+        asyncio.ensure_future(run())
+
+    async def _run_batch(self, jobs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Reparte el lote en a lo mas `workers` sub-lotes (una ronda IPC cada uno)."""
+        size = max(1, -(-len(jobs) // max(1, self.workers)))
+        chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        results = await asyncio.gather(*[self._run_chunk(c) for c in chunks])
+        return [parsed for chunk in results for parsed in chunk]
+
+    async def _run_chunk(self, jobs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        self.stats["batches"] += 1
+        self.stats["jobs"] += len(jobs)
+        submitted = time.perf_counter()
+        try:
+            if self.mode == "inline":
+                timed = _parse_batch(jobs)
+            else:
+                if self._executor is None:
+                    self.start()
+                loop = asyncio.get_running_loop()
+                timed = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, _parse_batch, jobs),
+                    timeout=self.job_timeout_s * len(jobs),
+                )
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += len(jobs)
+            return [_empty(url) for _, url in jobs]
+        except Exception:
+            self.stats["errors"] += len(jobs)
+            return [_empty(url) for _, url in jobs]
+        finally:
+            self._queue_depth -= len(jobs)
+
+        total_ms = (time.perf_counter() - submitted) * 1000.0
+        parse_ms = sum(ms for _, ms in timed)
+        self.stats["parse_ms_total"] += parse_ms
+        self.stats["parse_ms_max"] = max([self.stats["parse_ms_max"]] + [ms for _, ms in timed])
+        self.stats["wait_ms_total"] += max(0.0, total_ms - parse_ms)
+        for _, ms in timed:
+            PARSE.observe(ms / 1000.0, self.mode)
+        PARSE_WAIT.observe(max(0.0, total_ms - parse_ms) / 1000.0, self.mode)
+        return [parsed for parsed, _ in timed]
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        jobs = max(1, self.stats["jobs"])
+        out["mode"] = self.mode
+        out["workers"] = self.workers
+        out["queue_depth"] = self._queue_depth
+        out["parse_ms_avg"] = round(self.stats["parse_ms_total"] / jobs, 2)
+        out["wait_ms_avg"] = round(self.stats["wait_ms_total"] / jobs, 2)
+        return out
+
+
+def _empty(url: str) -> Dict[str, Any]:
+    return {"url": url, "store": None, "price": None, "name": None}
+
+
+parser_pool = ParserPool()
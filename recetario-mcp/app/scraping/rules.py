@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Motor de extraccion por tienda: reglas declarativas por dominio compiladas una sola vez a XPath (lxml).
+Se aplican sobre el arbol lxml.html crudo, sin la capa BeautifulSoup.
+
+Cada regla: store (nombre), price / name (listas de XPath; se unen con "|" para respetar el orden del
+documento, igual que select_one con varios selectores) y price_attrs (atributos con el precio antes del texto).
+Para agregar una tienda basta con una entrada en RULES. Si las paginas cambian, actualizar aqui los selectores.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import lxml.html
+from lxml import etree
+
+_PRICE_SYMBOL = re.compile(r"\$\s*(\d+\.?\d*)")
+_PRICE_NUMBER = re.compile(r"(\d+\.?\d*)\s*(?:MXN|pesos)?", re.I)
+_SPACES = re.compile(r"\s+")
+
+
+def _cls(name: str) -> str:
+    """Equivalente XPath de .name en CSS."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_ITEMPROP_PRICE = "//*[@itemprop='price']"
+_ITEMPROP_NAME = "//*[@itemprop='name']"
+
+RULES: Dict[str, Dict[str, Any]] = {
+    "walmart.com.mx": {
+        "store": "Walmart",
+        "price": [
+            "//*[@data-automation='product-price']",
+            f"//*[{_cls('price-main')}]//*[{_cls('price')}]",
+            _ITEMPROP_PRICE,
+        ],
+        "name": [
+            "//h1[@data-automation='product-title']",
+            f"//*[{_cls('product-title')}]",
+            _ITEMPROP_NAME,
+        ],
+        "price_attrs": ("content",),
+    },
+    "soriana.com": {
+        "store": "Soriana",
+        "price": [f"//*[{_cls('price')}]", _ITEMPROP_PRICE, f"//*[{_cls('product-price')}]"],
+        "name": ["//h1", f"//*[{_cls('product-name')}]", _ITEMPROP_NAME],
+        "price_attrs": ("content",),
+    },
+    "chedraui.com.mx": {
+        "store": "Chedraui",
+        "price": [f"//*[{_cls('price')}]", _ITEMPROP_PRICE, f"//*[{_cls('product-price')}]", "//*[@data-price]"],
+        "name": ["//h1", f"//*[{_cls('product-name')}]", _ITEMPROP_NAME],
+        "price_attrs": ("content", "data-price"),
+    },
+    "heb.com.mx": {
+        "store": "HEB",
+        "price": [_ITEMPROP_PRICE, f"//*[{_cls('vtex-product-price-1-x-sellingPriceValue')}]", "//*[@data-price]"],
+        "name": [f"//*[{_cls('vtex-store-components-3-x-productBrand')}]", "//h1", _ITEMPROP_NAME],
+        "price_attrs": ("content", "data-price"),
+    },
+    "lacomer.com.mx": {
+        "store": "La Comer",
+        "price": [_ITEMPROP_PRICE, f"//*[{_cls('precio_normal')}]", f"//*[{_cls('price')}]", "//*[@data-price]"],
+        "name": ["//h1", f"//*[{_cls('product-name')}]", _ITEMPROP_NAME],
+        "price_attrs": ("content", "data-price"),
+    },
+}
+
+# Fallback: primer precio parseable / primer nombre corto en cualquier pagina.
+GENERIC_RULE: Dict[str, Any] = {
+    "store": "Otro",
+    "price": [_ITEMPROP_PRICE, f"//*[{_cls('price')}]", "//*[@data-price]"],
+    "name": ["//h1", _ITEMPROP_NAME, f"//*[{_cls('product-title')}]"],
+    "price_attrs": ("content", "data-price"),
+    "scan_all": True,
+}
+
+
+class CompiledRule:
+    __slots__ = ("domain", "store", "price_xp", "name_xp", "price_attrs", "scan_all")
+
+    def __init__(self, domain: str, spec: Dict[str, Any]):
+        self.domain = domain
+        self.store: str = spec["store"]
+        self.price_xp = etree.XPath(" | ".join(spec["price"]))
+        self.name_xp = etree.XPath(" | ".join(spec["name"]))
+        self.price_attrs: Tuple[str, ...] = tuple(spec.get("price_attrs") or ())
+        self.scan_all: bool = bool(spec.get("scan_all"))
+
+
+_COMPILED: List[CompiledRule] = [CompiledRule(domain, spec) for domain, spec in RULES.items()]
+_GENERIC = CompiledRule("", GENERIC_RULE)
+
+
+def rule_for(url: str) -> CompiledRule:
+    host = (urlparse(url).hostname or "").lower()
+    for rule in _COMPILED:
+        if host == rule.domain or host.endswith("." + rule.domain):
+            return rule
+    return _GENERIC
+
+
+def store_for(url: str) -> str:
+    return rule_for(url).store
+
+
+def parse_price_text(text: Optional[str]) -> Optional[str]:
+    """Extrae precio en formato MXN (ej. $12.50, 12.50, $ 99.00)."""
+    if not text:
+        return None
+    text = text.replace(",", "")
+    match = _PRICE_SYMBOL.search(text) or _PRICE_NUMBER.search(text)
+    return match.group(1) if match else None
+
+
+def _text(el: Any) -> str:
+    return _SPACES.sub(" ", el.text_content()).strip()
+
+
+def _price_of(el: Any, attrs: Tuple[str, ...]) -> Optional[str]:
+    for attr in attrs:
+        value = el.get(attr)
+        if value:
+            return parse_price_text(value)
+    return parse_price_text(_text(el))
+
+
+def _tree(html: str) -> Any:
+    try:
+        return lxml.html.fromstring(html)
+    except ValueError:
+        # str con declaracion de encoding: lxml exige bytes
+        return lxml.html.fromstring(html.encode("utf-8"))
+
+
+def extract(html: str, url: str) -> Dict[str, Any]:
+    """Aplica la regla del dominio de url. Devuelve {url, store, price, name}."""
+    rule = rule_for(url)
+    out: Dict[str, Any] = {"url": url, "store": rule.store, "price": None, "name": None}
+    if not html or not html.strip():
+        return out
+    try:
+        tree = _tree(html)
+    except Exception:
+        return out
+    for el in rule.price_xp(tree):
+        out["price"] = _price_of(el, rule.price_attrs)
+        if out["price"] or not rule.scan_all:
+            break
+    for el in rule.name_xp(tree):
+        name = _text(el)
+        if not rule.scan_all:
+            out["name"] = name[:200] or None
+            break
+        if name and len(name) < 300:
+            out["name"] = name[:200]
+            break
+    return out
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Planificador de scraping por dominio.
+- Concurrencia maxima por dominio (SCRAPE_DOMAIN_CONCURRENCY) y espera de cortesia entre
+  inicios de peticion al mismo dominio (SCRAPE_DOMAIN_DELAY_MS); la espera se reserva sin lock.
+- Reintentos con backoff exponencial y jitter (SCRAPE_RETRIES, SCRAPE_BACKOFF_MS).
+- Circuit breaker por dominio: se abre tras SCRAPE_BREAKER_FAILURES fallos/timeouts seguidos y deja
+  de pagar el timeout. Pasado SCRAPE_BREAKER_OPEN_S se prueba solo (probe en segundo plano con la
+  ultima URL fallida); si falla vuelve a abrir con el doble de espera (tope SCRAPE_BREAKER_MAX_OPEN_S).
+  El hueco de prueba se libera si el intento se cancela (stragglers, cliente desconectado) y el probe
+  corre en un contexto vacio (sin el deadline ni la traza de la peticion que abrio el breaker).
+Con deadline de peticion (app/deadline.py) cada intento usa como timeout el tiempo restante y no se
+reintenta si no queda tiempo para otro intento (SCRAPE_MIN_ATTEMPT_MS). Un timeout causado por ese
+recorte se anota como corte de deadline y no cuenta como fallo del dominio para el breaker.
+Estado y latencias por dominio en snapshot() (/stats y /health).
+"""
+import asyncio
+import contextvars
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from app import deadline, tracing
+from app.metrics import SCRAPE_FETCH
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor de _attempt() cuando vence el timeout del intento
+_TIMED_OUT = object()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, open_s: float, max_open_s: float):
+        self.failure_threshold = failure_threshold
+        self.base_open_s = open_s
+        self.max_open_s = max_open_s
+        self.open_s = open_s
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_s:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """El hueco de prueba concedido por allow() no se uso (o el intento se cancelo)."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_s = self.base_open_s
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """Devuelve True si esta falla abrio el breaker."""
+        self.consecutive_failures += 1
+        was_half_open = self.state == HALF_OPEN
+        self._probing = False
+        if was_half_open or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            if was_half_open:
+                self.open_s = min(self.open_s * 2, self.max_open_s)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            return True
+        return False
+
+
+class DomainState:
+    def __init__(self, domain: str, concurrency: int, breaker: CircuitBreaker):
+        self.domain = domain
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.breaker = breaker
+        self.next_slot = 0.0
+        self.in_flight = 0
+        self.last_failed_url: Optional[str] = None
+        self.probe_pending = False
+        self.latencies_ms: Deque[float] = deque(maxlen=200)
+        self.stats: Dict[str, int] = {
+            "requests": 0, "failures": 0, "retries": 0, "skipped": 0, "probes": 0, "deadline_cuts": 0,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies_ms)
+        out: Dict[str, Any] = dict(self.stats)
+        out["state"] = self.breaker.state
+        out["consecutive_failures"] = self.breaker.consecutive_failures
+        out["opens"] = self.breaker.opens
+        out["open_s"] = self.breaker.open_s
+        out["in_flight"] = self.in_flight
+        if lat:
+            out["latency_ms"] = {
+                "avg": round(sum(lat) / len(lat), 1),
+                "p50": round(lat[len(lat) // 2], 1),
+                "p95": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 1),
+            }
+        return out
+
+
+# Resultado de un intento: (valor, fallo?, reintentable?)
+Attempt = Tuple[Any, bool, bool]
+
+
+class ScrapeScheduler:
+    def __init__(self):
+        self.concurrency: int = int(os.getenv("SCRAPE_DOMAIN_CONCURRENCY", "2"))
+        self.delay_s: float = float(os.getenv("SCRAPE_DOMAIN_DELAY_MS", "250")) / 1000.0
+        self.retries: int = int(os.getenv("SCRAPE_RETRIES", "1"))
+        self.backoff_s: float = float(os.getenv("SCRAPE_BACKOFF_MS", "200")) / 1000.0
+        self.failure_threshold: int = int(os.getenv("SCRAPE_BREAKER_FAILURES", "3"))
+        self.open_s: float = float(os.getenv("SCRAPE_BREAKER_OPEN_S", "60"))
+        self.max_open_s: float = float(os.getenv("SCRAPE_BREAKER_MAX_OPEN_S", "900"))
+        self.min_attempt_s: float = float(os.getenv("SCRAPE_MIN_ATTEMPT_MS", "200")) / 1000.0
+        self._domains: Dict[str, DomainState] = {}
+        self._probe_fn: Optional[Callable[[str, float], Awaitable[Attempt]]] = None
+        self._probes: Set["asyncio.Future[Any]"] = set()
+
+    def domain_of(self, url: str) -> str:
+        host = (urlparse(url).hostname or "").lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def _state(self, domain: str) -> DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.open_s, self.max_open_s)
+            state = self._domains[domain] = DomainState(domain, self.concurrency, breaker)
+        return state
+
+    def set_probe(self, fn: Callable[[str, float], Awaitable[Attempt]]) -> None:
+        """Funcion usada para probar un dominio con el breaker abierto (url, timeout) -> Attempt."""
+        self._probe_fn = fn
+
+    async def run(
+        self,
+        url: str,
+        fn: Callable[[float], Awaitable[Attempt]],
+        timeout: float = 10.0,
+    ) -> Tuple[Any, str]:
+        """
+        Ejecuta fn(timeout) respetando las reglas del dominio de url.
+        fn devuelve (valor, fallo, reintentable). Resultado: (valor, status) con status
+        ok | failed | circuit_open | deadline.
+        """
+        state = self._state(self.domain_of(url))
+        breaker = state.breaker
+        if not breaker.allow():
+            state.stats["skipped"] += 1
+            return None, "circuit_open"
+        # allow() solo deja pasar en half_open concediendo el hueco de prueba
+        probe = breaker.state == HALF_OPEN
+        settled = False
+
+        value: Any = None
+        try:
+            for attempt in range(self.retries + 1):
+                backoff = self.backoff_s * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5) if attempt > 0 else 0.0
+                left = deadline.remaining()
+                attempt_timeout = timeout if left is None else min(timeout, left - backoff)
+                if attempt_timeout < self.min_attempt_s:
+                    deadline.cut("scrape_retry" if attempt > 0 else "scrape_fetch", "no_time")
+                    if attempt == 0:
+                        return None, "deadline"
+                    break
+                if attempt > 0:
+                    state.stats["retries"] += 1
+                    await asyncio.sleep(backoff)
+                value, failed, retryable = await self._attempt(state, url, fn, attempt_timeout)
+                if value is _TIMED_OUT:
+                    value = None
+                    if attempt_timeout < timeout:
+                        # El timeout lo puso el deadline de la peticion, no el dominio: no cuenta para el breaker
+                        state.stats["deadline_cuts"] += 1
+                        deadline.cut("scrape_fetch", "timeout")
+                        return None, "deadline"
+                if not failed:
+                    breaker.record_success()
+                    settled = True
+                    return value, "ok"
+                state.stats["failures"] += 1
+                state.last_failed_url = url
+                settled = True
+                if breaker.record_failure():
+                    self._schedule_probe(state)
+                    break
+                if not retryable:
+                    break
+            return value, "failed"
+        finally:
+            # Sin exito ni fallo registrado (deadline, cancelacion): el hueco de prueba vuelve a quedar libre
+            if probe and not settled:
+                breaker.release_probe()
+
+    async def _attempt(
+        self, state: DomainState, url: str, fn: Callable[[float], Awaitable[Attempt]], timeout: float
+    ) -> Attempt:
+        async with state.semaphore:
+            now = time.monotonic()
+            slot = max(state.next_slot, now)
+            state.next_slot = slot + self.delay_s
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            state.stats["requests"] += 1
+            state.in_flight += 1
+            start = time.perf_counter()
+            outcome = "error"
+            fetch_span = tracing.span("scrape.fetch", domain=state.domain, courtesy_wait_ms=round(max(0.0, slot - now) * 1000.0, 1))
+            try:
+                with fetch_span:
+                    value, failed, retryable = await asyncio.wait_for(fn(timeout), timeout=timeout)
+                    fetch_span.set(status=getattr(value, "status", None))
+                outcome = "failed" if failed else "ok"
+                return value, failed, retryable
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                return _TIMED_OUT, True, True
+            except Exception:
+                return None, True, True
+            finally:
+                state.in_flight -= 1
+                elapsed = time.perf_counter() - start
+                state.latencies_ms.append(elapsed * 1000.0)
+                SCRAPE_FETCH.observe(elapsed, state.domain, outcome)
+                fetch_span.set(outcome=outcome)
+
+    def _schedule_probe(self, state: DomainState, delay: Optional[float] = None) -> None:
+        """Un probe pendiente por dominio; el callback corre en un contexto vacio (sin deadline ni traza)."""
+        if self._probe_fn is None or state.probe_pending:
+            return
+        state.probe_pending = True
+        loop = asyncio.get_running_loop()
+        wait = state.breaker.open_s if delay is None else delay
+        loop.call_later(wait, self._start_probe, state, context=contextvars.Context())
+
+    def _start_probe(self, state: DomainState) -> None:
+        task = asyncio.ensure_future(self._probe(state))
+        self._probes.add(task)
+        task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, state: DomainState) -> None:
+        state.probe_pending = False
+        breaker = state.breaker
+        url = state.last_failed_url
+        if not url or self._probe_fn is None or breaker.state == CLOSED:
+            return
+        if not breaker.allow():
+            # Sigue abierto, o una peticion tiene el hueco de prueba: se reintenta mas tarde
+            left = breaker.opened_at + breaker.open_s - time.monotonic()
+            self._schedule_probe(state, left if left > 0 else breaker.open_s)
+            return
+        state.stats["probes"] += 1
+        settled = False
+        try:
+            _, failed, _ = await self._attempt(state, url, lambda t: self._probe_fn(url, t), min(5.0, self.open_s))
+            settled = True
+            if failed:
+                breaker.record_failure()
+                self._schedule_probe(state)
+            else:
+                breaker.record_success()
+        finally:
+            if not settled:
+                breaker.release_probe()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {domain: state.snapshot() for domain, state in sorted(self._domains.items())}
+
+    def breaker_states(self) -> Dict[str, str]:
+        return {domain: state.breaker.state for domain, state in sorted(self._domains.items())}
+
+
+scrape_scheduler = ScrapeScheduler()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Almacen persistente (SQLite) de precios scrapeados por URL.
+Guarda precio, nombre, tienda, fetched_at, ETag y Last-Modified de cada pagina.
+- Dentro de PRICE_STORE_FRESH_S desde la ultima validacion se sirve del almacen sin red.
+- Despues se revalida con GET condicional (If-None-Match / If-Modified-Since): un 304 evita descarga y parseo.
+sqlite3 es sincrono: las operaciones corren en un hilo (asyncio.to_thread) para no bloquear el event loop.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scraped_prices (
+    url TEXT PRIMARY KEY,
+    store TEXT,
+    price TEXT,
+    name TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    validated_at REAL NOT NULL
+)
+"""
+
+_COLUMNS = ("url", "store", "price", "name", "etag", "last_modified", "fetched_at", "validated_at")
+
+
+class PriceStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or os.getenv("PRICE_STORE_PATH", "data/prices.sqlite3")
+        self.fresh_s: float = float(os.getenv("PRICE_STORE_FRESH_S", "3600"))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "revalidated": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM scraped_prices WHERE url = ?", (url,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def _put_sync(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO scraped_prices ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                tuple(record.get(c) for c in _COLUMNS),
+            )
+            conn.commit()
+
+    def _touch_sync(self, url: str, validated_at: float) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE scraped_prices SET validated_at = ? WHERE url = ?", (validated_at, url))
+            conn.commit()
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.to_thread(self._get_sync, url)
+        except Exception:
+            self.stats["errors"] += 1
+            return None
+
+    async def put(
+        self,
+        url: str,
+        parsed: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        now = time.time()
+        record = {
+            "url": url,
+            "store": parsed.get("store"),
+            "price": parsed.get("price"),
+            "name": parsed.get("name"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "validated_at": now,
+        }
+        try:
+            await asyncio.to_thread(self._put_sync, record)
+            self.stats["writes"] += 1
+        except Exception:
+            self.stats["errors"] += 1
+        return record
+
+    async def touch(self, url: str) -> None:
+        """Marca la entrada como revalidada (respuesta 304)."""
+        try:
+            await asyncio.to_thread(self._touch_sync, url, time.time())
+        except Exception:
+            self.stats["errors"] += 1
+
+    def is_fresh(self, record: Dict[str, Any]) -> bool:
+        return time.time() - float(record.get("validated_at") or 0) < self.fresh_s
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+price_store = PriceStore()
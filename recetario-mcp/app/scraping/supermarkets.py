@@ -1,151 +1,274 @@
 #!/usr/bin/env python3
 """
-Scraping de paginas de supermercados (Walmart, Soriana, Chedraui) para extraer precio y nombre.
-Sin APIs de tienda: solo HTTP + parse HTML. Selectores pueden cambiar si las paginas actualizan.
+Scraping de paginas de supermercados (Walmart, Soriana, Chedraui, HEB, La Comer) para extraer precio y nombre.
+Sin APIs de tienda: solo HTTP + parse HTML. Los selectores por dominio estan en app/scraping/rules.py.
+Los resultados se guardan por URL en app/scraping/store.py y se revalidan con GET condicional.
+La descarga es por chunks con tope de bytes (SCRAPE_MAX_BYTES); precio y nombre se buscan en
+datos estructurados mientras llegan (app/scraping/early.py) y el parseo DOM queda como fallback.
 """
-import re
-from typing import Any, Dict, List, Optional
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
 
-import aiohttp
-from bs4 import BeautifulSoup
+from app import deadline, tracing
+from app.net.client import http_client
+from app.scraping.early import EarlyExtractor
+from app.scraping.parser_pool import parser_pool
+from app.scraping.rules import extract, parse_price_text, store_for
+from app.scraping.scheduler import Attempt, scrape_scheduler
+from app.scraping.store import price_store
 
 
-async def fetch_html(url: str, timeout: int = 10) -> Optional[str]:
-    """Obtiene el HTML de una URL."""
+MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(3 * 1024 * 1024)))
+CHUNK_BYTES = int(os.getenv("SCRAPE_CHUNK_BYTES", "65536"))
+
+scrape_stats: Dict[str, int] = {
+    "fetches": 0,
+    "bytes_read": 0,
+    "early_exits": 0,
+    "truncated": 0,
+    "dom_fallbacks": 0,
+    # Extraccion temprana con precio ilegible: se parseo el DOM de todos modos
+    "early_unparsed": 0,
+    # scrape_price lanzo una excepcion (se entrega como resultado con error)
+    "errors": 0,
+}
+
+
+class FetchResult:
+    __slots__ = ("status", "text", "etag", "last_modified", "extracted", "truncated")
+
+    def __init__(
+        self,
+        status: int,
+        text: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        extracted: Optional[Dict[str, Any]] = None,
+        truncated: bool = False,
+    ):
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.extracted = extracted
+        self.truncated = truncated
+
+
+async def fetch_page(
+    url: str,
+    timeout: int = 10,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    extract: bool = False,
+    max_bytes: Optional[int] = None,
+) -> Optional[FetchResult]:
+    """
+    GET por chunks con tope de bytes (condicional si hay etag/last_modified).
+    extract=True: busca precio/nombre estructurados mientras llegan los bytes y corta la descarga
+    en cuanto los encuentra (FetchResult.extracted). 304 u otro status != 200 -> FetchResult sin texto.
+    None si falla la conexion.
+    """
     if not url or not url.startswith("http"):
         return None
+    headers: Dict[str, str] = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    cap = MAX_BYTES if max_bytes is None else max_bytes
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=timeout) as r:
-                if r.status != 200:
-                    return None
-                return await r.text()
+        async with http_client.get(url, headers=headers, timeout=timeout) as r:
+            if r.status == 304:
+                return FetchResult(304)
+            if r.status != 200:
+                return FetchResult(r.status)
+            scrape_stats["fetches"] += 1
+            encoding = r.charset or "utf-8"
+            extractor = EarlyExtractor(encoding)
+            truncated = False
+            async for chunk in r.content.iter_chunked(CHUNK_BYTES):
+                scrape_stats["bytes_read"] += len(chunk)
+                if extractor.feed(chunk) and extract:
+                    scrape_stats["early_exits"] += 1
+                    truncated = True
+                    break
+                if len(extractor.buffer) >= cap:
+                    scrape_stats["truncated"] += 1
+                    truncated = True
+                    break
+            if truncated:
+                r.close()
+            text = bytes(extractor.buffer[:cap]).decode(encoding, errors="replace")
+            return FetchResult(
+                200,
+                text,
+                r.headers.get("ETag"),
+                r.headers.get("Last-Modified"),
+                extracted=extractor.result() if extractor.done else None,
+                truncated=truncated,
+            )
     except Exception:
         return None
 
 
-def _infer_store(url: str) -> str:
-    url_lower = url.lower()
-    if "walmart" in url_lower:
-        return "Walmart"
-    if "soriana" in url_lower:
-        return "Soriana"
-    if "chedraui" in url_lower:
-        return "Chedraui"
-    return "Otro"
+async def fetch_html(url: str, timeout: int = 10) -> Optional[str]:
+    """Obtiene el HTML de una URL."""
+    page = await fetch_page(url, timeout=timeout)
+    return page.text if page is not None else None
 
 
-def _parse_price_from_text(text: str) -> Optional[str]:
-    """Extrae precio en formato MXN (ej. $12.50, 12.50, $ 99.00)."""
-    if not text:
-        return None
-    text = text.replace(",", "")
-    match = re.search(r"\$\s*(\d+\.?\d*)", text)
-    if match:
-        return match.group(1)
-    match = re.search(r"(\d+\.?\d*)\s*(?:MXN|pesos)?", text, re.I)
-    if match:
-        return match.group(1)
-    return None
-
-
-def _parse_walmart(html: str, url: str) -> Dict[str, Any]:
-    """Extrae precio y nombre de pagina Walmart (selectores pueden variar)."""
-    out = {"url": url, "store": "Walmart", "price": None, "name": None}
-    if not html:
-        return out
-    soup = BeautifulSoup(html, "lxml")
-    price_sel = soup.select_one("[data-automation='product-price'], .price-main .price, [itemprop='price']")
-    if price_sel:
-        content = price_sel.get("content") or price_sel.get_text(strip=True)
-        out["price"] = _parse_price_from_text(content)
-    name_sel = soup.select_one("h1[data-automation='product-title'], .product-title, [itemprop='name']")
-    if name_sel:
-        out["name"] = name_sel.get_text(strip=True)[:200]
-    return out
+async def _fetch_attempt(
+    url: str,
+    timeout: float,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Attempt:
+    """Un intento para el planificador: 5xx/429/conexion son reintentables; 403 cuenta como fallo sin reintento."""
+    page = await fetch_page(url, timeout=timeout, etag=etag, last_modified=last_modified, extract=True)
+    if page is None:
+        return None, True, True
+    if page.status >= 500 or page.status == 429:
+        return page, True, True
+    if page.status == 403:
+        return page, True, False
+    return page, False, False
 
 
-def _parse_soriana(html: str, url: str) -> Dict[str, Any]:
-    """Extrae precio y nombre de pagina Soriana (selectores pueden variar)."""
-    out = {"url": url, "store": "Soriana", "price": None, "name": None}
-    if not html:
-        return out
-    soup = BeautifulSoup(html, "lxml")
-    price_sel = soup.select_one(".price, [itemprop='price'], .product-price")
-    if price_sel:
-        content = price_sel.get("content") or price_sel.get_text(strip=True)
-        out["price"] = _parse_price_from_text(content)
-    name_sel = soup.select_one("h1, .product-name, [itemprop='name']")
-    if name_sel:
-        out["name"] = name_sel.get_text(strip=True)[:200]
-    return out
+scrape_scheduler.set_probe(_fetch_attempt)
 
 
-def _parse_chedraui(html: str, url: str) -> Dict[str, Any]:
-    """Extrae precio y nombre de pagina Chedraui (selectores pueden variar)."""
-    out = {"url": url, "store": "Chedraui", "price": None, "name": None}
-    if not html:
-        return out
-    soup = BeautifulSoup(html, "lxml")
-    price_sel = soup.select_one(".price, [itemprop='price'], .product-price, [data-price]")
-    if price_sel:
-        content = price_sel.get("content") or price_sel.get("data-price") or price_sel.get_text(strip=True)
-        out["price"] = _parse_price_from_text(str(content))
-    name_sel = soup.select_one("h1, .product-name, [itemprop='name']")
-    if name_sel:
-        out["name"] = name_sel.get_text(strip=True)[:200]
-    return out
+def _from_record(record: Dict[str, Any], freshness: str) -> Dict[str, Any]:
+    fetched_at = float(record.get("fetched_at") or 0)
+    return {
+        "url": record.get("url"),
+        "store": record.get("store"),
+        "price": record.get("price"),
+        "name": record.get("name"),
+        "freshness": freshness,
+        "fetched_at": datetime.fromtimestamp(fetched_at, timezone.utc).isoformat() if fetched_at else None,
+        "age_s": round(max(0.0, time.time() - fetched_at), 1) if fetched_at else None,
+    }
 
 
-def _parse_generic(html: str, url: str) -> Dict[str, Any]:
-    """Fallback: intenta extraer cualquier precio/nombre en la pagina."""
-    out = {"url": url, "store": _infer_store(url), "price": None, "name": None}
-    if not html:
-        return out
-    soup = BeautifulSoup(html, "lxml")
-    for sel in soup.select("[itemprop='price'], .price, [data-price]"):
-        content = sel.get("content") or sel.get("data-price") or sel.get_text(strip=True)
-        p = _parse_price_from_text(str(content))
-        if p:
-            out["price"] = p
-            break
-    for sel in soup.select("h1, [itemprop='name'], .product-title"):
-        t = sel.get_text(strip=True)
-        if t and len(t) < 300:
-            out["name"] = t[:200]
-            break
+async def scrape_price(url: str, timeout: int = 10) -> Dict[str, Any]:
+    with tracing.span("scrape.price", url=url) as sp:
+        out = await _scrape_price(url, timeout)
+        sp.set(freshness=out.get("freshness"))
+        if out.get("skipped"):
+            sp.set(skipped=out["skipped"])
     return out
 
 
-def _parse_by_store(html: str, url: str) -> Dict[str, Any]:
-    url_lower = url.lower()
-    if "walmart" in url_lower:
-        return _parse_walmart(html, url)
-    if "soriana" in url_lower:
-        return _parse_soriana(html, url)
-    if "chedraui" in url_lower:
-        return _parse_chedraui(html, url)
-    return _parse_generic(html, url)
+async def _scrape_price(url: str, timeout: int = 10) -> Dict[str, Any]:
+    """
+    Precio de una URL pasando por el almacen persistente.
+    freshness: cached (vigente en almacen), revalidated (304), live (descargada y parseada),
+    stale (fallo la red; ultimo valor conocido) o None (sin datos).
+    La descarga pasa por el planificador por dominio (concurrencia, reintentos, circuit breaker);
+    con el breaker abierto (o sin tiempo en el deadline) no se hace la peticion y el resultado lleva
+    skipped="circuit_open" / "deadline".
+    """
+    record = await price_store.get(url)
+    if record is not None and price_store.is_fresh(record):
+        price_store.stats["hits"] += 1
+        return _from_record(record, "cached")
+
+    etag = record.get("etag") if record is not None else None
+    last_modified = record.get("last_modified") if record is not None else None
+    page, status = await scrape_scheduler.run(
+        url, lambda t: _fetch_attempt(url, t, etag=etag, last_modified=last_modified), timeout=timeout
+    )
+
+    if page is not None and page.status == 304 and record is not None:
+        price_store.stats["revalidated"] += 1
+        await price_store.touch(url)
+        return _from_record(record, "revalidated")
+
+    if page is not None and page.text:
+        price_store.stats["misses"] += 1
+        parsed = None
+        if page.extracted:
+            price = parse_price_text(page.extracted["price"])
+            if price is not None:
+                parsed = {"url": url, "store": store_for(url), "price": price, "name": page.extracted["name"]}
+            else:
+                # Marcador sin precio legible ("Desde $", vacio, formato local): se parsea el DOM de lo descargado
+                scrape_stats["early_unparsed"] += 1
+        if parsed is None:
+            scrape_stats["dom_fallbacks"] += 1
+            with tracing.span("parse", mode=parser_pool.mode, bytes=len(page.text)):
+                parsed = await parser_pool.parse(page.text, url)
+            if page.extracted and not parsed.get("name"):
+                parsed = {**parsed, "name": page.extracted["name"]}
+        if parsed.get("price") is not None:
+            stored = await price_store.put(url, parsed, etag=page.etag, last_modified=page.last_modified)
+            return _from_record(stored, "live")
+        return {**parsed, "freshness": "live", "fetched_at": None, "age_s": None}
+
+    skipped = {"skipped": status} if status in ("circuit_open", "deadline") else {}
+    if record is not None:
+        return {**_from_record(record, "stale"), **skipped}
+    return {**extract("", url), "freshness": None, "fetched_at": None, "age_s": None, **skipped}
+
+
+async def scrape_prices_as_completed(urls: List[str], timeout: int = 10) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Como scrape_prices_supermarkets pero entrega (indice, resultado) en cuanto cada URL termina,
+    en orden de llegada (para streaming). Al vencer el deadline las pendientes se cancelan y se
+    entregan con skipped="deadline"; si el consumidor deja de iterar tambien se cancelan.
+    Si scrape_price lanza, el resultado lleva la URL, price None y error="scrape_failed".
+    """
+    urls = urls[:10]
+    if not urls:
+        return
+    with tracing.span("scrape", urls=len(urls)) as sp:
+        tasks = {asyncio.ensure_future(scrape_price(u, timeout=timeout)): i for i, u in enumerate(urls)}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in sorted(done, key=tasks.get):
+                    if task.exception() is not None:
+                        scrape_stats["errors"] += 1
+                        url = urls[tasks[task]]
+                        yield tasks[task], {
+                            "url": url, "store": store_for(url), "price": None, "name": None, "freshness": None,
+                            "error": "scrape_failed",
+                        }
+                    else:
+                        yield tasks[task], task.result()
+            if pending:
+                # Stragglers: se cancelan al vencer el deadline
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                deadline.cut("scraping", f"{len(pending)} stragglers cancelled")
+                sp.set(cancelled=len(pending))
+                for task in sorted(pending, key=tasks.get):
+                    url = urls[tasks[task]]
+                    yield tasks[task], {"url": url, "store": store_for(url), "price": None, "name": None, "freshness": None, "skipped": "deadline"}
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
 
 async def scrape_prices_supermarkets(urls: List[str], timeout: int = 10) -> List[Dict[str, Any]]:
     """
-    Obtiene HTML de cada URL y extrae precio y nombre segun el dominio (Walmart, Soriana, Chedraui).
-    Devuelve una lista con un dict por URL (price, name, store, url). Si falla, devuelve dict con price/name None.
+    Obtiene HTML de cada URL y extrae precio y nombre segun el dominio (reglas en app/scraping/rules.py).
+    Devuelve una lista con un dict por URL (price, name, store, url, freshness, fetched_at, age_s).
+    Si falla, devuelve dict con price/name None.
     """
     if not urls:
         return []
 
-    async def one(url: str) -> Dict[str, Any]:
-        html = await fetch_html(url, timeout=timeout)
-        return _parse_by_store(html or "", url)
-
-    results = await asyncio.gather(*[one(u) for u in urls[:10]], return_exceptions=True)
-    out: List[Dict[str, Any]] = []
-    for r in results:
-        if isinstance(r, Exception):
-            out.append({"url": "", "store": "Otro", "price": None, "name": None})
-        else:
-            out.append(r)
+    urls = urls[:10]
+    out: List[Dict[str, Any]] = [{} for _ in urls]
+    async for i, result in scrape_prices_as_completed(urls, timeout=timeout):
+        out[i] = result
     return out
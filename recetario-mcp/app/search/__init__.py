@@ -3,5 +3,9 @@ from app.search.recipes import recipes_search
 from app.search.ingredients import ingredients_search
 from app.search.prices import prices_search
 from app.search.stores import stores_search
+from app.search.menu import menu_search
+from app.search.by_ingredients import recipes_by_ingredients
+from app.search.price_history import price_history_search
+from app.search.menu_optimize import menu_optimize
 
-__all__ = ["provider_search", "recipes_search", "ingredients_search", "prices_search", "stores_search"]
+__all__ = ["provider_search", "recipes_search", "ingredients_search", "prices_search", "stores_search", "menu_search", "recipes_by_ingredients", "price_history_search", "menu_optimize"]
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+recetario.recipes_by_ingredients - "Que puedo cocinar con X": recetas del indice local por ingredientes.
+- IngredientIndex: posting lists (numpy int32) ingrediente -> recetas, construidas desde doc_ingredients del
+  indice local (app/search/local_index.py) y refrescadas cada INGREDIENT_INDEX_REFRESH_S con lo nuevo.
+- Puntaje vectorizado (np.bincount sobre las posting lists): cobertura de los ingredientes pedidos,
+  + parte de la receta que ya se tiene, + bono por gustos; las recetas con disgustos quedan fuera.
+- Sin resultados en el indice, una sola busqueda en Brave ("recetas con huevo y jitomate") que ademas
+  alimenta el indice para la siguiente vez.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.search.ingredient_catalog import INGREDIENT_IDS, INGREDIENTS, extract, resolve
+from app.search.local_index import local_index
+from app.search.recipes import recipes_search
+
+# Pesos del puntaje: cobertura de lo pedido + fraccion de la receta cubierta + gustos
+FIT_WEIGHT = 0.3
+LIKE_WEIGHT = 0.1
+
+TOP_K_DEFAULT = 10
+TOP_K_MAX = 50
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.refresh_s: float = float(os.getenv("INGREDIENT_INDEX_REFRESH_S", "5"))
+        self._docs: Dict[int, Tuple[int, ...]] = {}
+        self._since: float = 0.0
+        self._checked: float = 0.0
+        self._lock = asyncio.Lock()
+        # Arreglos densos (fila = receta): ids de documento, numero de ingredientes y posting lists
+        self._arrays: Tuple[np.ndarray, np.ndarray, List[np.ndarray]] = (
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            [np.zeros(0, dtype=np.int32) for _ in INGREDIENTS],
+        )
+        self.stats: Dict[str, Any] = {"refreshes": 0, "rebuilds": 0, "queries": 0, "last_query_ms": 0.0, "last_rebuild_ms": 0.0}
+
+    def load(self, rows: Sequence[Tuple[int, Sequence[int]]]) -> None:
+        """Agrega o reemplaza recetas (doc_id, ids de ingredientes) y reconstruye los arreglos."""
+        for doc_id, ings in rows:
+            self._docs[int(doc_id)] = tuple(ings)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        start = time.perf_counter()
+        n = len(self._docs)
+        doc_ids = np.fromiter(self._docs.keys(), dtype=np.int64, count=n)
+        sizes = np.fromiter((len(v) for v in self._docs.values()), dtype=np.int32, count=n)
+        total = int(sizes.sum())
+        ing = np.fromiter((i for v in self._docs.values() for i in v), dtype=np.int32, count=total)
+        rows = np.repeat(np.arange(n, dtype=np.int32), sizes)
+        order = np.argsort(ing, kind="stable")
+        bounds = np.searchsorted(ing[order], np.arange(len(INGREDIENTS) + 1))
+        sorted_rows = rows[order]
+        postings = [sorted_rows[bounds[i]:bounds[i + 1]] for i in range(len(INGREDIENTS))]
+        # Corre en un hilo: se publica todo junto para que score() no mezcle arreglos de dos versiones
+        self._arrays = (doc_ids, sizes, postings)
+        self.stats["rebuilds"] += 1
+        self.stats["last_rebuild_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    @property
+    def doc_ids(self) -> np.ndarray:
+        return self._arrays[0]
+
+    async def refresh(self) -> None:
+        """Trae del indice local las recetas nuevas o actualizadas (como mucho cada refresh_s)."""
+        if not local_index.available or time.monotonic() - self._checked < self.refresh_s:
+            return
+        async with self._lock:
+            if time.monotonic() - self._checked < self.refresh_s:
+                return
+            self._checked = time.monotonic()
+            try:
+                changed = await asyncio.to_thread(local_index.changed_recipes_sync, self._since)
+            except Exception:
+                return
+            self.stats["refreshes"] += 1
+            if not changed:
+                return
+            rows = []
+            for doc_id, last_seen, names in changed:
+                ings = [INGREDIENT_IDS[n] for n in (names or "").split("|") if n in INGREDIENT_IDS]
+                rows.append((doc_id, ings))
+                self._since = max(self._since, float(last_seen))
+            await asyncio.to_thread(self.load, rows)
+
+    def score(
+        self,
+        wanted: Sequence[int],
+        likes: Sequence[int] = (),
+        dislikes: Sequence[int] = (),
+        top_k: int = 10,
+    ) -> List[Tuple[int, float, int]]:
+        """(doc_id, puntaje, ingredientes pedidos presentes) de las top_k recetas; vectorizado sobre todas."""
+        doc_ids, sizes, postings = self._arrays
+        n = len(doc_ids)
+        base = list(wanted) or list(likes)
+        if n == 0 or not base:
+            return []
+        matched = np.bincount(np.concatenate([postings[i] for i in base]), minlength=n).astype(np.float32)
+        scores = matched / len(base) + FIT_WEIGHT * matched / np.maximum(sizes, 1)
+        if likes:
+            scores += LIKE_WEIGHT * np.bincount(np.concatenate([postings[i] for i in likes]), minlength=n)
+        scores[matched == 0] = -np.inf
+        if dislikes:
+            scores[np.concatenate([postings[i] for i in dislikes])] = -np.inf
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if candidates.size == 0:
+            return []
+        if candidates.size > top_k:
+            part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[part]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_ids[r]), float(scores[r]), int(matched[r])) for r in ranked]
+
+    def snapshot(self) -> Dict[str, Any]:
+        doc_ids, sizes, _ = self._arrays
+        return {
+            "recipes": len(doc_ids),
+            "postings": int(sizes.sum()),
+            "ingredients": len(INGREDIENTS),
+            **self.stats,
+        }
+
+
+ingredient_index = IngredientIndex()
+
+
+def _names(raw: Any) -> List[str]:
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return [str(x).strip() for x in raw if str(x).strip()]
+
+
+def _resolve_all(raw: Any) -> Tuple[List[int], List[str]]:
+    ids: List[int] = []
+    unknown: List[str] = []
+    for name in _names(raw):
+        ing = resolve(name)
+        if ing is None:
+            unknown.append(name)
+        elif ing not in ids:
+            ids.append(ing)
+    return ids, unknown
+
+
+def _receta(doc: Dict[str, Any], wanted: List[int], score: Optional[float], source: str) -> Dict[str, Any]:
+    ings = extract(doc.get("title"), doc.get("snippet"), *(doc.get("extra_snippets") or []))
+    wanted_names = {INGREDIENTS[i] for i in wanted}
+    item: Dict[str, Any] = {
+        "title": doc.get("title"),
+        "url": doc.get("url"),
+        "snippet": doc.get("snippet"),
+        "ingredientes": ings,
+        "coinciden": [n for n in ings if n in wanted_names],
+        "faltan": [n for n in ings if n not in wanted_names],
+        "source": source,
+    }
+    if score is not None:
+        item["score"] = round(score, 4)
+    if wanted:
+        item["coverage"] = round(len(item["coinciden"]) / len(wanted), 4)
+    return item
+
+
+def _top_k(value: Any) -> Optional[int]:
+    """topK del cliente (int o texto numerico) recortado a TOP_K_MAX; default si no vino; None si es invalido."""
+    if value is None or value == "":
+        return TOP_K_DEFAULT
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if not number.is_integer() or number < 1:
+        return None
+    return min(int(number), TOP_K_MAX)
+
+
+async def recipes_by_ingredients(params: Dict[str, Any]) -> Dict[str, Any]:
+    wanted, unknown = _resolve_all(params.get("ingredientes") or params.get("ingredients"))
+    likes, _ = _resolve_all(params.get("gustos"))
+    dislikes, _ = _resolve_all(params.get("disgustos"))
+    wanted = [i for i in wanted if i not in dislikes]
+    topK = _top_k(params.get("topK"))
+
+    out: Dict[str, Any] = {
+        "ingredientes": [INGREDIENTS[i] for i in wanted],
+        "gustos": [INGREDIENTS[i] for i in likes],
+        "disgustos": [INGREDIENTS[i] for i in dislikes],
+    }
+    if unknown:
+        out["no_reconocidos"] = unknown
+    if not wanted and not likes:
+        return {**out, "recetas": [], "count": 0, "error": "ingredientes requeridos"}
+    if topK is None:
+        return {**out, "recetas": [], "count": 0, "error": "topK debe ser un entero positivo"}
+
+    await ingredient_index.refresh()
+    start = time.perf_counter()
+    ranked = ingredient_index.score(wanted, likes, dislikes, topK)
+    ingredient_index.stats["queries"] += 1
+    ingredient_index.stats["last_query_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    recetas: List[Dict[str, Any]] = []
+    if ranked:
+        try:
+            docs = await asyncio.to_thread(local_index.docs_sync, [doc_id for doc_id, _, _ in ranked])
+        except Exception:
+            docs = {}
+        for doc_id, score, _ in ranked:
+            if doc_id in docs:
+                recetas.append(_receta(docs[doc_id], wanted, score, "local"))
+        out["source"] = "local"
+    else:
+        # Indice sin recetas para esta combinacion: una sola busqueda en Brave (tambien alimenta el indice)
+        names = [INGREDIENTS[i].lower() for i in (wanted or likes)]
+        query = "recetas con " + (" y ".join([", ".join(names[:-1]), names[-1]]) if len(names) > 1 else names[0])
+        res = await recipes_search({"query": query, "topK": topK, "source": "live", "priority": params.get("priority") or "interactive"})
+        disliked = {INGREDIENTS[i] for i in dislikes}
+        for r in res.get("recetas") or []:
+            item = _receta(r, wanted, None, r.get("source") or "brave")
+            if not disliked.intersection(item["ingredientes"]):
+                recetas.append(item)
+        out["source"] = res.get("source", "live")
+        if res.get("retry_after"):
+            out["retry_after"] = res["retry_after"]
+
+    out["recetas"] = recetas
+    out["count"] = len(recetas)
+    out["indexed_recipes"] = len(ingredient_index.doc_ids)
+    return out
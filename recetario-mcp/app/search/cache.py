@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Cache de resultados de busqueda delante de ProviderSearch.search.
+- L1: LRU en proceso con TTL y limite de entradas (SEARCH_CACHE_MAX_ENTRIES).
+- L2 opcional: Redis (REDIS_URL, cliente redis.asyncio), compartido entre workers.
+Las entradas vencidas se conservan hasta SEARCH_CACHE_STALE_TTL para poder servirlas como "stale".
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import redis.asyncio as redis_async  # type: ignore
+except Exception:
+    redis_async = None
+
+KEY_PREFIX = "recetario:search:"
+
+
+class CacheEntry:
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value: Dict[str, Any], stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def age_s(self) -> float:
+        return max(0.0, time.time() - self.stored_at)
+
+
+class SearchCache:
+    def __init__(self):
+        self.max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+        self.default_ttl: int = int(os.getenv("SEARCH_CACHE_TTL", "3600"))
+        self.stale_ttl: int = int(os.getenv("SEARCH_CACHE_STALE_TTL", "86400"))
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._redis = None
+        url = os.getenv("REDIS_URL") or ""
+        if url and redis_async is not None:
+            try:
+                self._redis = redis_async.Redis.from_url(url, decode_responses=True)
+            except Exception:
+                self._redis = None
+        self.stats: Dict[str, int] = {
+            "hits_l1": 0,
+            "hits_l2": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "l2_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(
+        query: str,
+        topK: int,
+        country: Optional[str],
+        search_lang: Optional[str],
+        extra_snippets: bool,
+        freshness: Optional[str],
+        offset: int,
+    ) -> str:
+        """Clave estable a partir de los parametros normalizados de busqueda."""
+        normalized = {
+            "q": " ".join((query or "").lower().split()),
+            "k": int(topK),
+            "c": (country or "").upper(),
+            "l": (search_lang or "").lower(),
+            "x": bool(extra_snippets),
+            "f": freshness or "",
+            "o": int(offset),
+        }
+        raw = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Devuelve la entrada si esta vigente (o vencida si allow_stale). None si no existe."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.fresh:
+                self.stats["hits_l1"] += 1
+                return entry
+        if self._redis is not None:
+            remote = await self._get_l2(key)
+            if remote is not None and (entry is None or remote.stored_at > entry.stored_at):
+                entry = remote
+                self._put_l1(key, entry)
+                if entry.fresh:
+                    self.stats["hits_l2"] += 1
+                    return entry
+        if entry is not None and allow_stale and time.time() < entry.expires_at + self.stale_ttl:
+            self.stats["stale_hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        return None
+
+    def peek(self, key: str) -> bool:
+        """True si hay entrada vigente en L1 (sin tocar contadores ni Redis)."""
+        entry = self._entries.get(key)
+        return entry is not None and entry.fresh
+
+    def entry(self, key: str) -> Optional[CacheEntry]:
+        """Entrada en L1, vigente o no (sin tocar contadores ni orden LRU)."""
+        return self._entries.get(key)
+
+    async def inspect(self, key: str) -> Optional[CacheEntry]:
+        """Como get(allow_stale=True) pero sin contadores: la mas reciente entre L1 y L2."""
+        entry = self._entries.get(key)
+        if (entry is None or not entry.fresh) and self._redis is not None:
+            remote = await self._get_l2(key)
+            if remote is not None and (entry is None or remote.stored_at > entry.stored_at):
+                entry = remote
+                self._put_l1(key, entry)
+        return entry
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        ttl_s = self.default_ttl if ttl is None else int(ttl)
+        if ttl_s <= 0:
+            return
+        now = time.time()
+        entry = CacheEntry(value, now, now + ttl_s)
+        self._put_l1(key, entry)
+        self.stats["sets"] += 1
+        if self._redis is not None:
+            try:
+                payload = json.dumps({"v": value, "s": entry.stored_at, "e": entry.expires_at}, ensure_ascii=False)
+                await self._redis.set(KEY_PREFIX + key, payload, ex=ttl_s + self.stale_ttl)
+            except Exception:
+                self.stats["l2_errors"] += 1
+
+    def _put_l1(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _get_l2(self, key: str) -> Optional[CacheEntry]:
+        try:
+            payload = await self._redis.get(KEY_PREFIX + key)
+        except Exception:
+            self.stats["l2_errors"] += 1
+            return None
+        if not payload:
+            return None
+        try:
+            data = json.loads(payload)
+            return CacheEntry(data["v"], float(data["s"]), float(data["e"]))
+        except Exception:
+            return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        hits = self.stats["hits_l1"] + self.stats["hits_l2"]
+        lookups = hits + self.stats["misses"] + self.stats["stale_hits"]
+        out["entries"] = len(self._entries)
+        out["max_entries"] = self.max_entries
+        out["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        out["l2"] = self._redis is not None
+        return out
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Canonicalizacion de consultas antes de Brave, para que variantes de la misma busqueda compartan
+entrada de cache y vuelo de single-flight ("Receta de huevos con tomate rojo" ~ "huevo jitomate").
+
+Por consulta se calculan dos formas:
+- upstream: la que se manda a Brave. Minusculas sin acentos, sinonimos MX aplicados ("tomate rojo" ->
+  "jitomate", "puerco" -> "cerdo"; los de ingredient_catalog.CATALOG, la misma tabla que usa
+  price_history para sus productos), sin relleno conversacional ("quiero", "como hacer", "cuanto cuesta")
+  ni palabras vacias en los extremos; en el orden original ("receta de huevos con jitomate").
+- key: la que entra en la clave de cache. Sin palabras vacias ("de", "con", "receta"...), cada termino
+  en singular (stemming ligero de plurales en espanol), sin repetir y ordenados ("huevo jitomate").
+Si quitar palabras deja la consulta vacia se conservan todas.
+
+canonicalizer lleva, por clave, cuantas consultas crudas distintas (minusculas, espacios colapsados)
+cayeron en ella: /stats "canonical".
+
+Variables de entorno:
+- QUERY_CANONICAL: 0 desactiva (la clave vuelve a ser la consulta tal cual; default 1)
+- QUERY_CANONICAL_TRACK_KEYS: claves con conteo de variantes (LRU; default 5000)
+"""
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.search.ingredient_catalog import CATALOG, MAX_PHRASE, alias_forms, fold
+
+ENABLED: bool = (os.getenv("QUERY_CANONICAL") or "1").strip().lower() not in ("0", "false", "no")
+TRACK_KEYS: int = int(os.getenv("QUERY_CANONICAL_TRACK_KEYS", "5000"))
+MAX_EXAMPLES = 8
+# Variantes crudas recordadas por clave (para no contar dos veces la misma)
+MAX_VARIANTS = 64
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_VOWELS = "aeiou"
+
+# Relleno conversacional: no cambia lo que se busca (la tool ya agrega "precio", dominios, etc.)
+FILLERS: Set[str] = {
+    "quiero", "queria", "quisiera", "como", "hacer", "hago", "preparar", "preparo", "cocinar",
+    "dame", "dime", "busca", "buscar", "buscame", "favor", "porfa", "porfavor", "me", "mi", "mis",
+    "precio", "precios", "cuanto", "cuesta", "cuestan", "vale", "valen", "costo",
+}
+# Palabras vacias: quedan en la consulta a Brave (salvo en los extremos), no en la clave
+STOPWORDS: Set[str] = {
+    "a", "al", "con", "de", "del", "e", "el", "en", "la", "las", "lo", "los", "o", "para", "por", "que",
+    "su", "sus", "u", "un", "una", "unas", "uno", "unos", "y", "receta", "recetas",
+}
+
+
+def stem(word: str) -> str:
+    """
+    Raiz comun de singular y plural, solo para la clave (no tiene que ser una palabra):
+    tacos/taco -> taco, frijoles/frijol -> frijol, chiles/chile -> chil, nueces/nuez -> nuez.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ces") and word[-4] in _VOWELS:
+        return word[:-3] + "z"
+    if word.endswith("s"):
+        word = word[:-1]
+    if len(word) > 3 and word.endswith("e") and word[-2] in "lrndjy" and word[-3] in _VOWELS:
+        word = word[:-1]
+    return word
+
+
+def _build_synonyms() -> Dict[Tuple[str, ...], str]:
+    """Sinonimos de ingredient_catalog.CATALOG (no VARIETIES) -> nombre canonico en minusculas."""
+    table: Dict[Tuple[str, ...], str] = {}
+    for name, aliases in CATALOG.items():
+        canonical = fold(name)
+        for alias in [name] + aliases:
+            for words in alias_forms(alias):
+                table.setdefault(words, canonical)
+    return table
+
+
+_SYNONYMS = _build_synonyms()
+
+
+def _terms(words: List[str]) -> List[str]:
+    """Palabras -> terminos: sinonimos de hasta MAX_PHRASE palabras (gana la frase mas larga)."""
+    terms: List[str] = []
+    i = 0
+    while i < len(words):
+        for n in range(min(MAX_PHRASE, len(words) - i), 0, -1):
+            canonical = _SYNONYMS.get(tuple(words[i:i + n]))
+            if canonical is not None:
+                terms.append(canonical)
+                i += n
+                break
+        else:
+            terms.append(words[i])
+            i += 1
+    return terms
+
+
+def canonical_forms(text: str) -> Tuple[str, str]:
+    """(upstream, key) de una consulta; ver el docstring del modulo."""
+    words = _WORD_RE.findall(fold(text))
+    if not words:
+        return (text or "").strip(), ""
+    terms = _terms(words)
+    spoken = [t for t in terms if t not in FILLERS] or terms
+    start, end = 0, len(spoken)
+    while start < end and spoken[start] in STOPWORDS:
+        start += 1
+    while end > start and spoken[end - 1] in STOPWORDS:
+        end -= 1
+    upstream = " ".join(spoken[start:end] or spoken)
+    kept = [t for t in spoken if t not in STOPWORDS] or spoken
+    key = " ".join(sorted({t.replace(" ", "_") if " " in t else stem(t) for t in kept}))
+    return upstream, key
+
+
+class KeyVariants:
+    """Variantes crudas que cayeron en una clave."""
+
+    __slots__ = ("raw", "variants", "calls")
+
+    def __init__(self, raw: str):
+        self.raw: Set[str] = {raw}
+        self.variants = 1
+        self.calls = 1
+
+
+class Canonicalizer:
+    def __init__(self, enabled: bool = ENABLED, track_keys: int = TRACK_KEYS):
+        self.enabled = enabled
+        self.track_keys = track_keys
+        self._keys: "OrderedDict[str, KeyVariants]" = OrderedDict()
+        self.stats: Dict[str, int] = {"calls": 0, "new_keys": 0, "repeats": 0, "collapsed": 0, "evicted_keys": 0}
+
+    def apply(self, text: str, kind: str = "", track: bool = True) -> Tuple[str, Optional[str]]:
+        """
+        (consulta para Brave, texto para la clave de cache). Desactivado: (text, None) y la clave sale
+        de la consulta como antes. Con track cuenta la variante cruda en la clave (kind separa tools);
+        sin track (peek de menu) solo calcula.
+        """
+        if not self.enabled:
+            return text, None
+        upstream, key = canonical_forms(text)
+        if not key:
+            return text, None
+        if track:
+            self._note(f"{kind}:{key}" if kind else key, " ".join(text.lower().split()))
+        return upstream, key
+
+    def _note(self, tracked: str, raw: str) -> None:
+        self.stats["calls"] += 1
+        item = self._keys.get(tracked)
+        if item is None:
+            self.stats["new_keys"] += 1
+            self._keys[tracked] = KeyVariants(raw)
+            if len(self._keys) > self.track_keys:
+                self._keys.popitem(last=False)
+                self.stats["evicted_keys"] += 1
+            return
+        self._keys.move_to_end(tracked)
+        item.calls += 1
+        if raw in item.raw:
+            self.stats["repeats"] += 1
+            return
+        # Variante nueva: sin canonicalizar habria sido otra entrada de cache (y otra llamada a Brave)
+        self.stats["collapsed"] += 1
+        item.variants += 1
+        if len(item.raw) < MAX_VARIANTS:
+            item.raw.add(raw)
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        ranked = sorted(self._keys.items(), key=lambda kv: (-kv[1].variants, -kv[1].calls))
+        return {
+            "enabled": self.enabled,
+            "keys": len(self._keys),
+            **self.stats,
+            "collapse_ratio": round(self.stats["collapsed"] / self.stats["calls"], 4) if self.stats["calls"] else 0.0,
+            "top": [
+                {"key": k, "variants": v.variants, "calls": v.calls, "examples": sorted(v.raw)[:MAX_EXAMPLES]}
+                for k, v in ranked[:top]
+                if v.variants > 1
+            ],
+        }
+
+
+canonicalizer = Canonicalizer()
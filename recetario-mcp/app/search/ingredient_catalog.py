@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Catalogo de ingredientes MX y extractor de menciones.
+Cada ingrediente tiene un nombre canonico (Huevo, Jitomate, ...), sinonimos (CATALOG) y variedades
+(VARIETIES); el extractor busca unos y otros en titulo/snippet/extra_snippets (sin acentos, singular
+y plural, frases de hasta 3 palabras; gana la frase mas larga: "tomate verde" -> Tomate verde, no Jitomate).
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Nombre canonico -> sinonimos: otras formas de nombrar lo mismo (sin acentos, en singular; los plurales
+# se generan). app/search/canonical.py los usa tambien para las claves de cache de las busquedas y
+# price_history para sus productos.
+CATALOG: Dict[str, List[str]] = {
+    "Huevo": ["huevo", "blanquillo"],
+    "Jitomate": ["jitomate", "tomate", "tomate rojo", "tomate saladet", "tomate bola", "tomate guaje"],
+    "Tomate verde": ["tomate verde", "tomatillo", "tomate de cascara", "tomate de fresadilla"],
+    "Cebolla": ["cebolla"],
+    "Ajo": ["ajo", "diente de ajo"],
+    "Chile serrano": ["chile serrano", "serrano"],
+    "Chile jalapeno": ["chile jalapeno", "jalapeno", "chile cuaresmeno", "cuaresmeno"],
+    "Chile poblano": ["chile poblano", "poblano"],
+    "Chile chipotle": ["chipotle", "chile chipotle"],
+    "Chile guajillo": ["guajillo", "chile guajillo"],
+    "Chile ancho": ["chile ancho"],
+    "Chile de arbol": ["chile de arbol"],
+    "Chile verde": ["chile verde"],
+    "Cilantro": ["cilantro"],
+    "Epazote": ["epazote"],
+    "Perejil": ["perejil"],
+    "Oregano": ["oregano"],
+    "Comino": ["comino"],
+    "Canela": ["canela"],
+    "Aguacate": ["aguacate", "palta"],
+    "Limon": ["limon"],
+    "Naranja": ["naranja"],
+    "Frijol": ["frijol", "frejol", "poroto"],
+    "Lenteja": ["lenteja"],
+    "Garbanzo": ["garbanzo"],
+    "Arroz": ["arroz"],
+    "Tortilla": ["tortilla", "tortilla de maiz"],
+    "Tortilla de harina": ["tortilla de harina"],
+    "Maiz": ["maiz"],
+    "Elote": ["elote", "granos de elote", "mazorca", "choclo"],
+    "Pollo": ["pollo"],
+    "Res": ["res", "carne de res"],
+    "Cerdo": ["cerdo", "puerco", "carne de cerdo", "carne de puerco", "marrano", "cochino"],
+    "Chorizo": ["chorizo"],
+    "Jamon": ["jamon"],
+    "Tocino": ["tocino"],
+    "Salchicha": ["salchicha"],
+    "Atun": ["atun"],
+    "Pescado": ["pescado", "filete de pescado"],
+    "Camaron": ["camaron"],
+    "Queso": ["queso"],
+    "Queso fresco": ["queso fresco"],
+    "Crema": ["crema"],
+    "Leche": ["leche"],
+    "Mantequilla": ["mantequilla"],
+    "Yogur": ["yogur", "yogurt", "yoghurt"],
+    "Aceite": ["aceite"],
+    "Manteca": ["manteca"],
+    "Harina": ["harina", "harina de trigo"],
+    "Azucar": ["azucar"],
+    "Miel": ["miel"],
+    "Chocolate": ["chocolate"],
+    "Vainilla": ["vainilla"],
+    "Avena": ["avena"],
+    "Pan": ["pan"],
+    "Pasta": ["pasta"],
+    "Papa": ["papa", "patata"],
+    "Zanahoria": ["zanahoria"],
+    "Calabaza": ["calabaza"],
+    "Chayote": ["chayote"],
+    "Nopal": ["nopal", "nopalito"],
+    "Champinon": ["champinon", "champignon"],
+    "Espinaca": ["espinaca"],
+    "Lechuga": ["lechuga"],
+    "Pepino": ["pepino"],
+    "Brocoli": ["brocoli"],
+    "Coliflor": ["coliflor"],
+    "Pimiento": ["pimiento", "pimiento morron", "morron", "chile morron"],
+    "Platano": ["platano"],
+    "Manzana": ["manzana"],
+    "Mango": ["mango"],
+    "Pina": ["pina"],
+    "Fresa": ["fresa", "frutilla"],
+    "Cacahuate": ["cacahuate", "mani"],
+    "Nuez": ["nuez"],
+    "Almendra": ["almendra"],
+    "Ajonjoli": ["ajonjoli"],
+    "Chicharo": ["chicharo", "guisante", "arveja"],
+    "Ejote": ["ejote", "judia verde", "vainita"],
+    "Betabel": ["betabel", "remolacha"],
+    "Camote": ["camote", "batata", "boniato"],
+    "Durazno": ["durazno", "melocoton"],
+}
+
+# Variedades, cortes y preparaciones: cuentan como el ingrediente al extraer menciones y al guardar
+# precios, pero no son la misma busqueda ("carnitas" no se busca como "cerdo")
+VARIETIES: Dict[str, List[str]] = {
+    "Huevo": ["clara de huevo", "yema"],
+    "Jitomate": ["tomate cherry", "pure de tomate"],
+    "Cebolla": ["cebolla blanca", "cebolla morada", "cebollin", "cebollita"],
+    "Chile poblano": ["raja", "rajas poblanas"],
+    "Aguacate": ["guacamole"],
+    "Limon": ["jugo de limon"],
+    "Naranja": ["jugo de naranja"],
+    "Frijol": ["frijoles refritos", "frijol negro", "frijol bayo"],
+    "Tortilla": ["tostada", "totopo"],
+    "Maiz": ["masa de maiz", "masa", "harina de maiz"],
+    "Pollo": ["pechuga", "pechuga de pollo", "muslo de pollo", "pierna de pollo"],
+    "Res": ["bistec", "arrachera", "carne molida", "falda de res", "cecina"],
+    "Cerdo": ["lomo de cerdo", "costilla de cerdo", "carnitas", "chicharron"],
+    "Jamon": ["jamon serrano"],
+    "Pescado": ["tilapia", "mojarra", "huachinango", "salmon"],
+    "Queso": ["queso oaxaca", "queso manchego", "queso chihuahua", "queso panela", "queso cotija"],
+    "Crema": ["crema acida"],
+    "Leche": ["leche evaporada", "leche condensada"],
+    "Aceite": ["aceite de oliva", "aceite vegetal"],
+    "Azucar": ["piloncillo"],
+    "Chocolate": ["cacao"],
+    "Pan": ["bolillo", "telera", "pan de caja", "pan molido"],
+    "Pasta": ["espagueti", "spaghetti", "fideo", "coditos", "macarron"],
+    "Calabaza": ["calabacita"],
+    "Champinon": ["hongo", "seta"],
+    "Platano": ["platano macho"],
+    "Nuez": ["nuez pecana"],
+}
+
+INGREDIENTS: List[str] = list(CATALOG)
+INGREDIENT_IDS: Dict[str, int] = {name: i for i, name in enumerate(INGREDIENTS)}
+
+MAX_PHRASE = 3
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minusculas sin acentos (n con tilde -> n)."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def plural(word: str) -> str:
+    if word.endswith("z"):
+        return word[:-1] + "ces"
+    if word[-1:] in "aeiou":
+        return word + "s"
+    return word + "es"
+
+
+def alias_forms(alias: str) -> Iterable[Tuple[str, ...]]:
+    """Alias en singular y plural (plural en la primera palabra: "chile serrano" -> "chiles serranos" tambien)."""
+    words = tuple(_WORD_RE.findall(fold(alias)))
+    if not words:
+        return
+    yield words
+    yield words[:-1] + (plural(words[-1]),)
+    if len(words) > 1:
+        yield (plural(words[0]),) + words[1:]
+        yield tuple(plural(w) if i in (0, len(words) - 1) else w for i, w in enumerate(words))
+
+
+def _build_aliases() -> Dict[Tuple[str, ...], int]:
+    aliases: Dict[Tuple[str, ...], int] = {}
+    for name, forms in CATALOG.items():
+        for alias in [name] + forms + VARIETIES.get(name, []):
+            for words in alias_forms(alias):
+                aliases.setdefault(words, INGREDIENT_IDS[name])
+    return aliases
+
+
+_ALIASES = _build_aliases()
+
+
+def extract_ids(*texts: Optional[str]) -> List[int]:
+    """IDs de ingredientes mencionados (orden de aparicion, sin repetir)."""
+    found: List[int] = []
+    for text in texts:
+        if not text:
+            continue
+        words = _WORD_RE.findall(fold(text))
+        i = 0
+        while i < len(words):
+            for n in range(min(MAX_PHRASE, len(words) - i), 0, -1):
+                ing = _ALIASES.get(tuple(words[i:i + n]))
+                if ing is not None:
+                    if ing not in found:
+                        found.append(ing)
+                    i += n
+                    break
+            else:
+                i += 1
+    return found
+
+
+def extract(*texts: Optional[str]) -> List[str]:
+    """Nombres canonicos de los ingredientes mencionados."""
+    return [INGREDIENTS[i] for i in extract_ids(*texts)]
+
+
+def resolve(name: str) -> Optional[int]:
+    """ID de un ingrediente escrito por el usuario ("huevos", "Jitomate", "chiles serranos")."""
+    words = tuple(_WORD_RE.findall(fold(name)))
+    if not words:
+        return None
+    ing = _ALIASES.get(words)
+    if ing is not None:
+        return ing
+    ids = extract_ids(name)
+    return ids[0] if len(ids) == 1 else None
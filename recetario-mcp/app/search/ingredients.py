@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """
-recetario.ingredients_search - Busqueda de ingredientes (Brave + dominios).
+recetario.ingredients_search - Busqueda de ingredientes (Brave + dominios, indice local).
 """
+import os
 from typing import Any, Dict, List
 
-from app.search.provider import provider_search
+from app.search.canonical import canonicalizer
+from app.search.local_index import tiered_search
+
+CACHE_TTL = int(os.getenv("CACHE_TTL_INGREDIENTS", "86400"))
 
 
 async def ingredients_search(params: Dict[str, Any]) -> Dict[str, Any]:
@@ -14,12 +18,17 @@ async def ingredients_search(params: Dict[str, Any]) -> Dict[str, Any]:
     if not query:
         query = "ingredientes cocina mexicana"
 
-    res = await provider_search.search(
+    upstream, key = canonicalizer.apply(query, "ingredient")
+    search_args: Dict[str, Any] = {"query": upstream, "topK": topK, "country": "MX", "search_lang": "es", "extra_snippets": True}
+    if key is not None:
+        search_args["key_query"] = key
+    res = await tiered_search(
+        "ingredient",
         query,
-        topK=topK,
-        country="MX",
-        search_lang="es",
-        extra_snippets=True,
+        search_args,
+        source=params.get("source"),
+        cache_ttl=CACHE_TTL,
+        priority=params.get("priority") or "interactive",
     )
     results = res.get("results") or []
 
@@ -30,7 +39,12 @@ async def ingredients_search(params: Dict[str, Any]) -> Dict[str, Any]:
             "url": r.get("url"),
             "snippet": r.get("snippet"),
             "extra_snippets": r.get("extra_snippets"),
-            "source": "brave",
+            "source": r.get("source") or "brave",
         })
 
-    return {"query": query, "ingredientes": ingredientes, "count": len(ingredientes)}
+    out: Dict[str, Any] = {"query": query, "ingredientes": ingredientes, "count": len(ingredientes), "source": res["source"]}
+    if res.get("fallback"):
+        out["fallback"] = res["fallback"]
+    if res.get("retry_after"):
+        out["retry_after"] = res["retry_after"]
+    return out
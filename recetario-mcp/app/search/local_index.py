@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Indice local (SQLite FTS5) de recetas e ingredientes vistos en Brave.
+- Cada resultado nuevo de Brave (title, url, snippet, extra_snippets) se indexa, deduplicado por URL canonica.
+- Las recetas guardan ademas sus ingredientes canonicos (doc_ingredients, ver ingredient_catalog).
+- Ranking BM25 (title pesa mas que snippet y extra_snippets); acentos plegados (unicode61 remove_diacritics).
+- tiered_search: responde desde el indice, desde Brave o ambos segun `source`, y cae al indice si Brave
+  falla o no hay cuota.
+sqlite3 es sincrono: las operaciones corren en un hilo (asyncio.to_thread), igual que PriceStore.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app import tracing
+from app.search.ingredient_catalog import extract
+from app.search.provider import Reservation, provider_search
+
+# live: solo Brave (con fallback al indice) | local: solo indice | auto: indice si cubre la query, si no Brave
+# merged: Brave + indice sin duplicados
+SOURCES = ("live", "local", "auto", "merged")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS docs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        url TEXT NOT NULL,
+        raw_url TEXT,
+        title TEXT,
+        snippet TEXT,
+        extra TEXT,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        seen INTEGER NOT NULL DEFAULT 1,
+        UNIQUE (kind, url)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS doc_ingredients (
+        doc_id INTEGER NOT NULL,
+        ingredient TEXT NOT NULL,
+        PRIMARY KEY (doc_id, ingredient)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS docs_kind_seen ON docs (kind, last_seen)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(title, snippet, extra, tokenize='unicode61 remove_diacritics 2')",
+)
+
+# Pesos BM25 por columna: title, snippet, extra
+_BM25 = "bm25(docs_fts, 10.0, 3.0, 1.0)"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "de", "del", "la", "las", "el", "los", "un", "una", "con", "sin", "para", "por", "en", "y", "o", "al",
+    "receta", "recetas", "ingrediente", "ingredientes", "site", "or", "and",
+}
+_TRACKING_PARAMS = {"gclid", "fbclid", "ref", "ref_src", "mc_cid", "mc_eid", "_ga"}
+
+
+def canonical_url(url: str) -> str:
+    """URL sin www, fragmento, barra final ni parametros de tracking; query ordenada."""
+    try:
+        parts = urllib.parse.urlsplit((url or "").strip())
+    except ValueError:
+        return (url or "").strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path or "").rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    return urllib.parse.urlunsplit(("https", host, path, urllib.parse.urlencode(query), ""))
+
+
+def query_terms(query: str) -> List[str]:
+    """Terminos de busqueda: palabras de 3+ letras sin stopwords (si no queda ninguna, todas)."""
+    tokens = [t for t in _TOKEN_RE.findall((query or "").lower()) if not t.isdigit()]
+    terms = [t for t in tokens if len(t) >= 3 and t not in _STOPWORDS]
+    out: List[str] = []
+    for t in terms or tokens:
+        if t not in out:
+            out.append(t)
+    return out
+
+
+class LocalIndex:
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or os.getenv("LOCAL_INDEX_PATH", "data/recipes.sqlite3")
+        self.enabled: bool = os.getenv("LOCAL_INDEX_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.min_hits: int = int(os.getenv("LOCAL_INDEX_MIN_HITS", "5"))
+        default_source = os.getenv("LOCAL_INDEX_DEFAULT_SOURCE", "auto").lower()
+        self.default_source: str = default_source if default_source in SOURCES else "auto"
+        self.available: bool = self.enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: Set["asyncio.Task[Any]"] = set()
+        self.stats: Dict[str, Any] = {
+            "lookups": 0,
+            "local_served": 0,
+            "fallbacks": 0,
+            "merged": 0,
+            "ingested": 0,
+            "updated": 0,
+            "errors": 0,
+            "last_lookup_ms": 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                for stmt in _SCHEMA:
+                    conn.execute(stmt)
+                conn.commit()
+            except sqlite3.OperationalError:
+                # SQLite sin FTS5: el indice queda desactivado
+                conn.close()
+                self.available = False
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _ingest_sync(self, kind: str, results: List[Dict[str, Any]]) -> Tuple[int, int]:
+        added = updated = 0
+        with self._lock:
+            # last_seen dentro del lock: el orden de last_seen es el orden de commit (refresh incremental)
+            now = time.time()
+            conn = self._connect()
+            for r in results:
+                raw_url = r.get("url") or ""
+                if not raw_url:
+                    continue
+                url = canonical_url(raw_url)
+                title = r.get("title") or ""
+                snippet = r.get("snippet") or ""
+                extra = r.get("extra_snippets") or []
+                row = conn.execute("SELECT id FROM docs WHERE kind = ? AND url = ?", (kind, url)).fetchone()
+                if row:
+                    doc_id = row[0]
+                    conn.execute(
+                        "UPDATE docs SET raw_url = ?, title = ?, snippet = ?, extra = ?, last_seen = ?, seen = seen + 1 WHERE id = ?",
+                        (raw_url, title, snippet, json.dumps(extra, ensure_ascii=False), now, doc_id),
+                    )
+                    conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+                    updated += 1
+                else:
+                    cur = conn.execute(
+                        "INSERT INTO docs (kind, url, raw_url, title, snippet, extra, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (kind, url, raw_url, title, snippet, json.dumps(extra, ensure_ascii=False), now, now),
+                    )
+                    doc_id = cur.lastrowid
+                    added += 1
+                conn.execute(
+                    "INSERT INTO docs_fts (rowid, title, snippet, extra) VALUES (?, ?, ?, ?)",
+                    (doc_id, title, snippet, " ".join(extra)),
+                )
+                if kind == "recipe":
+                    conn.execute("DELETE FROM doc_ingredients WHERE doc_id = ?", (doc_id,))
+                    conn.executemany(
+                        "INSERT INTO doc_ingredients (doc_id, ingredient) VALUES (?, ?)",
+                        [(doc_id, name) for name in extract(title, snippet, *extra)],
+                    )
+            conn.commit()
+        return added, updated
+
+    def _match_sync(self, kind: str, expr: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                f"""
+                SELECT d.url, d.raw_url, d.title, d.snippet, d.extra, {_BM25} AS score
+                FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid
+                WHERE docs_fts MATCH ? AND d.kind = ?
+                ORDER BY score LIMIT ?
+                """,
+                (expr, kind, limit),
+            ).fetchall()
+        out: List[Dict[str, Any]] = []
+        for url, raw_url, title, snippet, extra, score in rows:
+            item: Dict[str, Any] = {
+                "title": title,
+                "url": raw_url or url,
+                "snippet": snippet,
+                "source": "local",
+                "score": round(-score, 4),
+                "canonical_url": url,
+            }
+            extra_list = json.loads(extra) if extra else []
+            if extra_list:
+                item["extra_snippets"] = extra_list
+            out.append(item)
+        return out
+
+    def _lookup_sync(self, kind: str, terms: List[str], limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Primero los documentos con todos los terminos, luego los que tienen alguno (BM25 en ambos)."""
+        quoted = [f'"{t}"' for t in terms]
+        strict = self._match_sync(kind, " AND ".join(quoted), limit)
+        results = list(strict)
+        if len(results) < limit and len(terms) > 1:
+            seen = {r["canonical_url"] for r in results}
+            for r in self._match_sync(kind, " OR ".join(quoted), limit):
+                if r["canonical_url"] not in seen:
+                    results.append(r)
+                    if len(results) >= limit:
+                        break
+        return results, len(strict)
+
+    async def lookup(self, kind: str, query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """(resultados, cubre): cubre = suficientes documentos con todos los terminos (LOCAL_INDEX_MIN_HITS o limit)."""
+        terms = query_terms(query)
+        if not self.available or not terms or limit <= 0:
+            return [], False
+        self.stats["lookups"] += 1
+        start = time.perf_counter()
+        try:
+            with tracing.span("local_index.lookup", kind=kind) as sp:
+                results, strict = await asyncio.to_thread(self._lookup_sync, kind, terms, limit)
+                sp.set(hits=len(results), strict=strict)
+        except Exception:
+            self.stats["errors"] += 1
+            return [], False
+        self.stats["last_lookup_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+        return results, strict >= min(limit, self.min_hits)
+
+    async def search(self, kind: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        return (await self.lookup(kind, query, limit))[0]
+
+    async def ingest(self, kind: str, results: List[Dict[str, Any]]) -> None:
+        if not self.available or not results:
+            return
+        try:
+            added, updated = await asyncio.to_thread(self._ingest_sync, kind, results)
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        self.stats["ingested"] += added
+        self.stats["updated"] += updated
+
+    def ingest_later(self, kind: str, results: List[Dict[str, Any]]) -> None:
+        """Indexa en segundo plano para no sumar latencia a la respuesta."""
+        if not self.available or not results:
+            return
+        task = asyncio.ensure_future(self.ingest(kind, list(results)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def changed_recipes_sync(self, since: float) -> List[Tuple[int, float, Optional[str]]]:
+        """(doc_id, last_seen, ingredientes separados por |) de las recetas indexadas o actualizadas despues de since."""
+        with self._lock:
+            return self._connect().execute(
+                """
+                SELECT d.id, d.last_seen, GROUP_CONCAT(di.ingredient, '|')
+                FROM docs d LEFT JOIN doc_ingredients di ON di.doc_id = d.id
+                WHERE d.kind = 'recipe' AND d.last_seen > ?
+                GROUP BY d.id
+                """,
+                (since,),
+            ).fetchall()
+
+    def docs_sync(self, doc_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Titulo, url y snippets de varios documentos por id."""
+        if not doc_ids:
+            return {}
+        marks = ", ".join("?" for _ in doc_ids)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT id, raw_url, url, title, snippet, extra FROM docs WHERE id IN ({marks})", tuple(doc_ids)
+            ).fetchall()
+        out: Dict[int, Dict[str, Any]] = {}
+        for doc_id, raw_url, url, title, snippet, extra in rows:
+            out[doc_id] = {
+                "title": title,
+                "url": raw_url or url,
+                "snippet": snippet,
+                "extra_snippets": json.loads(extra) if extra else [],
+            }
+        return out
+
+    def _counts_sync(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connect().execute("SELECT kind, COUNT(*) FROM docs GROUP BY kind").fetchall()
+        return {kind: n for kind, n in rows}
+
+    async def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"available": self.available, "default_source": self.default_source, **self.stats}
+        if self.available:
+            try:
+                out["docs"] = await asyncio.to_thread(self._counts_sync)
+            except Exception:
+                out["docs"] = {}
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+local_index = LocalIndex()
+
+
+async def tiered_search(
+    kind: str,
+    query: str,
+    search_args: Dict[str, Any],
+    source: Optional[str] = None,
+    cache_ttl: Optional[int] = None,
+    priority: str = "interactive",
+    reservation: Optional[Reservation] = None,
+) -> Dict[str, Any]:
+    """
+    Busqueda por niveles para recipes/ingredients.
+    query: texto visible (sin operadores site:), el que se busca en el indice.
+    search_args: argumentos de provider_search.search.
+    Devuelve results (cada uno con source brave|local), source efectivo y, si aplica, fallback y retry_after.
+    """
+    source = (source or local_index.default_source).lower()
+    if source not in SOURCES:
+        source = local_index.default_source
+    topK = int(search_args.get("topK", 10))
+
+    if source == "local":
+        local_index.stats["local_served"] += 1
+        return {"results": await local_index.search(kind, query, topK), "source": "local"}
+
+    if source == "auto" and not provider_search.peek(**search_args):
+        results, covered = await local_index.lookup(kind, query, topK)
+        if covered:
+            local_index.stats["local_served"] += 1
+            return {"results": results, "source": "local"}
+
+    res = await provider_search.search(**search_args, cache_ttl=cache_ttl, priority=priority, reservation=reservation)
+    results = res.get("results") or []
+    if res.get("cache") == "miss" and results:
+        local_index.ingest_later(kind, results)
+
+    out: Dict[str, Any] = {"results": results, "source": "live"}
+    if res.get("retry_after"):
+        out["retry_after"] = res["retry_after"]
+    if res.get("error") and not results:
+        # Brave caido, sin cuota o sin tiempo: mejor el indice que una lista vacia
+        local = await local_index.search(kind, query, topK)
+        if local:
+            local_index.stats["fallbacks"] += 1
+            out.update(results=local, source="local", fallback=res["error"])
+    elif source == "merged":
+        local_index.stats["merged"] += 1
+        seen = {canonical_url(r.get("url") or "") for r in results}
+        extra = [r for r in await local_index.search(kind, query, topK) if r["canonical_url"] not in seen]
+        out.update(results=(results + extra)[:topK], source="merged")
+    return out
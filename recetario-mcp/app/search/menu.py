@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+recetario.menu_search - Menu del dia en una sola llamada: un recipes_search por tipo de comida, concurrentes.
+- Las busquedas que no estan en cache comparten una sola reserva de rate + cuota (provider_search.reserve).
+- Cada tipo se marca con ready_ms en cuanto termina.
+- Con deadline (deadline_ms o cabecera X-Request-Deadline, ver app/deadline.py), al vencer se devuelven
+  los tipos listos y el resto queda como pending; esas busquedas siguen en segundo plano y llenan el
+  cache para la siguiente llamada.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from app import deadline
+from app.search.provider import provider_search
+from app.search.recipes import recipes_query, recipes_search
+
+DEFAULT_TIPOS = ["desayuno", "comida", "cena"]
+
+
+async def menu_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    tipos_raw = params.get("tipos_comida") or params.get("tiposComida") or DEFAULT_TIPOS
+    if isinstance(tipos_raw, str):
+        tipos_raw = [tipos_raw]
+    tipos: List[str] = []
+    for t in tipos_raw:
+        t = str(t).strip().lower()
+        if t and t not in tipos:
+            tipos.append(t)
+    topK = min(int(params.get("topK", 5)), 20)
+    query = params.get("query", "").strip() or "recetas mexicanas"
+    priority = params.get("priority") or "interactive"
+    timeout = deadline.remaining()
+
+    slot_params = {t: {"query": query, "tipo_comida": t, "topK": topK, "priority": priority} for t in tipos}
+    misses = [t for t in tipos if not provider_search.peek(**recipes_query(slot_params[t], track=False)[1])]
+    reservation = await provider_search.reserve(len(misses), priority) if misses else None
+
+    start = time.perf_counter()
+    # Sin deadline propio: lo que no llegue a tiempo sigue en segundo plano y llena el cache
+    tasks = {deadline.detach(recipes_search(slot_params[t], reservation=reservation)): t for t in tipos}
+    menu: Dict[str, Dict[str, Any]] = {}
+    pending = set(tasks)
+    while pending:
+        remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+        if remaining is not None and remaining <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        ready_ms = round((time.perf_counter() - start) * 1000.0, 2)
+        for task in done:
+            tipo = tasks[task]
+            if task.exception() is not None:
+                menu[tipo] = {"status": "error", "error": str(task.exception()), "ready_ms": ready_ms}
+                continue
+            result = task.result()
+            menu[tipo] = {"status": "ready", "ready_ms": ready_ms, **result}
+
+    for task in pending:
+        menu[tasks[task]] = {"status": "pending"}
+    if pending:
+        deadline.cut("menu", f"{len(pending)} slots pending")
+
+    if reservation is not None:
+        if pending:
+            background = asyncio.gather(*pending, return_exceptions=True)
+            background.add_done_callback(lambda _: asyncio.ensure_future(reservation.release()))
+        else:
+            await reservation.release()
+
+    out: Dict[str, Any] = {
+        "menu": {t: menu[t] for t in tipos},
+        "complete": not pending,
+        "pending": [tasks[t] for t in pending],
+        "reserved": reservation.granted if reservation is not None else 0,
+    }
+    if reservation is not None and reservation.retry_after:
+        out["retry_after"] = reservation.retry_after
+    return out
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+recetario.menu_optimize - Mejor combinacion de recetas (una por tipo de comida) dentro del presupuesto diario.
+- Candidatos: los del body (candidatos por tipo, con cost/calories opcionales) o, si faltan, los de
+  menu_search para esos tipos (cache / indice local / Brave).
+- Costo: el del candidato; si no trae, se estima con los precios conocidos de sus ingredientes
+  (price_history: mediana 30 dias o ultimo de la tienda mas barata) por MENU_PORTION_SHARE del paquete.
+- Objetivo por receta: -relevancia + penalizacion por desviarse de la parte de calorias de esa comida
+  (objetivo o calorias) + un poco de costo.
+- Solver: programacion dinamica sobre el presupuesto en MENU_OPTIMIZE_BUCKETS cubetas, vectorizada con
+  numpy. Por cada tipo solo sobrevive el mejor candidato de cada cubeta de costo, asi que miles de
+  candidatos cuestan lo mismo que B.
+"""
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.search.ingredient_catalog import extract
+from app.search.price_history import price_history
+from app.search.menu import menu_search
+
+DEFAULT_TIPOS = ["desayuno", "comida", "cena"]
+# Parte de las calorias del dia por comida (el resto de tipos se reparte igual)
+CALORIE_SHARE = {"desayuno": 0.25, "comida": 0.45, "cena": 0.30}
+OBJETIVO_KCAL = {"bajar": 1600, "perder": 1600, "mantener": 2000, "subir": 2500, "ganar": 2500}
+
+BUCKETS = int(os.getenv("MENU_OPTIMIZE_BUCKETS", "400"))
+PORTION_SHARE = float(os.getenv("MENU_PORTION_SHARE", "0.25"))
+CANDIDATES_PER_TIPO = int(os.getenv("MENU_OPTIMIZE_CANDIDATES", "20"))
+
+# Pesos del objetivo (menor es mejor)
+SCORE_WEIGHT = 1.0
+CALORIE_WEIGHT = 1.0
+COST_WEIGHT = 0.1
+MISSING_CALORIES_PENALTY = 0.5
+
+
+def calorie_target(params: Dict[str, Any]) -> Optional[float]:
+    """kcal/dia: calorias explicitas o segun objetivo (bajar/mantener/subir peso)."""
+    raw = params.get("calorias") or params.get("caloriasObjetivo")
+    if raw:
+        try:
+            return float(raw)
+        except (TypeError, ValueError):
+            pass
+    objetivo = str(params.get("objetivo") or "").lower()
+    for word, kcal in OBJETIVO_KCAL.items():
+        if word in objetivo:
+            return float(kcal)
+    return None
+
+
+def ingredient_price(name: str) -> Optional[float]:
+    """Precio conocido de un ingrediente (tienda mas barata; mediana 30 dias si hay, si no ultimo)."""
+    series = price_history.stores(name)
+    if not series:
+        return None
+    agg = series[0].agg
+    return agg.get("median_30d") or agg.get("latest")
+
+
+def estimate_cost(candidate: Dict[str, Any]) -> Tuple[Optional[float], List[str]]:
+    """(costo estimado, ingredientes sin precio). Ingredientes: lista del candidato o extraidos del texto."""
+    items = candidate.get("ingredients") or candidate.get("ingredientes")
+    if not items:
+        items = extract(
+            candidate.get("title") or candidate.get("name"),
+            candidate.get("snippet") or candidate.get("description"),
+            *(candidate.get("extra_snippets") or []),
+        )
+    total = 0.0
+    known = 0
+    missing: List[str] = []
+    for item in items:
+        name = item.get("name") if isinstance(item, dict) else str(item)
+        share = float(item.get("share", PORTION_SHARE)) if isinstance(item, dict) else PORTION_SHARE
+        price = ingredient_price(name or "")
+        if price is None:
+            missing.append(name)
+            continue
+        total += price * share
+        known += 1
+    return (round(total, 2) if known else None), missing
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+def objective(
+    costs: np.ndarray,
+    calories: np.ndarray,
+    scores: np.ndarray,
+    budget: Optional[float],
+    kcal_target: Optional[float],
+) -> np.ndarray:
+    """Valor por candidato (menor es mejor); calories NaN = desconocidas."""
+    value = -SCORE_WEIGHT * scores
+    if budget:
+        value = value + COST_WEIGHT * costs / budget
+    if kcal_target:
+        dev = np.abs(calories - kcal_target) / kcal_target
+        value = value + CALORIE_WEIGHT * np.where(np.isnan(dev), MISSING_CALORIES_PENALTY, dev)
+    return value
+
+
+def solve(
+    costs: Sequence[np.ndarray],
+    values: Sequence[np.ndarray],
+    budget: Optional[float],
+    buckets: int = BUCKETS,
+) -> Tuple[Optional[List[int]], bool]:
+    """
+    Un indice por grupo minimizando la suma de values con sum(costs) <= budget.
+    Devuelve (indices, dentro_presupuesto); si ninguna combinacion cabe, la mas barata y False.
+    """
+    if any(len(c) == 0 for c in costs):
+        return None, False
+    if not budget:
+        return [int(np.argmin(v)) for v in values], True
+
+    unit = budget / buckets
+    dp = np.full(buckets + 1, np.inf)
+    dp[0] = 0.0
+    choices: List[np.ndarray] = []
+    for c, v in zip(costs, values):
+        # Costos hacia arriba: una combinacion que cabe en cubetas cabe en pesos (nunca cubetas negativas)
+        cb = np.clip(np.ceil(c / unit - 1e-9), 0, None).astype(np.int64)
+        ok = cb <= buckets
+        idx = np.flatnonzero(ok)
+        if idx.size == 0:
+            dp = None
+            break
+        # Mejor candidato por cubeta de costo (los demas nunca ganan)
+        order = idx[np.lexsort((v[idx], cb[idx]))]
+        _, first = np.unique(cb[order], return_index=True)
+        keep = order[first]
+        shift = np.arange(buckets + 1)[None, :] - cb[keep][:, None]
+        total = np.where(shift >= 0, dp[np.clip(shift, 0, None)], np.inf) + v[keep][:, None]
+        best = np.argmin(total, axis=0)
+        dp = total[best, np.arange(buckets + 1)]
+        choices.append(np.where(np.isfinite(dp), keep[best], -1))
+    if dp is None or not np.isfinite(dp).any():
+        return [int(np.argmin(c)) for c in costs], False
+
+    # Reconstruccion desde la mejor cubeta final
+    b = int(np.argmin(dp))
+    picked: List[int] = []
+    for k in range(len(costs) - 1, -1, -1):
+        j = int(choices[k][b])
+        picked.append(j)
+        b -= max(0, int(np.ceil(costs[k][j] / unit - 1e-9)))
+    picked.reverse()
+    return picked, True
+
+
+def _candidates_from(raw: Any, tipo: str) -> List[Dict[str, Any]]:
+    if isinstance(raw, dict):
+        raw = raw.get(tipo) or []
+    elif isinstance(raw, list):
+        raw = [c for c in raw if isinstance(c, dict) and str(c.get("tipo") or c.get("tipo_comida") or "").lower() == tipo]
+    else:
+        raw = []
+    return [c for c in raw if isinstance(c, dict)]
+
+
+async def _fetch_candidates(tipos: List[str], params: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Un recipes_search por tipo via menu_search (reserva compartida y deadline)."""
+    res = await menu_search({
+        "tipos_comida": tipos,
+        "topK": CANDIDATES_PER_TIPO,
+        "query": params.get("query") or "",
+        "priority": params.get("priority") or "interactive",
+    })
+    menu = res.get("menu") or {}
+    return {t: (menu.get(t) or {}).get("recetas") or [] for t in tipos}
+
+
+async def menu_optimize(params: Dict[str, Any]) -> Dict[str, Any]:
+    tipos_raw = params.get("tipos_comida") or params.get("tiposComida") or DEFAULT_TIPOS
+    if isinstance(tipos_raw, str):
+        tipos_raw = [tipos_raw]
+    tipos: List[str] = []
+    for t in tipos_raw:
+        t = str(t).strip().lower()
+        if t and t not in tipos:
+            tipos.append(t)
+    budget = _number(params.get("presupuestoDiario") or params.get("presupuesto") or params.get("budget"))
+    if budget is not None and budget <= 0:
+        budget = None
+    kcal = calorie_target(params)
+
+    raw = params.get("candidatos") or params.get("candidates")
+    candidates = {t: _candidates_from(raw, t) for t in tipos}
+    missing_tipos = [t for t in tipos if not candidates[t]]
+    if missing_tipos:
+        candidates.update(await _fetch_candidates(missing_tipos, params))
+
+    other_share = (1.0 - sum(CALORIE_SHARE.get(t, 0.0) for t in tipos)) / max(1, sum(1 for t in tipos if t not in CALORIE_SHARE))
+    start = time.perf_counter()
+    costs: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    usable: Dict[str, List[Tuple[Dict[str, Any], float, bool, List[str]]]] = {}
+    for t in tipos:
+        rows = []
+        for c in candidates[t]:
+            cost = _number(c.get("cost") if c.get("cost") is not None else c.get("costo"))
+            estimated = False
+            missing: List[str] = []
+            if cost is None:
+                cost, missing = estimate_cost(c)
+                estimated = True
+            # Un costo negativo no es un precio: el candidato no entra
+            if cost is not None and cost >= 0:
+                rows.append((c, cost, estimated, missing))
+        usable[t] = rows
+        n = len(rows)
+        c_arr = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+        cal = np.array([_number(r[0].get("calories") or r[0].get("calorias")) for r in rows], dtype=np.float64).reshape(n)
+        explicit = [_number(r[0].get("score")) for r in rows]
+        # Relevancia: score del candidato o su posicion (el primero vale 1)
+        scores = np.array([s if s is not None else 1.0 - i / max(1, n) for i, s in enumerate(explicit)], dtype=np.float64).reshape(n)
+        meal_kcal = kcal * CALORIE_SHARE.get(t, other_share) if kcal else None
+        costs.append(c_arr)
+        values.append(objective(c_arr, cal, scores, budget, meal_kcal))
+
+    # Tipos sin ningun candidato con costo quedan fuera del menu (se reportan)
+    sin = [t for t in tipos if not usable[t]]
+    solved = [k for k, t in enumerate(tipos) if usable[t]]
+    # Sin ningun tipo resoluble solve() daria un menu vacio "dentro de presupuesto"
+    picked, feasible = solve([costs[k] for k in solved], [values[k] for k in solved], budget) if solved else (None, False)
+    solve_ms = round((time.perf_counter() - start) * 1000.0, 3)
+
+    out: Dict[str, Any] = {
+        "presupuesto": budget,
+        "calorias_objetivo": kcal,
+        "candidatos": {t: len(usable[t]) for t in tipos},
+        "solve_ms": solve_ms,
+    }
+    if sin:
+        out["sin_candidatos"] = sin
+    if picked is None:
+        return {**out, "menu": {}, "error": "sin candidatos con costo"}
+
+    menu: Dict[str, Any] = {}
+    total_cost = 0.0
+    total_kcal = 0.0
+    kcal_known = True
+    for t, j in zip([tipos[k] for k in solved], picked):
+        c, cost, estimated, missing = usable[t][j]
+        cal = _number(c.get("calories") or c.get("calorias"))
+        item: Dict[str, Any] = {
+            "title": c.get("title") or c.get("name"),
+            "url": c.get("url"),
+            "snippet": c.get("snippet") or c.get("description"),
+            "cost": cost,
+            "costo_estimado": estimated,
+            "calories": cal,
+        }
+        if missing:
+            item["sin_precio"] = missing
+        menu[t] = item
+        total_cost += cost
+        if cal is None:
+            kcal_known = False
+        else:
+            total_kcal += cal
+    out.update(
+        menu=menu,
+        total_cost=round(total_cost, 2),
+        total_calories=round(total_kcal, 1) if kcal_known else None,
+        dentro_presupuesto=feasible and (budget is None or total_cost <= budget + 1e-6),
+    )
+    return out
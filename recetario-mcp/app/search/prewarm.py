@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Consultas calientes y prewarming del cache de busqueda.
+- HotSet: popularidad por clave de cache (contador con decaimiento exponencial, PREWARM_HALF_LIFE_S),
+  con los argumentos de la busqueda para poder repetirla.
+- Prewarmer: tarea de fondo (lifespan) que cada PREWARM_INTERVAL_S renueva las PREWARM_TOP_N claves
+  mas populares antes de que venzan (PREWARM_LEAD_S). Usa prioridad background: solo huecos libres de
+  rate, respeta el presupuesto de cuota (QuotaPlanner) y limita las renovaciones por ciclo a
+  PREWARM_RPS_SHARE de BRAVE_MAX_RPS.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.search.provider import ProviderSearch
+
+
+class HotQuery:
+    __slots__ = ("args", "cache_ttl", "score", "last_seen", "refreshes", "last_lag_s")
+
+    def __init__(self, args: Dict[str, Any], cache_ttl: Optional[int]):
+        self.args = args
+        self.cache_ttl = cache_ttl
+        self.score = 0.0
+        self.last_seen = time.time()
+        self.refreshes = 0
+        self.last_lag_s: Optional[float] = None
+
+
+class HotSet:
+    def __init__(self):
+        self.half_life_s: float = float(os.getenv("PREWARM_HALF_LIFE_S", "3600"))
+        self.max_tracked: int = int(os.getenv("PREWARM_MAX_TRACKED", "512"))
+        self._items: Dict[str, HotQuery] = {}
+        self._lags: Deque[float] = deque(maxlen=200)
+
+    def _decayed(self, item: HotQuery, now: float) -> float:
+        return item.score * 0.5 ** ((now - item.last_seen) / self.half_life_s)
+
+    def note(self, key: str, args: Dict[str, Any], cache_ttl: Optional[int]) -> None:
+        """Cada busqueda cacheable suma 1 a la popularidad de su clave."""
+        now = time.time()
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = HotQuery(args, cache_ttl)
+        item.score = self._decayed(item, now) + 1.0
+        item.last_seen = now
+        item.cache_ttl = cache_ttl
+        if len(self._items) > self.max_tracked:
+            self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        ranked = sorted(self._items, key=lambda k: self._decayed(self._items[k], now), reverse=True)
+        for key in ranked[self.max_tracked:]:
+            del self._items[key]
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Tuple[str, HotQuery, float]]:
+        now = time.time()
+        scored = [(k, item, self._decayed(item, now)) for k, item in self._items.items()]
+        scored = [s for s in scored if s[2] >= min_score]
+        scored.sort(key=lambda s: s[2], reverse=True)
+        return scored[:n]
+
+    def note_refresh(self, key: str, lag_s: Optional[float]) -> None:
+        """lag_s: segundos que la entrada llevaba vencida al renovarse (negativo = renovada antes de vencer)."""
+        item = self._items.get(key)
+        if item is not None:
+            item.refreshes += 1
+            item.last_lag_s = lag_s
+        if lag_s is not None:
+            self._lags.append(lag_s)
+
+    def lag_snapshot(self) -> Dict[str, Any]:
+        lags = list(self._lags)
+        if not lags:
+            return {"samples": 0}
+        return {
+            "samples": len(lags),
+            "last": round(lags[-1], 2),
+            "avg": round(sum(lags) / len(lags), 2),
+            "max": round(max(lags), 2),
+            "stale_ratio": round(sum(1 for x in lags if x > 0) / len(lags), 4),
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class Prewarmer:
+    def __init__(self, provider: "ProviderSearch"):
+        self.provider = provider
+        self.enabled: bool = os.getenv("PREWARM_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.interval_s: float = float(os.getenv("PREWARM_INTERVAL_S", "30"))
+        self.top_n: int = int(os.getenv("PREWARM_TOP_N", "8"))
+        self.min_score: float = float(os.getenv("PREWARM_MIN_SCORE", "2"))
+        self.lead_s: float = float(os.getenv("PREWARM_LEAD_S", "120"))
+        self.rps_share: float = float(os.getenv("PREWARM_RPS_SHARE", "0.25"))
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.stats: Dict[str, int] = {
+            "ticks": 0,
+            "refreshed": 0,
+            "errors": 0,
+            "deferred_budget": 0,
+            "deferred_cap": 0,
+        }
+
+    def start(self) -> None:
+        if not self.enabled or not self.provider.brave_api_key or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["errors"] += 1
+
+    def _cap(self) -> int:
+        """Renovaciones por ciclo: fraccion del rate de Brave en el intervalo."""
+        return max(1, int(self.provider.limiter.max_rps * self.interval_s * self.rps_share))
+
+    async def tick(self) -> int:
+        """Un ciclo: renueva las claves calientes vencidas o por vencer, las mas urgentes primero."""
+        self.stats["ticks"] += 1
+        now = time.time()
+        due: List[Tuple[float, float, str, HotQuery]] = []
+        for key, item, score in self.provider.hot.top(self.top_n, self.min_score):
+            entry = await self.provider.cache.inspect(key)
+            expires_at = entry.expires_at if entry is not None else 0.0
+            if expires_at - now <= self.lead_s:
+                due.append((expires_at, -score, key, item))
+        due.sort()
+        cap = self._cap()
+        if len(due) > cap:
+            self.stats["deferred_cap"] += len(due) - cap
+        spacing = 1.0 / max(self.provider.limiter.max_rps, 1e-6)
+        refreshed = 0
+        for i, (_, _, key, item) in enumerate(due[:cap]):
+            if i:
+                await asyncio.sleep(spacing)
+            res = await self.provider.revalidate(key, item.args, item.cache_ttl)
+            if res is None:
+                self.stats["deferred_budget"] += 1
+                break
+            if res.get("error"):
+                self.stats["errors"] += 1
+                continue
+            refreshed += 1
+        self.stats["refreshed"] += refreshed
+        return refreshed
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        hot = []
+        for key, item, score in self.provider.hot.top(self.top_n, self.min_score):
+            entry = self.provider.cache.entry(key)
+            hot.append({
+                "query": item.args.get("query"),
+                "score": round(score, 2),
+                "expires_in_s": round(entry.expires_at - now, 1) if entry is not None else None,
+                "refreshes": item.refreshes,
+                "last_lag_s": None if item.last_lag_s is None else round(item.last_lag_s, 2),
+            })
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "interval_s": self.interval_s,
+            "refresh_cap": self._cap(),
+            "tracked": len(self.provider.hot),
+            "hot_set_size": len(hot),
+            "hot_set": hot,
+            "refresh_lag_s": self.provider.hot.lag_snapshot(),
+            **self.stats,
+        }
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Historial de precios por producto, tienda y presentacion ("1 kg", "5 kg"), alimentado por prices_search.
+- Cada serie guarda arreglos compactos (array('d')): observaciones crudas de los ultimos
+  PRICE_HISTORY_RAW_DAYS y, mas atras, un punto por dia (media, minimo y n) hasta PRICE_HISTORY_MAX_DAYS.
+  Con PRICE_HISTORY_MAX_POINTS por serie y PRICE_HISTORY_MAX_SERIES series la memoria queda acotada.
+- Agregados precalculados al escribir: ultimo precio y minimo (incrementales), mediana y tendencia de
+  30 dias (sobre la ventana acotada). Leer (recetario.price_history) no hace I/O ni calculos.
+- Opcional: log de observaciones (PRICE_HISTORY_LOG, JSONL) que se reproduce al arrancar y se
+  compacta cuando crece mas del doble de lo retenido. Nada de disco en el event loop: load() lee y
+  compacta en un hilo (lifespan) y record() solo agrega a un buffer que se escribe cada
+  PRICE_HISTORY_FLUSH_S desde un hilo (un write con O_APPEND por lote), como app/capture.py.
+"""
+import asyncio
+import bisect
+import json
+import os
+import re
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.search.canonical import canonical_forms
+from app.search.ingredient_catalog import CATALOG, fold
+
+DAY_S = 86400.0
+TREND_DAYS = 30
+
+_UNIT_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kg|g|gr|grs|l|lt|lts|ml|pz|pza|pzas|piezas?)\b", re.IGNORECASE)
+
+# Clave canonica de un solo termino -> ingrediente ("chile_jalapeno" -> "Chile jalapeno")
+_PRODUCTS: Dict[str, str] = {fold(name).replace(" ", "_"): name for name in CATALOG}
+
+
+def product_key(text: str) -> str:
+    """
+    Ingrediente canonico si la consulta es solo ese ingrediente o un sinonimo ("precio de huevos" -> Huevo,
+    "tomate" -> Jitomate); si no, texto sin acentos. Las variedades no se juntan con su ingrediente
+    ("salmon", "leche condensada" y "carnitas" son series propias): mismos sinonimos que canonical.py.
+    """
+    name = _PRODUCTS.get(canonical_forms(text or "")[1])
+    if name is not None:
+        return name
+    return " ".join(fold(text or "").split())
+
+
+def unit_of(name: Optional[str]) -> Optional[str]:
+    """Presentacion del producto a partir del nombre ("Arroz 1 kg" -> "1 kg")."""
+    match = _UNIT_RE.search(name or "")
+    if not match:
+        return None
+    return f"{match.group(1).replace(',', '.')} {match.group(2).lower()}"
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+class PriceSeries:
+    __slots__ = ("product", "store", "unit", "name", "ts", "price", "day_ts", "day_mean", "day_min", "day_n", "agg", "updated_at")
+
+    def __init__(self, product: str, store: str, unit: Optional[str] = None):
+        self.product = product
+        self.store = store
+        self.unit = unit
+        self.name: Optional[str] = None
+        self.ts = array("d")
+        self.price = array("d")
+        self.day_ts = array("d")
+        self.day_mean = array("d")
+        self.day_min = array("d")
+        self.day_n = array("I")
+        self.agg: Dict[str, Any] = {}
+        self.updated_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ts) + len(self.day_ts)
+
+    def add(self, ts: float, price: float) -> None:
+        if not self.ts or ts >= self.ts[-1]:
+            self.ts.append(ts)
+            self.price.append(price)
+        else:
+            i = bisect.bisect_right(self.ts, ts)
+            self.ts.insert(i, ts)
+            self.price.insert(i, price)
+        latest_ts = self.agg.get("latest_ts") or 0.0
+        if ts >= latest_ts:
+            self.agg["latest"] = price
+            self.agg["latest_ts"] = ts
+        if "min" not in self.agg or price < self.agg["min"]:
+            self.agg["min"] = price
+            self.agg["min_ts"] = ts
+
+    def compact(self, now: float, raw_days: float, max_days: float, max_points: int) -> bool:
+        """Pasa a puntos diarios lo crudo mas viejo que raw_days y descarta lo mas viejo que max_days."""
+        cutoff = now - raw_days * DAY_S
+        moved = bisect.bisect_left(self.ts, cutoff)
+        changed = moved > 0
+        for i in range(moved):
+            day = (self.ts[i] // DAY_S) * DAY_S
+            price = self.price[i]
+            if self.day_ts and self.day_ts[-1] == day:
+                n = self.day_n[-1]
+                self.day_mean[-1] = (self.day_mean[-1] * n + price) / (n + 1)
+                self.day_min[-1] = min(self.day_min[-1], price)
+                self.day_n[-1] = n + 1
+            else:
+                self.day_ts.append(day)
+                self.day_mean.append(price)
+                self.day_min.append(price)
+                self.day_n.append(1)
+        if moved:
+            del self.ts[:moved]
+            del self.price[:moved]
+        drop = bisect.bisect_left(self.day_ts, now - max_days * DAY_S)
+        drop = max(drop, min(len(self.day_ts), len(self) - max_points))
+        if drop > 0:
+            for arr in (self.day_ts, self.day_mean, self.day_min, self.day_n):
+                del arr[:drop]
+            changed = True
+        extra = len(self) - max_points
+        if extra > 0:
+            del self.ts[:extra]
+            del self.price[:extra]
+            changed = True
+        return changed
+
+    def recompute_min(self) -> None:
+        mins = [(p, t) for p, t in zip(self.price, self.ts)] + [(p, t) for p, t in zip(self.day_min, self.day_ts)]
+        if mins:
+            self.agg["min"], self.agg["min_ts"] = min(mins)
+        else:
+            self.agg.pop("min", None)
+            self.agg.pop("min_ts", None)
+
+    def recompute_window(self, now: float) -> None:
+        """Mediana y tendencia (pendiente por minimos cuadrados) de los ultimos TREND_DAYS."""
+        cutoff = now - TREND_DAYS * DAY_S
+        d0 = bisect.bisect_left(self.day_ts, cutoff)
+        r0 = bisect.bisect_left(self.ts, cutoff)
+        t = np.concatenate((np.frombuffer(self.day_ts, dtype=np.float64)[d0:], np.frombuffer(self.ts, dtype=np.float64)[r0:]))
+        p = np.concatenate((np.frombuffer(self.day_mean, dtype=np.float64)[d0:], np.frombuffer(self.price, dtype=np.float64)[r0:]))
+        self.agg["n_30d"] = int(p.size)
+        self.agg["median_30d"] = float(np.median(p)) if p.size else None
+        trend = None
+        if p.size >= 2 and t[-1] - t[0] >= DAY_S / 4:
+            days = (t - t[0]) / DAY_S
+            slope = float(np.dot(days - days.mean(), p - p.mean()) / np.dot(days - days.mean(), days - days.mean()))
+            mean = float(p.mean())
+            if mean > 0:
+                trend = slope * TREND_DAYS / mean * 100.0
+        self.agg["trend_30d_pct"] = trend
+
+    def summary(self) -> Dict[str, Any]:
+        agg = self.agg
+        return {
+            "store": self.store,
+            "latest": None if agg.get("latest") is None else round(agg["latest"], 2),
+            "latest_at": _iso(agg.get("latest_ts")),
+            "min": None if agg.get("min") is None else round(agg["min"], 2),
+            "min_at": _iso(agg.get("min_ts")),
+            "median_30d": None if agg.get("median_30d") is None else round(agg["median_30d"], 2),
+            "trend_30d_pct": None if agg.get("trend_30d_pct") is None else round(agg["trend_30d_pct"], 2),
+            "observations_30d": agg.get("n_30d", 0),
+            "unit": self.unit,
+            "name": self.name,
+        }
+
+    def points(self) -> List[Tuple[str, float]]:
+        """Serie submuestreada: un punto por dia (media) y luego las observaciones crudas."""
+        out = [(_iso(t), round(p, 2)) for t, p in zip(self.day_ts, self.day_mean)]
+        out.extend((_iso(t), round(p, 2)) for t, p in zip(self.ts, self.price))
+        return out
+
+
+class PriceHistory:
+    def __init__(self, log_path: Optional[str] = None):
+        self.raw_days: float = float(os.getenv("PRICE_HISTORY_RAW_DAYS", "7"))
+        self.max_days: float = float(os.getenv("PRICE_HISTORY_MAX_DAYS", "365"))
+        self.max_points: int = int(os.getenv("PRICE_HISTORY_MAX_POINTS", "1000"))
+        self.max_series: int = int(os.getenv("PRICE_HISTORY_MAX_SERIES", "5000"))
+        self.min_gap_s: float = float(os.getenv("PRICE_HISTORY_MIN_GAP_S", "300"))
+        self.log_path: str = os.getenv("PRICE_HISTORY_LOG", "data/price_history.jsonl") if log_path is None else log_path
+        # Una serie por (producto, tienda, presentacion): "Arroz 1 kg" y "Arroz 5 kg" no se promedian
+        self._series: Dict[Tuple[str, str, Optional[str]], PriceSeries] = {}
+        self._by_product: Dict[str, Dict[Tuple[str, Optional[str]], PriceSeries]] = {}
+        self.flush_s: float = float(os.getenv("PRICE_HISTORY_FLUSH_S", "1"))
+        self._loaded = False
+        self._pending: List[str] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._log_lines = 0
+        self.stats: Dict[str, int] = {"observations": 0, "deduplicated": 0, "compactions": 0, "evicted_series": 0, "log_errors": 0}
+
+    async def load(self) -> None:
+        """Reproduce el log (y lo compacta si hace falta) en un hilo; se llama una vez al arrancar."""
+        if self._loaded:
+            return
+        self._loaded = True
+        await asyncio.to_thread(self._load_sync)
+
+    def _load_sync(self) -> None:
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    self._log_lines += 1
+                    try:
+                        o = json.loads(line)
+                        self._record(o["product"], o["store"], float(o["price"]), o.get("unit"), o.get("name"), float(o["ts"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            self.stats["log_errors"] += 1
+            return
+        if self._log_lines > 2 * max(1, self.points()):
+            self._rewrite_log()
+
+    def _rewrite_log(self) -> None:
+        """Reescribe el log con lo retenido (los puntos diarios quedan como una observacion por dia)."""
+        tmp = self.log_path + ".tmp"
+        lines = 0
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                for s in self._series.values():
+                    for t, p in list(zip(s.day_ts, s.day_mean)) + list(zip(s.ts, s.price)):
+                        fh.write(json.dumps({"product": s.product, "store": s.store, "price": p, "unit": s.unit, "name": s.name, "ts": t}, ensure_ascii=False) + "\n")
+                        lines += 1
+            os.replace(tmp, self.log_path)
+            self._log_lines = lines
+        except OSError:
+            self.stats["log_errors"] += 1
+
+    def _append_log(self, entry: Dict[str, Any]) -> None:
+        """Encola la linea; se escribe en el siguiente flush()."""
+        if self.log_path:
+            self._pending.append(json.dumps(entry, ensure_ascii=False))
+
+    def _write_sync(self, lines: List[str]) -> None:
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write_sync, lines)
+            self._log_lines += len(lines)
+        except OSError:
+            self.stats["log_errors"] += 1
+
+    def start(self) -> None:
+        if not self.log_path or self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_s)
+            await self.flush()
+
+    def _record(self, product: str, store: str, price: float, unit: Optional[str], name: Optional[str], ts: float) -> bool:
+        key = (product, store, unit or None)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                self._evict()
+            series = self._series[key] = PriceSeries(product, store, unit or None)
+            self._by_product.setdefault(product, {})[(store, unit or None)] = series
+        elif series.ts and series.price[-1] == price and 0 <= ts - series.ts[-1] < self.min_gap_s:
+            # Mismo precio visto hace poco: solo se actualiza la fecha del ultimo precio
+            series.agg["latest_ts"] = max(series.agg.get("latest_ts") or 0.0, ts)
+            self.stats["deduplicated"] += 1
+            return False
+        series.add(ts, price)
+        if name:
+            series.name = name
+        now = max(time.time(), ts)
+        if series.compact(now, self.raw_days, self.max_days, self.max_points):
+            self.stats["compactions"] += 1
+            series.recompute_min()
+        series.recompute_window(now)
+        series.updated_at = now
+        self.stats["observations"] += 1
+        return True
+
+    def _evict(self) -> None:
+        oldest = min(self._series.values(), key=lambda s: s.updated_at)
+        del self._series[(oldest.product, oldest.store, oldest.unit)]
+        stores = self._by_product.get(oldest.product) or {}
+        stores.pop((oldest.store, oldest.unit), None)
+        if not stores:
+            self._by_product.pop(oldest.product, None)
+        self.stats["evicted_series"] += 1
+
+    def record(
+        self,
+        product: str,
+        store: str,
+        price: Any,
+        unit: Optional[str] = None,
+        name: Optional[str] = None,
+        ts: Optional[float] = None,
+    ) -> bool:
+        """Agrega una observacion. False si el precio no es valido o repite el ultimo."""
+        try:
+            value = float(str(price).replace("$", "").replace(",", "").strip())
+        except (TypeError, ValueError):
+            return False
+        if value <= 0 or not product or not store:
+            return False
+        ts = time.time() if ts is None else ts
+        key = product_key(product)
+        if not self._record(key, store, value, unit, name, ts):
+            return False
+        self._append_log({"product": key, "store": store, "price": value, "unit": unit, "name": name, "ts": ts})
+        return True
+
+    def stores(self, product: str, store: Optional[str] = None) -> List[PriceSeries]:
+        """
+        Series del producto (de una tienda o todas; una por presentacion), de la mas barata a la mas cara
+        por ultimo precio.
+        """
+        by_store = self._by_product.get(product_key(product)) or {}
+        series = list(by_store.values())
+        if store:
+            series = [s for s in series if s.store.lower() == store.lower()]
+        return sorted(series, key=lambda s: s.agg.get("latest", float("inf")))
+
+    def points(self) -> int:
+        return sum(len(s) for s in self._series.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        points = self.points()
+        return {
+            "series": len(self._series),
+            "products": len(self._by_product),
+            "points": points,
+            # arreglos de 8 bytes: (ts, precio) crudo y (ts, media, minimo, n) diario
+            "approx_bytes": sum(16 * len(s.ts) + 28 * len(s.day_ts) for s in self._series.values()),
+            "log": self.log_path or None,
+            "log_lines": self._log_lines,
+            "log_pending": len(self._pending),
+            **self.stats,
+        }
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        await self.flush()
+
+
+price_history = PriceHistory()
+
+
+async def price_history_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    """recetario.price_history: tienda mas barata y agregados por tienda, sin red."""
+    product = (params.get("product") or params.get("query") or params.get("q") or "").strip()
+    if not product:
+        return {"product": None, "tiendas": [], "count": 0, "error": "product requerido"}
+    start = time.perf_counter()
+    series = price_history.stores(product, params.get("store"))
+    tiendas = []
+    for s in series:
+        item = s.summary()
+        if params.get("points"):
+            item["points"] = s.points()
+        tiendas.append(item)
+    return {
+        "product": product_key(product),
+        "tiendas": tiendas,
+        "mas_barata": tiendas[0] if tiendas else None,
+        "count": len(tiendas),
+        "lookup_us": round((time.perf_counter() - start) * 1e6, 1),
+    }
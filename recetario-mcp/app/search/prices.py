@@ -2,11 +2,22 @@
 """
 recetario.prices_search - Precios: Brave para encontrar paginas + scraping supermercados (Walmart, Soriana, Chedraui).
 Sin APIs de tienda: scraping a paginas publicas.
+Cada precio nuevo (live o revalidated) se agrega al historial (app/search/price_history.py).
+prices_search_events entrega el mismo resultado por partes para streaming (NDJSON / SSE): primero los
+resultados de Brave, luego cada precio en cuanto su pagina se parsea y al final el resultado completo.
 """
-from typing import Any, Dict, List
+import os
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
+from app import deadline
+from app.search.canonical import canonicalizer
+from app.search.price_history import price_history, unit_of
 from app.search.provider import provider_search
-from app.scraping.supermarkets import scrape_prices_supermarkets
+from app.scraping.supermarkets import scrape_prices_as_completed
+
+CACHE_TTL = int(os.getenv("CACHE_TTL_PRICES", "1800"))
+# Si el deadline deja menos que esto, no se hace scraping (se devuelven solo resultados Brave)
+SCRAPE_MIN_BUDGET_S = float(os.getenv("SCRAPE_MIN_BUDGET_MS", "800")) / 1000.0
 
 WALMART_DOMAIN = "walmart.com.mx"
 SORIANA_DOMAIN = "soriana.com"
@@ -14,6 +25,19 @@ CHEDRAUI_DOMAIN = "chedraui.com.mx"
 
 
 async def prices_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    async for event, data in prices_search_events(params):
+        if event == "done":
+            out = data
+    return out
+
+
+async def prices_search_events(params: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Eventos ("results", {query, precios, count}) con los resultados de Brave sin precio,
+    ("price", {index, ...precio}) por cada URL scrapeada, en orden de llegada (no las que fallaron), y
+    ("done", resultado completo, igual al de prices_search).
+    """
     query = params.get("query", "").strip() or params.get("q", "").strip()
     product = params.get("product", "").strip() or query
     topK = min(int(params.get("topK", 5)), 15)
@@ -22,11 +46,16 @@ async def prices_search(params: Dict[str, Any]) -> Dict[str, Any]:
     if not product:
         product = "precio producto supermercado"
 
+    upstream, key = canonicalizer.apply(product, "price")
+    stores_part = f"precio {WALMART_DOMAIN} OR {SORIANA_DOMAIN} OR {CHEDRAUI_DOMAIN}"
     res = await provider_search.search(
-        f"{product} precio {WALMART_DOMAIN} OR {SORIANA_DOMAIN} OR {CHEDRAUI_DOMAIN}",
+        f"{upstream} {stores_part}",
+        key_query=None if key is None else f"{key} {stores_part}",
         topK=topK,
         country="MX",
         search_lang="es",
+        cache_ttl=CACHE_TTL,
+        priority=params.get("priority") or "interactive",
     )
     results = res.get("results") or []
 
@@ -45,17 +74,36 @@ async def prices_search(params: Dict[str, Any]) -> Dict[str, Any]:
             "source": "brave",
             "price": None,
             "store": _infer_store(url),
+            "freshness": None,
         })
 
+    out: Dict[str, Any] = {"query": product, "precios": precios, "count": len(precios)}
+    if res.get("retry_after"):
+        out["retry_after"] = res["retry_after"]
+    yield "results", {**out, "precios": [dict(p) for p in precios]}
+
+    remaining = deadline.remaining()
+    if use_scraping and precios and remaining is not None and remaining < SCRAPE_MIN_BUDGET_S:
+        deadline.cut("scraping", "skipped")
+        use_scraping = False
+
     if use_scraping and precios:
-        scraped = await scrape_prices_supermarkets([p["url"] for p in precios[:5]])
-        for i, p in enumerate(precios[: len(scraped)]):
-            if i < len(scraped) and scraped[i]:
-                p["price"] = scraped[i].get("price")
-                p["store"] = scraped[i].get("store") or p.get("store")
-                p["source"] = "scraping"
-
-    return {"query": product, "precios": precios, "count": len(precios)}
+        async for i, scraped in scrape_prices_as_completed([p["url"] for p in precios[:5]]):
+            # La descarga fallo con excepcion: la entrada se queda como resultado de Brave (sin evento "price")
+            if not scraped or scraped.get("error"):
+                continue
+            p = precios[i]
+            p["price"] = scraped.get("price")
+            p["store"] = scraped.get("store") or p.get("store")
+            p["source"] = "scraping"
+            p["freshness"] = scraped.get("freshness")
+            p["fetched_at"] = scraped.get("fetched_at")
+            if p["price"] and p["freshness"] in ("live", "revalidated"):
+                name = scraped.get("name")
+                price_history.record(product, p["store"], p["price"], unit=unit_of(name), name=name)
+            yield "price", {"index": i, **p}
+
+    yield "done", out
 
 
 def _infer_store(url: str) -> str:
@@ -9,24 +9,162 @@ Servicios: https://api-dashboard.search.brave.com/documentation/services/web-sea
 - Params: q (required), count (max 20), country, search_lang, extra_snippets, freshness, offset
 - Respuesta: web.results[] con title, url, description; opcional extra_snippets, age
 """
+import calendar
 import os
 import time
-import calendar
-from datetime import datetime, timezone
 import urllib.parse
-from typing import Any, Dict, List, Optional
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Set
 import asyncio
 
-import aiohttp
-
-try:
-    import redis  # type: ignore
-except Exception:
-    redis = None
+from app import deadline, tracing
+from app.metrics import BRAVE_HTTP, BRAVE_RATE_WAIT
+from app.net.client import http_client
+from app.search.cache import SearchCache
+from app.search.prewarm import HotSet, Prewarmer
+from app.search.ratelimit import BraveLimiter, seconds_to_month_end
+from app.search.singleflight import SingleFlight
 
 BASE_URL = "https://api.search.brave.com/res/v1/web/search"
 COUNT_MAX = 20  # API max per request (doc: count max 20)
 OFFSET_MAX = 9  # API max offset (doc: offset max 9)
+HTTP_TIMEOUT_S = 12.0
+# Tiempo minimo para que valga la pena llamar a Brave dentro de un deadline
+MIN_BUDGET_S = float(os.getenv("BRAVE_MIN_BUDGET_MS", "300")) / 1000.0
+
+
+class QuotaPlanner:
+    """
+    Reparte BRAVE_MONTHLY_QUOTA a lo largo del mes segun el trafico observado por hora del dia.
+    Curva de presupuesto: quota * (peso de horas transcurridas / peso total del mes), donde el peso
+    de cada hora es la demanda observada (EWMA) en esa hora del dia. Si lo gastado supera la curva
+    (+ BRAVE_BUDGET_SLACK), las llamadas de poco valor (background o con copia stale disponible) no
+    gastan cuota y se sirven del cache.
+    """
+
+    def __init__(self, limiter: BraveLimiter):
+        self.limiter = limiter
+        self.slack: float = float(os.getenv("BRAVE_BUDGET_SLACK", "0.02"))
+        self.refresh_s: float = float(os.getenv("BRAVE_BUDGET_REFRESH_S", "5"))
+        self.decay: float = float(os.getenv("BRAVE_BUDGET_DECAY", "0.99"))
+        self._hourly: List[float] = [1.0] * 24
+        self._hour_mark: Optional[int] = None
+        self._spends: Deque[float] = deque()
+        self._used: int = 0
+        self._used_ts: float = 0.0
+        self.stats: Dict[str, int] = {"admitted": 0, "deferred": 0}
+
+    def note_demand(self, now: Optional[datetime] = None) -> None:
+        """Cada busqueda (incluidos aciertos de cache) alimenta el perfil horario."""
+        now = now or datetime.now(timezone.utc)
+        mark = int(now.timestamp() // 3600)
+        if self._hour_mark is not None and mark > self._hour_mark:
+            factor = self.decay ** min(mark - self._hour_mark, 24 * 30)
+            self._hourly = [w * factor for w in self._hourly]
+        self._hour_mark = mark
+        self._hourly[now.hour] += 1.0
+
+    @property
+    def used(self) -> int:
+        """Cuota gastada en el mes segun la ultima lectura (se refresca cada BRAVE_BUDGET_REFRESH_S)."""
+        return self._used
+
+    def note_spend(self) -> None:
+        now = time.time()
+        self._used += 1
+        self._spends.append(now)
+        while self._spends and self._spends[0] < now - 3600:
+            self._spends.popleft()
+
+    async def _refresh_used(self) -> None:
+        if time.monotonic() - self._used_ts < self.refresh_s:
+            return
+        self._used_ts = time.monotonic()
+        self._used = await self.limiter.quota_used()
+
+    def _elapsed_fraction(self, now: datetime) -> float:
+        day_weight = sum(self._hourly) or 1.0
+        days = calendar.monthrange(now.year, now.month)[1]
+        elapsed = (now.day - 1) * day_weight
+        elapsed += sum(self._hourly[: now.hour])
+        elapsed += self._hourly[now.hour] * (now.minute * 60 + now.second) / 3600.0
+        return min(1.0, elapsed / (days * day_weight))
+
+    def budget_now(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now(timezone.utc)
+        return self.limiter.monthly_quota * self._elapsed_fraction(now)
+
+    def over_budget(self, now: Optional[datetime] = None) -> bool:
+        allowance = self.budget_now(now) + self.slack * self.limiter.monthly_quota
+        return self._used >= allowance
+
+    async def admit(self, priority: str, has_substitute: bool) -> bool:
+        """False = no gastar cuota ahora (servir stale/local)."""
+        await self._refresh_used()
+        if not self.over_budget():
+            self.stats["admitted"] += 1
+            return True
+        if priority == "background" or has_substitute:
+            self.stats["deferred"] += 1
+            return False
+        self.stats["admitted"] += 1
+        return True
+
+    async def snapshot(self) -> Dict[str, Any]:
+        await self._refresh_used()
+        now = datetime.now(timezone.utc)
+        quota = self.limiter.monthly_quota
+        remaining = max(0, quota - self._used)
+        hours_left = seconds_to_month_end(now) / 3600.0
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        hours_elapsed = max(1.0 / 60, (now - month_start).total_seconds() / 3600.0)
+        burn_last_hour = float(len([t for t in self._spends if t >= time.time() - 3600]))
+        burn_month_avg = self._used / hours_elapsed
+        burn = max(burn_last_hour, burn_month_avg)
+        exhaustion = None
+        if burn > 0:
+            exhaustion = (now + timedelta(hours=remaining / burn)).isoformat()
+        day_weight = sum(self._hourly) or 1.0
+        return {
+            "quota": quota,
+            "used": self._used,
+            "remaining": remaining,
+            "budget_now": round(self.budget_now(now), 1),
+            "over_budget": self.over_budget(now),
+            "allowance_per_hour": round(remaining / max(hours_left, 1.0 / 60), 2),
+            "allowance_this_hour": round(remaining * (self._hourly[now.hour] / day_weight) * 24 / max(hours_left, 1.0 / 60), 2),
+            "burn_rate_per_hour": {"last_hour": burn_last_hour, "month_avg": round(burn_month_avg, 2)},
+            "projected_exhaustion": exhaustion,
+            "month_end": (now + timedelta(seconds=seconds_to_month_end(now))).isoformat(),
+            "hourly_profile": [round(w / day_weight, 4) for w in self._hourly],
+            **self.stats,
+        }
+
+
+class Reservation:
+    """
+    Huecos de rate y unidades de cuota reservados de una vez para varias busquedas (ej. menu del dia).
+    Cada busqueda toma el siguiente hueco (instante monotonic en que puede salir); lo no usado se
+    devuelve a la cuota con release().
+    """
+
+    def __init__(self, limiter: BraveLimiter, slots: List[float], retry_after: Optional[float] = None):
+        self._limiter = limiter
+        self._slots: Deque[float] = deque(slots)
+        self.granted = len(slots)
+        self.retry_after = retry_after
+
+    @property
+    def remaining(self) -> int:
+        return len(self._slots)
+
+    def take(self) -> Optional[float]:
+        return self._slots.popleft() if self._slots else None
+
+    async def release(self) -> None:
+        unused, self._slots = len(self._slots), deque()
+        await self._limiter.release_quota(unused)
 
 
 class ProviderSearch:
@@ -34,15 +172,16 @@ class ProviderSearch:
         self.brave_api_key: Optional[str] = os.getenv("BRAVE_API_KEY")
         self.max_rps: float = float(os.getenv("BRAVE_MAX_RPS", "0.8"))
         self.monthly_quota: int = int(os.getenv("BRAVE_MONTHLY_QUOTA", "2000"))
-        self._last_request_ts: float = 0.0
-        self._rate_lock: Optional[asyncio.Lock] = None
-        self._redis = None
-        url = os.getenv("REDIS_URL") or ""
-        if url and redis is not None:
-            try:
-                self._redis = redis.Redis.from_url(url, decode_responses=True)
-            except Exception:
-                self._redis = None
+        self.limiter = BraveLimiter(self.max_rps, self.monthly_quota)
+        self.planner = QuotaPlanner(self.limiter)
+        self.cache = SearchCache()
+        self.singleflight = SingleFlight()
+        # Ventana tras el vencimiento en la que una copia se sirve al instante mientras se renueva
+        self.swr_window_s: float = float(os.getenv("SEARCH_SWR_WINDOW_S", "3600"))
+        self.hot = HotSet()
+        self.prewarmer = Prewarmer(self)
+        self._revalidating: Set[str] = set()
+        self.stats: Dict[str, int] = {"swr_served": 0, "revalidations": 0, "revalidate_errors": 0}
 
     def _build_params(
         self,
@@ -81,13 +220,25 @@ class ProviderSearch:
         extra_snippets: bool = False,
         freshness: Optional[str] = None,
         offset: int = 0,
+        priority: str = "interactive",
+        reservation: Optional[Reservation] = None,
     ) -> Dict[str, Any]:
         if not self.brave_api_key:
-            return {"results": [], "query": {"original": query, "more_results_available": False}}
-        if not await self._respect_rps():
-            return {"results": [], "query": {"original": query, "more_results_available": False}}
-        if not await self._respect_monthly_quota():
-            return {"results": [], "query": {"original": query, "more_results_available": False}}
+            return _empty(query, "no_api_key")
+        remaining = deadline.remaining()
+        if remaining is not None and remaining < MIN_BUDGET_S:
+            deadline.cut("brave", "no_time")
+            return _empty(query, "deadline")
+        max_wait = None if remaining is None else remaining - MIN_BUDGET_S
+
+        waited = time.perf_counter()
+        wait_span = tracing.span("brave.rate_wait", priority=priority)
+        with wait_span:
+            res = await self._wait_slot(query, priority, reservation, max_wait)
+        if res is not None:
+            wait_span.set(rejected=res.get("error"))
+            return res
+        BRAVE_RATE_WAIT.observe(time.perf_counter() - waited, priority)
 
         params = self._build_params(
             query, topK=topK, country=country, search_lang=search_lang,
@@ -100,14 +251,28 @@ class ProviderSearch:
             "X-Subscription-Token": self.brave_api_key,
         }
 
-        async with aiohttp.ClientSession() as session:
+        timeout = deadline.clamp(HTTP_TIMEOUT_S)
+        sent = time.perf_counter()
+        with tracing.span("brave.http", query=query) as http_span:
             try:
-                async with session.get(url, headers=headers, timeout=12) as r:
+                async with http_client.get(url, headers=headers, timeout=timeout) as r:
+                    http_span.set(status=r.status)
                     if r.status != 200:
-                        return {"results": [], "query": {"original": query, "more_results_available": False}}
+                        BRAVE_HTTP.observe(time.perf_counter() - sent, str(r.status))
+                        return _empty(query, f"http_{r.status}")
                     data = await r.json()
+                BRAVE_HTTP.observe(time.perf_counter() - sent, "200")
+            except asyncio.TimeoutError:
+                BRAVE_HTTP.observe(time.perf_counter() - sent, "timeout")
+                http_span.set(status="timeout")
+                if timeout < HTTP_TIMEOUT_S:
+                    deadline.cut("brave", "timeout")
+                    return _empty(query, "deadline")
+                return _empty(query, "request_failed")
             except Exception:
-                return {"results": [], "query": {"original": query, "more_results_available": False}}
+                BRAVE_HTTP.observe(time.perf_counter() - sent, "error")
+                http_span.set(status="error")
+                return _empty(query, "request_failed")
 
         raw_results = (data.get("web") or {}).get("results") or []
         query_info = data.get("query") or {}
@@ -128,50 +293,60 @@ class ProviderSearch:
 
         return {"results": results, "query": {"original": query, "more_results_available": more}}
 
-    async def _respect_rps(self) -> bool:
-        if self.max_rps <= 0:
-            return False
-        min_interval = 1.0 / self.max_rps
-        if self._rate_lock is None:
-            self._rate_lock = asyncio.Lock()
-        async with self._rate_lock:
-            now = time.monotonic()
-            wait_s = self._last_request_ts + min_interval - now
-            if wait_s > 0:
-                try:
-                    await asyncio.sleep(wait_s)
-                except Exception:
-                    pass
-            self._last_request_ts = time.monotonic()
-        return True
+    async def _wait_slot(
+        self,
+        query: str,
+        priority: str,
+        reservation: Optional[Reservation],
+        max_wait: Optional[float],
+    ) -> Optional[Dict[str, Any]]:
+        """Hueco de rate (reservado o del limiter) y espera hasta el; None = se puede llamar, si no la respuesta vacia."""
+        slot = reservation.take() if reservation is not None else None
+        if slot is not None:
+            wait_s = slot - time.monotonic()
+            if max_wait is not None and wait_s > max_wait:
+                await self.limiter.release_quota(1)
+                deadline.cut("brave_rate_wait", "slot_after_deadline")
+                return _empty(query, "deadline")
+        else:
+            admission = await self.limiter.acquire(priority, max_wait=max_wait)
+            if not admission.ok:
+                if max_wait is not None and admission.reason == "rate_limited":
+                    deadline.cut("brave_rate_wait", "slot_after_deadline")
+                return _empty(query, admission.reason, retry_after=admission.retry_after)
+            wait_s = admission.wait_s
+        self.planner.note_spend()
+        if wait_s > 0:
+            await asyncio.sleep(wait_s)
+        return None
 
-    async def _respect_monthly_quota(self) -> bool:
-        if self.monthly_quota <= 0:
-            return False
-        ym = datetime.now(timezone.utc).strftime("%Y-%m")
-        key = f"brave:quota:{ym}"
-        if self._redis is not None:
-            try:
-                val = self._redis.incr(key)
-                now = datetime.now(timezone.utc)
-                last_day = calendar.monthrange(now.year, now.month)[1]
-                end_of_month = datetime(now.year, now.month, last_day, 23, 59, 59, tzinfo=timezone.utc)
-                ttl = int((end_of_month - now).total_seconds())
-                if ttl > 0:
-                    self._redis.expire(key, ttl)
-                if int(val) > self.monthly_quota:
-                    return False
-                return True
-            except Exception:
-                pass
-        if not hasattr(self, "_monthly_counts"):
-            setattr(self, "_monthly_counts", {})
-        counts = getattr(self, "_monthly_counts")
-        current = int(counts.get(ym, 0)) + 1
-        counts[ym] = current
-        if current > self.monthly_quota:
-            return False
-        return True
+    async def reserve(self, n: int, priority: str = "interactive") -> Reservation:
+        """Reserva n huecos de rate + n unidades de cuota en una sola operacion atomica."""
+        if n <= 0 or not self.brave_api_key:
+            return Reservation(self.limiter, [])
+        if not await self.planner.admit(priority, has_substitute=False):
+            return Reservation(self.limiter, [])
+        admission = await self.limiter.acquire(priority, cost=n)
+        if not admission.ok:
+            return Reservation(self.limiter, [], retry_after=admission.retry_after)
+        interval = 1.0 / self.limiter.max_rps
+        first = time.monotonic() + admission.wait_s
+        return Reservation(self.limiter, [first + i * interval for i in range(n)])
+
+    def peek(
+        self,
+        query: str,
+        topK: int = 10,
+        country: Optional[str] = None,
+        search_lang: Optional[str] = None,
+        extra_snippets: bool = False,
+        freshness: Optional[str] = None,
+        offset: int = 0,
+        key_query: Optional[str] = None,
+    ) -> bool:
+        """True si la busqueda tiene respuesta vigente en cache (no gastaria cuota)."""
+        key = self.cache.make_key(key_query or query, topK, country, search_lang, extra_snippets, freshness, offset)
+        return self.cache.peek(key)
 
     async def search(
         self,
@@ -182,6 +357,10 @@ class ProviderSearch:
         extra_snippets: bool = False,
         freshness: Optional[str] = None,
         offset: int = 0,
+        cache_ttl: Optional[int] = None,
+        priority: str = "interactive",
+        reservation: Optional[Reservation] = None,
+        key_query: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Web Search segun documentacion Brave.
@@ -189,16 +368,118 @@ class ProviderSearch:
         search_lang: idioma contenido (ej. es, en).
         extra_snippets: hasta 5 fragmentos extra por resultado (doc).
         freshness: pd|pw|pm|py o rango custom.
+        cache_ttl: segundos en cache para esta tool (None = SEARCH_CACHE_TTL, 0 = sin cache).
+        priority: interactive (Alexa) | background; si no hay hueco se devuelve error + retry_after sin esperar.
+        reservation: huecos reservados con reserve(); si quedan, se usa uno en vez de pedir al limiter.
+        key_query: texto para la clave de cache y single-flight en lugar de query (forma canonica,
+          app/search/canonical.py); a Brave se manda query.
         """
-        return await self._search_brave(
-            query,
-            topK=topK,
-            country=country,
-            search_lang=search_lang,
-            extra_snippets=extra_snippets,
-            freshness=freshness,
-            offset=offset,
-        )
+        with tracing.span("search", query=query) as sp:
+            res = await self._search(
+                query, topK, country, search_lang, extra_snippets, freshness, offset, cache_ttl, priority, reservation, key_query
+            )
+            sp.set(cache=res.get("cache"))
+            if res.get("error"):
+                sp.set(error=res["error"])
+        return res
+
+    async def _search(
+        self,
+        query: str,
+        topK: int = 10,
+        country: Optional[str] = None,
+        search_lang: Optional[str] = None,
+        extra_snippets: bool = False,
+        freshness: Optional[str] = None,
+        offset: int = 0,
+        cache_ttl: Optional[int] = None,
+        priority: str = "interactive",
+        reservation: Optional[Reservation] = None,
+        key_query: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        args: Dict[str, Any] = {
+            "query": query,
+            "topK": topK,
+            "country": country,
+            "search_lang": search_lang,
+            "extra_snippets": extra_snippets,
+            "freshness": freshness,
+            "offset": offset,
+        }
+        key = self.cache.make_key(**{**args, "query": key_query or query})
+        use_cache = cache_ttl is None or cache_ttl > 0
+        self.planner.note_demand()
+        if use_cache:
+            self.hot.note(key, args, cache_ttl)
+        entry = await self.cache.get(key, allow_stale=True) if use_cache else None
+        if entry is not None and entry.fresh:
+            return {**entry.value, "cache": "hit"}
+
+        # Stale-while-revalidate: copia reciente vencida -> se sirve ya y se renueva en segundo plano
+        if entry is not None and reservation is None and time.time() < entry.expires_at + self.swr_window_s:
+            self.stats["swr_served"] += 1
+            self.revalidate_later(key, args, cache_ttl)
+            return {**entry.value, "cache": "stale", "revalidating": True}
+
+        if reservation is None and not await self.planner.admit(priority, has_substitute=entry is not None):
+            if entry is not None:
+                return {**entry.value, "cache": "stale"}
+            return _empty(query, "budget_deferred")
+
+        res = await self.singleflight.do(key, lambda: self._fetch(key, args, cache_ttl, priority, reservation))
+        if res.get("error") and entry is not None:
+            return {**entry.value, "cache": "stale", "error": res["error"]}
+        return {**res, "cache": "miss"}
+
+    async def _fetch(
+        self,
+        key: str,
+        args: Dict[str, Any],
+        cache_ttl: Optional[int],
+        priority: str,
+        reservation: Optional[Reservation],
+    ) -> Dict[str, Any]:
+        res = await self._search_brave(**args, priority=priority, reservation=reservation)
+        if not res.get("error"):
+            await self.cache.set(key, res, ttl=cache_ttl)
+        return res
+
+    async def revalidate(self, key: str, args: Dict[str, Any], cache_ttl: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        Renueva una clave con prioridad background (solo huecos libres de rate, sin esperar).
+        None si el presupuesto de cuota no lo permite ahora.
+        """
+        if not await self.planner.admit("background", has_substitute=True):
+            return None
+        self.stats["revalidations"] += 1
+        old = self.cache.entry(key)
+        res = await self.singleflight.do(key, lambda: self._fetch(key, args, cache_ttl, "background", None))
+        if res.get("error"):
+            self.stats["revalidate_errors"] += 1
+        else:
+            self.hot.note_refresh(key, None if old is None else time.time() - old.expires_at)
+        return res
+
+    def revalidate_later(self, key: str, args: Dict[str, Any], cache_ttl: Optional[int]) -> None:
+        """Lanza revalidate() sin deadline; una sola renovacion en vuelo por clave."""
+        if key in self._revalidating:
+            return
+        self._revalidating.add(key)
+        task = deadline.detach(self.revalidate(key, args, cache_ttl))
+        task.add_done_callback(lambda t, k=key: self._revalidated(k, t))
+
+    def _revalidated(self, key: str, task: "asyncio.Future[Any]") -> None:
+        self._revalidating.discard(key)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["revalidate_errors"] += 1
+
+
+def _empty(query: str, error: str, retry_after: Optional[float] = None) -> Dict[str, Any]:
+    """Respuesta vacia con motivo (no se guarda en cache)."""
+    out: Dict[str, Any] = {"results": [], "query": {"original": query, "more_results_available": False}, "error": error}
+    if retry_after:
+        out["retry_after"] = retry_after
+    return out
 
 
 provider_search = ProviderSearch()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Rate limit (token bucket / GCRA) y contador de cuota mensual para Brave, compartidos entre workers.
+- Con REDIS_URL: scripts Lua atomicos sobre redis.asyncio (no bloquea el event loop).
+- Sin Redis (o si falla): mismo algoritmo en memoria del proceso.
+Nunca se duerme con un lock tomado: acquire() reserva el siguiente hueco y devuelve cuanto esperar;
+si la espera supera la tolerancia de la prioridad, rechaza con retry_after.
+
+Prioridades:
+- interactive: llamadas de Alexa; esperan hasta BRAVE_MAX_WAIT_INTERACTIVE segundos (default 2.0).
+- background: prewarming / trabajo diferido; solo entra si hay hueco libre ahora (BRAVE_MAX_WAIT_BACKGROUND, default 0).
+"""
+import calendar
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+try:
+    import redis.asyncio as redis_async  # type: ignore
+except Exception:
+    redis_async = None
+
+RATE_KEY = "brave:rate:tat"
+QUOTA_KEY_PREFIX = "brave:quota:"
+
+PRIORITIES = ("interactive", "background")
+
+# GCRA: KEYS[1]=tat, ARGV = interval, cost, max_wait. Devuelve {admitido, espera|retry_after} (strings: Lua trunca floats).
+_RATE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - now
+if wait > max_wait then
+  return {0, tostring(wait - max_wait)}
+end
+local new_tat = tat + interval * cost
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+# KEYS[1]=contador del mes, ARGV = cost, expire_at, quota. Devuelve {admitido, usados}.
+_QUOTA_LUA = """
+local cost = tonumber(ARGV[1])
+local quota = tonumber(ARGV[3])
+local v = redis.call('INCRBY', KEYS[1], cost)
+redis.call('EXPIREAT', KEYS[1], ARGV[2])
+if v > quota then
+  redis.call('DECRBY', KEYS[1], cost)
+  return {0, v - cost}
+end
+return {1, v}
+"""
+
+
+class Admission:
+    __slots__ = ("ok", "wait_s", "retry_after", "reason")
+
+    def __init__(self, ok: bool, wait_s: float = 0.0, retry_after: float = 0.0, reason: str = ""):
+        self.ok = ok
+        self.wait_s = wait_s
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def _month_key(now: Optional[datetime] = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    return now.strftime("%Y-%m")
+
+
+def seconds_to_month_end(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now(timezone.utc)
+    last_day = calendar.monthrange(now.year, now.month)[1]
+    end_of_month = datetime(now.year, now.month, last_day, 23, 59, 59, tzinfo=timezone.utc)
+    return max(1.0, (end_of_month - now).total_seconds())
+
+
+class BraveLimiter:
+    def __init__(self, max_rps: float, monthly_quota: int):
+        self.max_rps = max_rps
+        self.monthly_quota = monthly_quota
+        self.max_wait: Dict[str, float] = {
+            "interactive": float(os.getenv("BRAVE_MAX_WAIT_INTERACTIVE", "2.0")),
+            "background": float(os.getenv("BRAVE_MAX_WAIT_BACKGROUND", "0")),
+        }
+        self._tat: float = 0.0
+        self._monthly_counts: Dict[str, int] = {}
+        self._redis = None
+        self._rate_script = None
+        self._quota_script = None
+        url = os.getenv("REDIS_URL") or ""
+        if url and redis_async is not None:
+            try:
+                self._redis = redis_async.Redis.from_url(url, decode_responses=True)
+                self._rate_script = self._redis.register_script(_RATE_LUA)
+                self._quota_script = self._redis.register_script(_QUOTA_LUA)
+            except Exception:
+                self._redis = None
+        self.stats: Dict[str, Any] = {
+            "admitted": {p: 0 for p in PRIORITIES},
+            "rejected_rate": {p: 0 for p in PRIORITIES},
+            "rejected_quota": 0,
+            "redis_errors": 0,
+            "wait_s_total": 0.0,
+        }
+
+    @staticmethod
+    def normalize_priority(priority: Optional[str]) -> str:
+        return priority if priority in PRIORITIES else "interactive"
+
+    async def acquire(self, priority: str = "interactive", cost: int = 1, max_wait: Optional[float] = None) -> Admission:
+        """
+        Reserva cost huecos de rate y cost unidades de cuota. No duerme: el llamador espera wait_s.
+        max_wait recorta la tolerancia de la prioridad (ej. al tiempo restante del deadline).
+        """
+        priority = self.normalize_priority(priority)
+        if self.max_rps <= 0:
+            return Admission(False, reason="rate_limited", retry_after=60.0)
+        if self.monthly_quota <= 0:
+            return Admission(False, reason="quota_exceeded", retry_after=seconds_to_month_end())
+
+        ok, _used = await self._acquire_quota(cost)
+        if not ok:
+            self.stats["rejected_quota"] += 1
+            return Admission(False, retry_after=round(seconds_to_month_end(), 0), reason="quota_exceeded")
+
+        tolerance = self.max_wait[priority] if max_wait is None else max(0.0, min(self.max_wait[priority], max_wait))
+        ok, value = await self._acquire_rate(cost, tolerance)
+        if not ok:
+            await self.release_quota(cost)
+            self.stats["rejected_rate"][priority] += 1
+            return Admission(False, retry_after=round(value, 3), reason="rate_limited")
+        wait_s = value
+
+        self.stats["admitted"][priority] += 1
+        self.stats["wait_s_total"] += wait_s
+        return Admission(True, wait_s=wait_s)
+
+    async def _acquire_rate(self, cost: int, max_wait: float):
+        interval = 1.0 / self.max_rps
+        if self._redis is not None:
+            try:
+                ok, value = await self._rate_script(keys=[RATE_KEY], args=[interval, cost, max_wait])
+                return bool(int(ok)), float(value)
+            except Exception:
+                self.stats["redis_errors"] += 1
+        now = time.time()
+        tat = max(self._tat, now)
+        wait = tat - now
+        if wait > max_wait:
+            return False, wait - max_wait
+        self._tat = tat + interval * cost
+        return True, wait
+
+    async def _acquire_quota(self, cost: int):
+        ym = _month_key()
+        if self._redis is not None:
+            try:
+                expire_at = int(time.time() + seconds_to_month_end())
+                ok, used = await self._quota_script(
+                    keys=[QUOTA_KEY_PREFIX + ym], args=[cost, expire_at, self.monthly_quota]
+                )
+                return bool(int(ok)), int(used)
+            except Exception:
+                self.stats["redis_errors"] += 1
+        current = self._monthly_counts.get(ym, 0) + cost
+        if current > self.monthly_quota:
+            return False, current - cost
+        self._monthly_counts[ym] = current
+        return True, current
+
+    async def quota_used(self) -> int:
+        ym = _month_key()
+        if self._redis is not None:
+            try:
+                return int(await self._redis.get(QUOTA_KEY_PREFIX + ym) or 0)
+            except Exception:
+                self.stats["redis_errors"] += 1
+        return int(self._monthly_counts.get(ym, 0))
+
+    async def release_quota(self, cost: int) -> None:
+        """Devuelve unidades de cuota reservadas que no se gastaron."""
+        if cost <= 0:
+            return
+        ym = _month_key()
+        if self._redis is not None:
+            try:
+                await self._redis.decrby(QUOTA_KEY_PREFIX + ym, cost)
+                return
+            except Exception:
+                self.stats["redis_errors"] += 1
+        self._monthly_counts[ym] = max(0, self._monthly_counts.get(ym, 0) - cost)
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out["max_rps"] = self.max_rps
+        out["monthly_quota"] = self.monthly_quota
+        out["max_wait"] = dict(self.max_wait)
+        out["distributed"] = self._redis is not None
+        return out
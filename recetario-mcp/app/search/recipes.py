@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 """
-recetario.recipes_search - Busqueda de recetas MX (Brave + dominios recetas).
+recetario.recipes_search - Busqueda de recetas MX (Brave + dominios recetas, indice local).
 """
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.search.provider import provider_search
+from app.search.canonical import canonicalizer
+from app.search.local_index import tiered_search
+from app.search.provider import Reservation
+
+CACHE_TTL = int(os.getenv("CACHE_TTL_RECIPES", "21600"))
 
 RECETA_DOMAINS = ["allrecipes.com", "recetasgratis.net", "cocinafacil.com.mx", "kiwilimon.com", "mexico.desertcart.com"]
 
 
-async def recipes_search(params: Dict[str, Any]) -> Dict[str, Any]:
+def recipes_query(params: Dict[str, Any], track: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    Query visible y argumentos de provider_search.search para unos params de recipes_search.
+    La consulta a Brave y la clave de cache salen de la forma canonica (app/search/canonical.py).
+    """
     query = params.get("query", "").strip() or params.get("q", "").strip()
     tipo_comida = params.get("tipo_comida", "").strip().lower()
     topK = min(int(params.get("topK", 10)), 20)
@@ -20,14 +29,23 @@ async def recipes_search(params: Dict[str, Any]) -> Dict[str, Any]:
         query = f"{query} {tipo_comida}"
 
     domain_part = " OR ".join(f"site:{d}" for d in RECETA_DOMAINS[:3])
-    boosted = f"{query} ({domain_part})"
-
-    res = await provider_search.search(
-        boosted,
-        topK=topK,
-        country="MX",
-        search_lang="es",
-        extra_snippets=True,
+    upstream, key = canonicalizer.apply(query, "recipe", track=track)
+    args: Dict[str, Any] = {"query": f"{upstream} ({domain_part})", "topK": topK, "country": "MX", "search_lang": "es", "extra_snippets": True}
+    if key is not None:
+        args["key_query"] = f"{key} ({domain_part})"
+    return query, args
+
+
+async def recipes_search(params: Dict[str, Any], reservation: Optional[Reservation] = None) -> Dict[str, Any]:
+    query, search_args = recipes_query(params)
+    res = await tiered_search(
+        "recipe",
+        query,
+        search_args,
+        source=params.get("source"),
+        cache_ttl=CACHE_TTL,
+        priority=params.get("priority") or "interactive",
+        reservation=reservation,
     )
     results = res.get("results") or []
 
@@ -38,7 +56,12 @@ async def recipes_search(params: Dict[str, Any]) -> Dict[str, Any]:
             "url": r.get("url"),
             "snippet": r.get("snippet"),
             "extra_snippets": r.get("extra_snippets"),
-            "source": "brave",
+            "source": r.get("source") or "brave",
         })
 
-    return {"query": query, "recetas": recetas, "count": len(recetas)}
+    out: Dict[str, Any] = {"query": query, "recetas": recetas, "count": len(recetas), "source": res["source"]}
+    if res.get("fallback"):
+        out["fallback"] = res["fallback"]
+    if res.get("retry_after"):
+        out["retry_after"] = res["retry_after"]
+    return out
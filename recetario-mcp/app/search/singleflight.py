@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Single-flight: busquedas identicas concurrentes comparten una sola llamada a Brave (y una unidad de cuota).
+El primer llamador lanza la tarea; los que llegan mientras esta en vuelo esperan el mismo futuro.
+- La tarea compartida corre aparte (shield): cancelar a un llamador no cancela a los demas.
+- Si todos los llamadores cancelan, la tarea se cancela y la clave queda libre en ese momento.
+- Las excepciones se propagan a todos los que esperan.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "leaders": 0,
+            "collapsed": 0,
+            "cancelled": 0,
+            "errors": 0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.stats["collapsed"] += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(key, 0) <= 1:
+                # Liberar la clave ya: quien llegue mientras la tarea muere abre un vuelo nuevo
+                if self._inflight.get(key) is task:
+                    self._inflight.pop(key, None)
+                    self._waiters.pop(key, None)
+                task.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            if key in self._waiters and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+            self._waiters.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out["in_flight"] = len(self._inflight)
+        return out
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """
 recetario.stores_search - Supermercados / tiendas (Brave + dominios MX).
+stores_search_events es la variante para streaming (mismos eventos que prices_search_events, sin precios).
 """
-from typing import Any, Dict, List
+import os
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from app.search.provider import provider_search
 
+CACHE_TTL = int(os.getenv("CACHE_TTL_STORES", "86400"))
+
 STORE_DOMAINS = ["walmart.com.mx", "soriana.com", "chedraui.com.mx", "heb.com.mx", "lacomer.com.mx"]
 
 
@@ -27,6 +31,8 @@ async def stores_search(params: Dict[str, Any]) -> Dict[str, Any]:
         topK=topK,
         country="MX",
         search_lang="es",
+        cache_ttl=CACHE_TTL,
+        priority=params.get("priority") or "interactive",
     )
     results = res.get("results") or []
 
@@ -42,7 +48,17 @@ async def stores_search(params: Dict[str, Any]) -> Dict[str, Any]:
             "source": "brave",
         })
 
-    return {"query": query, "stores": stores, "count": len(stores)}
+    out: Dict[str, Any] = {"query": query, "stores": stores, "count": len(stores)}
+    if res.get("retry_after"):
+        out["retry_after"] = res["retry_after"]
+    return out
+
+
+async def stores_search_events(params: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """("results", resultado) en cuanto responde Brave y ("done", resultado): no hay nada que scrapear."""
+    out = await stores_search(params)
+    yield "results", out
+    yield "done", out
 
 
 def _infer_store_name(url: str) -> str:
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Trazas por peticion: spans ligeros por etapa (tool, busqueda, rate limit, Brave, scraping, parseo).
+Como el deadline (app/deadline.py), la traza viaja en un ContextVar y las tareas asyncio la heredan;
+el span padre tambien, asi que los spans de tareas concurrentes (scraping de varias URLs) cuelgan
+del span que las lanzo.
+
+- Sin traza activa, span() devuelve un objeto nulo compartido: el costo es leer un ContextVar.
+- Se traza una peticion si trae la cabecera X-Debug-Timing (la respuesta incluye "timing" con los spans
+  y el total por etapa) o, con TRACE_FILE, una fraccion TRACE_SAMPLE_RATE de todas.
+- Exportacion a TRACE_FILE (una linea JSON por traza): TRACE_FORMAT=json (spans con offsets en ms) u
+  otlp (ExportTraceServiceRequest de OTLP/JSON: resourceSpans -> scopeSpans -> spans, tiempos en ns).
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+TRACE_FILE: str = os.getenv("TRACE_FILE", "")
+TRACE_FORMAT: str = (os.getenv("TRACE_FORMAT") or "json").strip().lower()
+SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+MAX_SPANS: int = int(os.getenv("TRACE_MAX_SPANS", "500"))
+SERVICE_NAME = "recetario-mcp"
+
+_write_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attrs", "_token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs = attrs
+        self._token = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self._token = _span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _span.reset(self._token)
+
+    def duration_ms(self, now: Optional[float] = None) -> float:
+        end = self.end if self.end is not None else (now or time.perf_counter())
+        return (end - self.start) * 1000.0
+
+
+class _NullSpan:
+    """span() sin traza activa."""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "debug", "started_wall", "spans", "dropped")
+
+    def __init__(self, debug: bool):
+        self.trace_id = os.urandom(16).hex()
+        self.debug = debug
+        self.started_wall = time.time()
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+    def open(self, name: str, parent: Optional[Span], attrs: Dict[str, Any]) -> Any:
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return _NULL
+        s = Span(self, name, parent.span_id if parent is not None else None, attrs)
+        self.spans.append(s)
+        return s
+
+    def summary(self) -> Dict[str, Any]:
+        """Desglose para la respuesta: spans en orden de inicio (offset y duracion en ms) y total por etapa."""
+        now = time.perf_counter()
+        t0 = self.spans[0].start if self.spans else now
+        spans = []
+        by_stage: Dict[str, float] = {}
+        for s in self.spans:
+            ms = s.duration_ms(now)
+            by_stage[s.name] = by_stage.get(s.name, 0.0) + ms
+            item: Dict[str, Any] = {
+                "name": s.name,
+                "id": s.span_id,
+                "parent": s.parent_id,
+                "start_ms": round((s.start - t0) * 1000.0, 2),
+                "ms": round(ms, 2),
+            }
+            if s.attrs:
+                item["attrs"] = s.attrs
+            spans.append(item)
+        out: Dict[str, Any] = {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.spans[0].duration_ms(now), 2) if self.spans else 0.0,
+            "by_stage_ms": {k: round(v, 2) for k, v in sorted(by_stage.items(), key=lambda kv: -kv[1])},
+            "spans": spans,
+        }
+        if self.dropped:
+            out["dropped_spans"] = self.dropped
+        return out
+
+    def otlp(self) -> Dict[str, Any]:
+        """Registro OTLP/JSON (ExportTraceServiceRequest) con todos los spans de la traza."""
+        now = time.perf_counter()
+        t0 = self.spans[0].start if self.spans else now
+        base_ns = int(self.started_wall * 1e9)
+        spans = []
+        for s in self.spans:
+            start_ns = base_ns + int((s.start - t0) * 1e9)
+            item: Dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(s.duration_ms(now) * 1e6)),
+                "attributes": [_otlp_attr(k, v) for k, v in s.attrs.items()],
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            if "error" in s.attrs:
+                item["status"] = {"code": 2, "message": str(s.attrs["error"])}
+            spans.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+            }]
+        }
+
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("recetario_trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("recetario_span", default=None)
+
+
+def start(name: str, debug: bool = False, **attrs: Any):
+    """
+    Abre una traza con su span raiz si hay cabecera de debug o si toca muestrear (con TRACE_FILE).
+    Devuelve el token para finish() o None si no se traza. Con una traza ya activa (llamada anidada) no abre otra.
+    """
+    if _trace.get() is not None:
+        return None
+    if not debug and not (TRACE_FILE and random.random() < SAMPLE_RATE):
+        return None
+    trace = Trace(debug)
+    root = trace.open(name, None, attrs)
+    return _trace.set(trace), _span.set(root), root
+
+
+def finish(token) -> None:
+    """Cierra el span raiz, exporta la traza (TRACE_FILE) y restaura el contexto."""
+    if token is None:
+        return
+    trace_token, span_token, root = token
+    root.end = time.perf_counter()
+    trace = _trace.get()
+    _span.reset(span_token)
+    _trace.reset(trace_token)
+    if trace is not None and TRACE_FILE:
+        export_later(trace)
+
+
+def current() -> Optional[Trace]:
+    return _trace.get()
+
+
+def debugging() -> bool:
+    trace = _trace.get()
+    return trace is not None and trace.debug
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """with span("brave.http", status=...) as s: ...; sin traza activa no hace nada."""
+    trace = _trace.get()
+    if trace is None:
+        return _NULL
+    return trace.open(name, _span.get(), attrs)
+
+
+def summary() -> Optional[Dict[str, Any]]:
+    trace = _trace.get()
+    return trace.summary() if trace is not None else None
+
+
+def record(trace: Trace) -> Dict[str, Any]:
+    """Linea a exportar segun TRACE_FORMAT."""
+    if TRACE_FORMAT == "otlp":
+        return trace.otlp()
+    return {"ts": trace.started_wall, **trace.summary()}
+
+
+def _append(line: str) -> None:
+    with _write_lock:
+        directory = os.path.dirname(TRACE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def export_later(trace: Trace) -> None:
+    """Escribe la traza en TRACE_FILE desde un hilo (no bloquea el event loop)."""
+    try:
+        line = json.dumps(record(trace), ensure_ascii=False, default=str)
+    except Exception:
+        return
+    try:
+        asyncio.get_running_loop().run_in_executor(None, _append, line)
+    except RuntimeError:
+        try:
+            _append(line)
+        except OSError:
+            pass
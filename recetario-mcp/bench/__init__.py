@@ -0,0 +1 @@
+# Benchmarks y utilidades de medicion (no se copian a la imagen Docker)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del costo de la pila HTTP por llamada a tool: camino rapido ASGI (app/api/fast.py)
+contra rutas de FastAPI (MCP_FAST_PATH=0), en proceso y sin red.
+
+Llama a app.main:app directo por ASGI (sin uvicorn ni sockets) con API_KEY activa, y sustituye las
+tools por una que devuelve al instante un resultado del tamano de uno real (--results resultados de
+Brave con extra_snippets), asi lo medido es solo auth, parseo, despacho y serializacion:
+
+    python -m bench.asgi [--requests 20000] [--concurrency 32] [--results 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("PREWARM_ENABLED", "0")
+
+from app.api import fast  # noqa: E402
+from app.main import app  # noqa: E402
+from app.mcp.server import recetario_mcp_server  # noqa: E402
+from bench.standins import brave_results  # noqa: E402
+
+TOOL = "recetario.recipes_search"
+
+
+def _payload(n: int) -> Dict[str, Any]:
+    items = brave_results("tacos al pastor", n)
+    return {
+        "query": "tacos al pastor",
+        "results": [
+            {"title": r["title"], "url": r["url"], "snippet": r["description"], "extra_snippets": r["extra_snippets"] * 4, "source": "brave"}
+            for r in items
+        ],
+        "total": len(items),
+        "cached": True,
+    }
+
+
+async def _call(body: bytes, headers: List[Any]) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": f"/mcp/{TOOL}", "raw_path": f"/mcp/{TOOL}".encode(), "query_string": b"", "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    sent = False
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(requests: int, concurrency: int) -> Dict[str, float]:
+    body = json.dumps({"query": "tacos al pastor", "topK": 10}).encode()
+    headers = [(b"host", b"bench"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"x-api-key", os.environ["API_KEY"].encode())]
+    remaining = {"n": requests}
+    bad = {"n": 0}
+
+    async def worker() -> None:
+        while remaining["n"] > 0:
+            remaining["n"] -= 1
+            if await _call(body, headers) != 200:
+                bad["n"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {"requests": requests, "errors": bad["n"], "rps": round(requests / elapsed, 1), "us_per_request": round(elapsed / requests * 1e6, 1)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--results", type=int, default=10, help="resultados en la respuesta de la tool")
+    args = ap.parse_args(argv)
+
+    payload = _payload(args.results)
+
+    async def tool(params: Dict[str, Any]) -> Dict[str, Any]:
+        return payload
+
+    recetario_mcp_server.tools[TOOL] = tool
+    print(f"respuesta de {len(json.dumps(payload)) // 1024} KB, {args.requests} peticiones, concurrencia {args.concurrency}")
+
+    async def run() -> None:
+        for label, enabled in (("fastapi (MCP_FAST_PATH=0)", False), ("camino rapido", True)):
+            fast.ENABLED = enabled
+            await measure(min(1000, args.requests), args.concurrency)  # calentamiento
+            r = await measure(args.requests, args.concurrency)
+            print(f"{label:<28}{r['rps']:>10.1f} req/s{r['us_per_request']:>10.1f} us/peticion  errores {r['errors']}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de extraccion de precio/nombre sobre HTML guardado (bench/fixtures/*.html).
+Compara el motor de reglas compiladas (app/scraping/rules.py, lxml + XPath) contra los parsers
+BeautifulSoup anteriores (copiados abajo como referencia) en paginas por segundo.
+
+Uso (desde recetario-mcp/):
+    python -m bench.extract [--seconds 2]
+"""
+import argparse
+import os
+import re
+import time
+from typing import Any, Callable, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+from app.scraping.rules import extract
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_URLS = {
+    "walmart.html": "https://www.walmart.com.mx/ip/huevo-blanco/00750",
+    "soriana.html": "https://www.soriana.com/jitomate-saladet/1.html",
+    "chedraui.html": "https://www.chedraui.com.mx/arroz-verde-valle/p",
+    "heb.html": "https://www.heb.com.mx/frijol-negro/p",
+    "lacomer.html": "https://www.lacomer.com.mx/lacomer/tortilla",
+}
+
+
+# --- Parsers BeautifulSoup anteriores (referencia) ---
+
+def _legacy_price(text: str) -> Optional[str]:
+    if not text:
+        return None
+    text = text.replace(",", "")
+    match = re.search(r"\$\s*(\d+\.?\d*)", text)
+    if match:
+        return match.group(1)
+    match = re.search(r"(\d+\.?\d*)\s*(?:MXN|pesos)?", text, re.I)
+    if match:
+        return match.group(1)
+    return None
+
+
+def _legacy_select(html: str, url: str, store: str, price_css: str, name_css: str, attrs=("content",)) -> Dict[str, Any]:
+    out = {"url": url, "store": store, "price": None, "name": None}
+    soup = BeautifulSoup(html, "lxml")
+    price_sel = soup.select_one(price_css)
+    if price_sel:
+        content = next((price_sel.get(a) for a in attrs if price_sel.get(a)), None) or price_sel.get_text(strip=True)
+        out["price"] = _legacy_price(str(content))
+    name_sel = soup.select_one(name_css)
+    if name_sel:
+        out["name"] = name_sel.get_text(strip=True)[:200]
+    return out
+
+
+def _legacy_generic(html: str, url: str) -> Dict[str, Any]:
+    out = {"url": url, "store": "Otro", "price": None, "name": None}
+    soup = BeautifulSoup(html, "lxml")
+    for sel in soup.select("[itemprop='price'], .price, [data-price]"):
+        content = sel.get("content") or sel.get("data-price") or sel.get_text(strip=True)
+        p = _legacy_price(str(content))
+        if p:
+            out["price"] = p
+            break
+    for sel in soup.select("h1, [itemprop='name'], .product-title"):
+        t = sel.get_text(strip=True)
+        if t and len(t) < 300:
+            out["name"] = t[:200]
+            break
+    return out
+
+
+def legacy_parse(html: str, url: str) -> Dict[str, Any]:
+    u = url.lower()
+    if "walmart" in u:
+        return _legacy_select(
+            html, url, "Walmart",
+            "[data-automation='product-price'], .price-main .price, [itemprop='price']",
+            "h1[data-automation='product-title'], .product-title, [itemprop='name']",
+        )
+    if "soriana" in u:
+        return _legacy_select(html, url, "Soriana", ".price, [itemprop='price'], .product-price", "h1, .product-name, [itemprop='name']")
+    if "chedraui" in u:
+        return _legacy_select(
+            html, url, "Chedraui",
+            ".price, [itemprop='price'], .product-price, [data-price]",
+            "h1, .product-name, [itemprop='name']",
+            attrs=("content", "data-price"),
+        )
+    return _legacy_generic(html, url)
+
+
+def _rate(fn: Callable[[str, str], Dict[str, Any]], html: str, url: str, seconds: float) -> float:
+    n = 0
+    start = time.perf_counter()
+    while True:
+        fn(html, url)
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return n / elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--seconds", type=float, default=2.0, help="segundos por caso")
+    args = ap.parse_args()
+
+    print(f"{'fixture':<14}{'KB':>6}{'legacy p/s':>12}{'rules p/s':>12}{'speedup':>9}  resultado (rules)")
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            html = f.read()
+        url = FIXTURE_URLS.get(name, "https://example.com/" + name)
+        legacy = _rate(legacy_parse, html, url, args.seconds)
+        rules = _rate(extract, html, url, args.seconds)
+        got = extract(html, url)
+        print(
+            f"{name:<14}{len(html) // 1024:>6}{legacy:>12.1f}{rules:>12.1f}{rules / legacy:>8.1f}x"
+            f"  {got['store']} {got['price']} {got['name']!r}"
+        )
+
+
+if __name__ == "__main__":
+    main()
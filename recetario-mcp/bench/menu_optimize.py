@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark del solver de recetario.menu_optimize (app/search/menu_optimize.py).
+Candidatos aleatorios (costo, calorias, relevancia) para desayuno/comida/cena; mide el tiempo de
+solve() segun el numero de candidatos por comida y, para tamanos chicos, lo compara con fuerza bruta.
+
+Uso (desde recetario-mcp/):
+    python -m bench.menu_optimize [--sizes 100,1000,5000,20000] [--budget 250] [--repeat 5]
+"""
+import argparse
+import itertools
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.search.menu_optimize import BUCKETS, CALORIE_SHARE, objective, solve
+
+TIPOS = ["desayuno", "comida", "cena"]
+
+
+def make_candidates(n: int, rng: np.random.Generator, budget: float, kcal: float) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    costs, values = [], []
+    for t in TIPOS:
+        share = CALORIE_SHARE[t]
+        cost = rng.gamma(4.0, budget * share / 4.0, size=n)
+        cal = rng.normal(kcal * share, kcal * share * 0.35, size=n).clip(50)
+        score = rng.random(n)
+        costs.append(cost)
+        values.append(objective(cost, cal, score, budget, kcal * share))
+    return costs, values
+
+
+def brute_force(costs: List[np.ndarray], values: List[np.ndarray], budget: float) -> float:
+    best = np.inf
+    for combo in itertools.product(*(range(len(c)) for c in costs)):
+        if sum(costs[k][j] for k, j in enumerate(combo)) <= budget:
+            best = min(best, sum(values[k][j] for k, j in enumerate(combo)))
+    return best
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", default="10,30,100,1000,5000,20000", help="candidatos por comida")
+    ap.add_argument("--budget", type=float, default=250.0, help="presupuesto diario (MXN)")
+    ap.add_argument("--kcal", type=float, default=2000.0, help="calorias objetivo por dia")
+    ap.add_argument("--repeat", type=int, default=5, help="repeticiones por tamano (mediana)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"buckets={BUCKETS} budget={args.budget} kcal={args.kcal}")
+    print(f"{'n/comida':>9}{'dp ms':>10}{'brute ms':>11}{'dp valor':>11}{'optimo':>10}")
+    for n in (int(s) for s in args.sizes.split(",") if s.strip()):
+        costs, values = make_candidates(n, rng, args.budget, args.kcal)
+        picked, feasible = solve(costs, values, args.budget)
+        dp_ms = _time(lambda: solve(costs, values, args.budget), args.repeat)
+        dp_value = sum(values[k][j] for k, j in enumerate(picked)) if feasible else float("nan")
+        brute_ms, optimum = "-", "-"
+        if n <= 30:
+            start = time.perf_counter()
+            best = brute_force(costs, values, args.budget)
+            brute_ms = f"{(time.perf_counter() - start) * 1000.0:.1f}"
+            optimum = f"{best:.4f}"
+        print(f"{n:>9}{dp_ms:>10.2f}{brute_ms:>11}{dp_value:>11.4f}{optimum:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Reproduce un log de trafico capturado (CAPTURE_FILE, app/capture.py) contra el servicio.
+
+Igual que bench/run.py levanta los sustitutos de Brave y de las tiendas y el servicio en un subproceso
+(o usa --target), pero en vez de un bucle cerrado por tool manda cada llamada del log en su instante
+original relativo, dividido por --speed (bucle abierto: 1 = tiempo real, 10 = diez veces mas rapido).
+Reporta latencias por tool y totales, el retraso del generador respecto al horario del log, las
+llamadas que llegaron a Brave y a las tiendas (contadas por los sustitutos) y la cuota consumida
+(/quota "used" antes y despues):
+
+    CAPTURE_FILE=/var/log/recetario/capture.jsonl uvicorn app.main:app ...   # en produccion
+    python -m bench.replay /var/log/recetario/capture.jsonl --speed 10 --out bench/results/replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from app.capture import read_log
+from bench.run import _git_commit, add_service_args, service_env, start_service, stop_service, summarize, wait_healthy
+from bench.standins import from_args
+
+
+async def _get_json(session: aiohttp.ClientSession, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        async with session.get(url, headers=headers) as r:
+            return await r.json() if r.status == 200 else {}
+    except Exception:
+        return {}
+
+
+async def replay(session: aiohttp.ClientSession, base: str, calls: List[Dict[str, Any]], speed: float, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Lanza cada llamada en (t - t0) / speed; cada una en su propia tarea (no espera a las anteriores)."""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, Dict[str, int]] = {}
+    lags: List[float] = []
+    t0 = float(calls[0]["t"]) if calls else 0.0
+
+    async def send(call: Dict[str, Any]) -> None:
+        tool = call["tool"]
+        call_headers = dict(headers)
+        if call.get("d") not in (None, ""):
+            call_headers["X-Request-Deadline"] = str(call["d"])
+        start = time.perf_counter()
+        kind = None
+        try:
+            async with session.post(f"{base}/mcp/{tool}", json=call.get("p") or {}, headers=call_headers) as r:
+                data = await r.json(content_type=None)
+                if r.status != 200:
+                    kind = f"http_{r.status}"
+                elif not data.get("success"):
+                    kind = "tool_error"
+        except asyncio.TimeoutError:
+            kind = "timeout"
+        except Exception:
+            kind = "connection"
+        latencies.setdefault(tool, []).append((time.perf_counter() - start) * 1000.0)
+        if kind:
+            per_tool = errors.setdefault(tool, {})
+            per_tool[kind] = per_tool.get(kind, 0) + 1
+
+    tasks = []
+    started = time.perf_counter()
+    for call in calls:
+        due = started + (float(call["t"]) - t0) / speed
+        wait = due - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        lags.append(max(0.0, time.perf_counter() - due) * 1000.0)
+        tasks.append(asyncio.ensure_future(send(call)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    tools = {tool: summarize(lat, errors.get(tool, {}), elapsed) for tool, lat in sorted(latencies.items())}
+    all_errors: Dict[str, int] = {}
+    for per_tool in errors.values():
+        for kind, n in per_tool.items():
+            all_errors[kind] = all_errors.get(kind, 0) + n
+    lag = sorted(lags)
+    return {
+        "tools": tools,
+        "total": summarize([x for lat in latencies.values() for x in lat], all_errors, elapsed),
+        "schedule_lag_ms": {"max": round(lag[-1], 2) if lag else 0.0, "mean": round(sum(lag) / len(lag), 2) if lag else 0.0},
+        "log_seconds": round(float(calls[-1]["t"]) - t0, 3) if calls else 0.0,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    calls = read_log(args.log)
+    if args.tools:
+        wanted = {t if t.startswith("recetario.") else f"recetario.{t}" for t in args.tools.split(",")}
+        calls = [c for c in calls if c["tool"] in wanted]
+    if args.limit:
+        calls = calls[: args.limit]
+    if not calls:
+        raise SystemExit(f"sin llamadas que reproducir en {args.log}")
+
+    standins = None
+    service = None
+    tmp = tempfile.mkdtemp(prefix="recetario-replay-")
+    base = args.target.rstrip("/") if args.target else f"http://127.0.0.1:{args.port}"
+    headers = {"X-API-Key": args.api_key} if args.api_key else {}
+    try:
+        if not args.target:
+            standins = from_args(args)
+            await standins.start()
+            service = start_service(args.port, args.workers, service_env(standins, args, tmp), os.path.join(tmp, "service.log"))
+        await wait_healthy(base)
+
+        timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            quota_before = await _get_json(session, f"{base}/quota", headers)
+            print(f"reproduciendo {len(calls)} llamadas de {args.log} a {args.speed:g}x")
+            result = await replay(session, base, calls, args.speed, headers)
+            quota_after = await _get_json(session, f"{base}/quota", headers)
+            stats = await _get_json(session, f"{base}/stats", headers)
+    finally:
+        stop_service(service)
+        upstream = standins.stats() if standins is not None else None
+        if standins is not None:
+            await standins.close()
+
+    used_before, used_after = quota_before.get("used"), quota_after.get("used")
+    cache = stats.get("search_cache") or {}
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "log": args.log,
+            "calls": len(calls),
+            "speed": args.speed,
+            "target": args.target,
+            "workers": None if args.target else args.workers,
+            "brave_latency_ms": args.brave_latency_ms,
+            "store_latency_ms": args.store_latency_ms,
+            "brave_error_rate": args.brave_error_rate,
+            "store_error_rate": args.store_error_rate,
+        },
+        **result,
+        "upstream": upstream,
+        "quota": {
+            "used_before": used_before,
+            "used_after": used_after,
+            "consumed": used_after - used_before if isinstance(used_before, int) and isinstance(used_after, int) else None,
+        },
+        "search_cache": cache,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(f"{'tool':<34}{'req':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for tool, r in list(result["tools"].items()) + [("total", result["total"])]:
+        print(f"{tool:<34}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+    total = result["total"]
+    print(f"\nlog de {result['log_seconds']} s reproducido en {total['seconds']} s ({total['rps']} req/s); "
+          f"retraso del generador: medio {result['schedule_lag_ms']['mean']} ms, max {result['schedule_lag_ms']['max']} ms")
+    upstream = result.get("upstream")
+    if upstream:
+        brave, stores = upstream["brave"], upstream["stores"]
+        print(f"upstream: Brave {brave['requests']} llamadas ({brave['errors']} errores), "
+              f"tiendas {stores['requests']} ({stores['errors']} errores, {stores['not_modified']} 304)")
+    quota = result["quota"]
+    if quota["consumed"] is not None:
+        print(f"cuota Brave consumida: {quota['consumed']} ({quota['used_before']} -> {quota['used_after']})")
+    cache = result.get("search_cache") or {}
+    if "hit_ratio" in cache:
+        print(f"cache de busqueda: hit ratio {cache['hit_ratio']}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("log", help="log de captura (CAPTURE_FILE)")
+    ap.add_argument("--speed", type=float, default=1.0, help="factor de aceleracion (1 = tiempo real)")
+    ap.add_argument("--limit", type=int, default=0, help="reproducir solo las primeras N llamadas")
+    ap.add_argument("--tools", default="", help="solo estas tools (lista separada por comas)")
+    add_service_args(ap)
+    ap.add_argument("--out", default="", help="guardar resultados (JSON)")
+    args = ap.parse_args(argv)
+    if args.speed <= 0:
+        ap.error("--speed debe ser > 0")
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nresultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo de las tools /mcp/recetario.* contra sustitutos locales (bench/standins.py).
+
+Levanta los sustitutos de Brave y de las tiendas, arranca el servicio con uvicorn en un subproceso
+(datos en un directorio temporal, rate limit y cuota holgados) y, por cada tool, mantiene
+--concurrency peticiones en vuelo durante --duration segundos (bucle cerrado). Reporta throughput,
+errores y latencias p50/p95/p99/max, y guarda todo en un JSON (baseline) para comparar corridas:
+
+    python -m bench.run --out bench/results/baseline.json
+    python -m bench.run --compare bench/results/baseline.json   # sale con 1 si hay regresion
+
+Con --target se mide un servicio ya levantado (p. ej. con los sustitutos de `python -m bench.standins`).
+--distinct controla cuantas consultas distintas se rotan (pocas = mas aciertos de cache).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from bench.standins import StandIns, add_knob_args, from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = (
+    "chilaquiles", "pozole", "enchiladas verdes", "tacos al pastor", "mole poblano", "tamales",
+    "huevos rancheros", "sopa de fideo", "arroz rojo", "frijoles charros", "tinga de pollo", "chiles rellenos",
+    "quesadillas", "sopes", "tostadas", "caldo de res", "pescado a la veracruzana", "flautas",
+)
+PRODUCTS = ("huevo", "jitomate", "cebolla", "arroz", "frijol", "tortilla", "queso", "pollo", "aguacate", "leche")
+INGREDIENT_SETS = (
+    ["huevo", "jitomate"], ["pollo", "arroz"], ["tortilla", "queso"], ["frijol", "aguacate"], ["calabacita", "elote"],
+)
+
+
+def _pick(seq, i: int, distinct: int):
+    """i-esima consulta de `distinct` distintas; pasado el tamano de seq se agregan variantes ("pozole 2")."""
+    k = i % max(1, distinct)
+    item = seq[k % len(seq)]
+    if k < len(seq) or not isinstance(item, str):
+        return item
+    return f"{item} {k // len(seq) + 1}"
+
+
+# Cuerpo de cada tool para la i-esima peticion
+WORKLOADS: Dict[str, Callable[[int, int], Dict[str, Any]]] = {
+    "recetario.recipes_search": lambda i, d: {"query": _pick(QUERIES, i, d), "topK": 5},
+    "recetario.ingredients_search": lambda i, d: {"query": _pick(PRODUCTS, i, d)},
+    "recetario.prices_search": lambda i, d: {"query": _pick(PRODUCTS, i, d), "topK": 5},
+    "recetario.stores_search": lambda i, d: {"query": "supermercado", "location": _pick(("CDMX", "Monterrey", "Guadalajara"), i, d)},
+    "recetario.menu_search": lambda i, d: {"query": _pick(QUERIES, i, d), "topK": 3},
+    "recetario.recipes_by_ingredients": lambda i, d: {"ingredientes": _pick(INGREDIENT_SETS, i, d), "topK": 5},
+    "recetario.price_history": lambda i, d: {"product": _pick(PRODUCTS, i, d)},
+    "recetario.menu_optimize": lambda i, d: {"presupuestoDiario": 150 + 10 * (i % max(1, d)), "objetivo": "mantener"},
+}
+# Orden: las tools que alimentan indice e historial van antes que las que los leen
+DEFAULT_TOOLS = list(WORKLOADS)
+
+
+def percentile(sorted_ms: List[float], p: float) -> float:
+    """Percentil por rango mas cercano sobre una lista ordenada."""
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, int(round(p / 100.0 * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+
+async def drive(session: aiohttp.ClientSession, base: str, tool: str, concurrency: int, duration: float, distinct: int, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Bucle cerrado: concurrency trabajadores mandando peticiones durante duration segundos."""
+    url = f"{base}/mcp/{tool}"
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = {"i": 0}
+    stop_at = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < stop_at:
+            i = counter["i"]
+            counter["i"] += 1
+            body = WORKLOADS[tool](i, distinct)
+            start = time.perf_counter()
+            kind = None
+            try:
+                async with session.post(url, json=body, headers=headers) as r:
+                    data = await r.json(content_type=None)
+                    if r.status != 200:
+                        kind = f"http_{r.status}"
+                    elif not data.get("success"):
+                        kind = "tool_error"
+            except asyncio.TimeoutError:
+                kind = "timeout"
+            except Exception:
+                kind = "connection"
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            if kind:
+                errors[kind] = errors.get(kind, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def summarize(latencies: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": sum(errors.values()),
+        "error_kinds": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(lat) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50), 2),
+        "p95_ms": round(percentile(lat, 95), 2),
+        "p99_ms": round(percentile(lat, 99), 2),
+        "max_ms": round(lat[-1], 2) if lat else 0.0,
+        "mean_ms": round(sum(lat) / len(lat), 2) if lat else 0.0,
+    }
+
+
+def start_service(port: int, workers: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "bench.serve:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+
+
+def service_env(standins: StandIns, args: argparse.Namespace, tmp: str) -> Dict[str, str]:
+    """Entorno del servicio: sustitutos, rate y cuota holgados, datos en tmp, sin prewarming; --env al final."""
+    env = {
+        **standins.env(),
+        "BRAVE_MAX_RPS": str(args.brave_rps),
+        "BRAVE_MONTHLY_QUOTA": "100000000",
+        "BRAVE_MAX_WAIT_INTERACTIVE": "5",
+        "BRAVE_BUDGET_REFRESH_S": "0",
+        "PREWARM_ENABLED": "0",
+        "SCRAPE_DOMAIN_CONCURRENCY": str(args.scrape_concurrency),
+        "SCRAPE_DOMAIN_DELAY_MS": str(args.scrape_delay_ms),
+        "LOCAL_INDEX_PATH": os.path.join(tmp, "recipes.sqlite3"),
+        "PRICE_STORE_PATH": os.path.join(tmp, "prices.sqlite3"),
+        "PRICE_HISTORY_LOG": os.path.join(tmp, "price_history.jsonl"),
+        "METRICS_DIR": os.path.join(tmp, "metrics"),
+        "CAPTURE_FILE": "",
+        "API_KEY": "",
+        "REDIS_URL": "",
+    }
+    for item in args.env or []:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def stop_service(service: Optional[subprocess.Popen]) -> None:
+    if service is None:
+        return
+    service.terminate()
+    try:
+        service.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        service.kill()
+
+
+def add_service_args(ap: argparse.ArgumentParser) -> None:
+    """Opciones comunes a run.py y replay.py: servicio propio o --target, y sustitutos."""
+    ap.add_argument("--request-timeout", type=float, default=30.0)
+    ap.add_argument("--target", default="", help="URL de un servicio ya levantado (no arranca sustitutos ni servicio)")
+    ap.add_argument("--api-key", default="", help="X-API-Key para --target")
+    ap.add_argument("--port", type=int, default=8099, help="puerto del servicio arrancado por el benchmark")
+    ap.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    ap.add_argument("--brave-rps", type=float, default=50.0, help="BRAVE_MAX_RPS del servicio")
+    ap.add_argument("--scrape-concurrency", type=int, default=8, help="SCRAPE_DOMAIN_CONCURRENCY del servicio")
+    ap.add_argument("--scrape-delay-ms", type=float, default=0.0, help="SCRAPE_DOMAIN_DELAY_MS del servicio")
+    ap.add_argument("--env", action="append", help="KEY=VALUE extra para el servicio (repetible)")
+    add_knob_args(ap)
+
+
+async def wait_healthy(base: str, timeout: float = 30.0) -> None:
+    deadline_at = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline_at:
+            try:
+                async with session.get(f"{base}/health") as r:
+                    if r.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"el servicio no respondio en {timeout} s ({base}/health)")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regresiones: p95/p99 mas de threshold peor, throughput mas de threshold menor, o mas errores."""
+    problems: List[str] = []
+    print(f"\ncomparacion contra {baseline.get('commit') or '?'} ({baseline.get('timestamp', '?')}), umbral {threshold:.0%}")
+    print(f"{'tool':<34}{'rps':>24}{'p95 ms':>24}{'p99 ms':>24}")
+    for tool, cur in current["tools"].items():
+        base = (baseline.get("tools") or {}).get(tool)
+        if not base:
+            continue
+
+        def delta(key: str) -> str:
+            b, c = base[key], cur[key]
+            pct = (c - b) / b if b else 0.0
+            return f"{b:.1f}->{c:.1f} ({pct:+.0%})"
+
+        print(f"{tool:<34}{delta('rps'):>24}{delta('p95_ms'):>24}{delta('p99_ms'):>24}")
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and cur[key] > base[key] * (1 + threshold):
+                problems.append(f"{tool}: {key} {base[key]} -> {cur[key]}")
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - threshold):
+            problems.append(f"{tool}: rps {base['rps']} -> {cur['rps']}")
+        base_rate = base["errors"] / max(1, base["requests"])
+        cur_rate = cur["errors"] / max(1, cur["requests"])
+        if cur_rate > base_rate + 0.01:
+            problems.append(f"{tool}: errores {base_rate:.1%} -> {cur_rate:.1%}")
+    return problems
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    tools = [t if t.startswith("recetario.") else f"recetario.{t}" for t in (args.tools.split(",") if args.tools else DEFAULT_TOOLS)]
+    unknown = [t for t in tools if t not in WORKLOADS]
+    if unknown:
+        raise SystemExit(f"tools desconocidas: {', '.join(unknown)}")
+
+    standins = None
+    service = None
+    tmp = tempfile.mkdtemp(prefix="recetario-bench-")
+    base = args.target.rstrip("/") if args.target else f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.target:
+            standins = from_args(args)
+            await standins.start()
+            service = start_service(args.port, args.workers, service_env(standins, args, tmp), os.path.join(tmp, "service.log"))
+        await wait_healthy(base)
+
+        headers = {"X-API-Key": args.api_key} if args.api_key else {}
+        timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+        connector = aiohttp.TCPConnector(limit=0)
+        results: Dict[str, Any] = {}
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            print(f"{'tool':<34}{'req':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+            for tool in tools:
+                if args.warmup > 0:
+                    await drive(session, base, tool, args.concurrency, args.warmup, args.distinct, headers)
+                r = await drive(session, base, tool, args.concurrency, args.duration, args.distinct, headers)
+                results[tool] = r
+                print(f"{tool:<34}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+            try:
+                async with session.get(f"{base}/stats", headers=headers) as r:
+                    stats = await r.json() if r.status == 200 else {}
+            except Exception:
+                stats = {}
+    finally:
+        stop_service(service)
+        if standins is not None:
+            upstream = standins.stats()
+            await standins.close()
+        else:
+            upstream = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "target": args.target,
+            "workers": None if args.target else args.workers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "distinct": args.distinct,
+            "brave_latency_ms": args.brave_latency_ms,
+            "store_latency_ms": args.store_latency_ms,
+            "brave_error_rate": args.brave_error_rate,
+            "store_error_rate": args.store_error_rate,
+            "page_kb": args.page_kb,
+        },
+        "tools": results,
+        "upstream": upstream,
+        "search_cache": (stats.get("search_cache") or {}),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--tools", default="", help="lista separada por comas (default: todas)")
+    ap.add_argument("--concurrency", type=int, default=16, help="peticiones en vuelo por tool")
+    ap.add_argument("--duration", type=float, default=10.0, help="segundos de medicion por tool")
+    ap.add_argument("--warmup", type=float, default=2.0, help="segundos de calentamiento por tool (no se miden)")
+    ap.add_argument("--distinct", type=int, default=8, help="consultas distintas que se rotan")
+    add_service_args(ap)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="", help="guardar resultados (JSON)")
+    ap.add_argument("--compare", default="", help="baseline JSON contra el que comparar")
+    ap.add_argument("--threshold", type=float, default=0.10, help="tolerancia de regresion (fraccion)")
+    args = ap.parse_args(argv)
+    random.seed(args.seed)
+
+    result = asyncio.run(run(args))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nresultados en {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(result, baseline, args.threshold)
+        if problems:
+            print("\nregresiones:")
+            for p in problems:
+                print(f"  - {p}")
+            sys.exit(1)
+        print("\nsin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Entrada de uvicorn para benchmarks: app.main:app con Brave y las tiendas desviadas a los sustitutos
+de bench/standins.py segun BENCH_HOST_OVERRIDES ("api.search.brave.com=127.0.0.1:8766,...").
+Cada worker importa este modulo, asi que el desvio aplica con --workers N. En produccion se arranca
+app.main:app, que no lee BENCH_HOST_OVERRIDES:
+
+    BENCH_HOST_OVERRIDES="$(python -m bench.standins --print-overrides)" uvicorn bench.serve:app --port 8012
+"""
+import os
+
+from app.main import app
+from app.net.client import http_client
+from bench.standins import parse_host_overrides, route_to_standins
+
+route_to_standins(http_client, parse_host_overrides(os.getenv("BENCH_HOST_OVERRIDES", "")))
+
+__all__ = ["app"]
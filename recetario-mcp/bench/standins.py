@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Sustitutos locales de Brave Search y de las paginas de supermercados para benchmarks sin red.
+
+- Brave: GET /res/v1/web/search con la forma de la API (web.results[] con title/url/description/
+  extra_snippets, query.more_results_available). Respuesta determinista por q; busquedas de precios
+  ("precio" en q) devuelven URLs de producto de Walmart/Soriana/Chedraui/HEB/La Comer, el resto de
+  sitios de recetas. Latencia, jitter y tasa de errores (429/503) configurables.
+- Tiendas: sirve las paginas guardadas en bench/fixtures/ segun la cabecera Host, con latencia, tasa
+  de errores 500, tamano minimo de pagina (relleno) y ETag / 304 opcionales.
+
+El servicio se apunta a los sustitutos arrancandolo con bench/serve.py (route_to_standins sobre el
+cliente HTTP compartido, BENCH_HOST_OVERRIDES); app/ no tiene ningun desvio de hosts.
+
+Uso (desde recetario-mcp/):
+    python -m bench.standins [--brave-port 8766] [--stores-port 8767] [--brave-latency-ms 80] ...
+    # y en el servicio:
+    BRAVE_API_KEY=bench BENCH_HOST_OVERRIDES="$(python -m bench.standins --print-overrides)" \\
+    uvicorn bench.serve:app --port 8012
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import urllib.parse
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+BRAVE_HOST = "api.search.brave.com"
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+STORE_FIXTURES = {
+    "walmart.com.mx": "walmart.html",
+    "soriana.com": "soriana.html",
+    "chedraui.com.mx": "chedraui.html",
+    "heb.com.mx": "heb.html",
+    "lacomer.com.mx": "lacomer.html",
+}
+STORE_PATHS = {
+    "walmart.com.mx": "https://www.walmart.com.mx/ip/{slug}/{n:05d}",
+    "soriana.com": "https://www.soriana.com/{slug}/{n}.html",
+    "chedraui.com.mx": "https://www.chedraui.com.mx/{slug}-{n}/p",
+    "heb.com.mx": "https://www.heb.com.mx/{slug}-{n}/p",
+    "lacomer.com.mx": "https://www.lacomer.com.mx/lacomer/{slug}-{n}",
+}
+RECIPE_SITES = (
+    "https://www.kiwilimon.com/receta/{slug}-{n}",
+    "https://www.recetasnestle.com.mx/recetas/{slug}-{n}",
+    "https://www.cocinafacil.com.mx/recetas/{slug}-{n}",
+    "https://www.mexicoenmicocina.com/{slug}-{n}/",
+)
+# Menciones de ingredientes para que el extractor (app/search/ingredient_catalog.py) tenga con que trabajar
+SNIPPETS = (
+    "Con huevo, jitomate, cebolla y chile serrano.",
+    "Pollo deshebrado, arroz y frijol negro.",
+    "Tortilla de maiz, queso fresco y crema.",
+    "Carne molida, papa, zanahoria y ajo.",
+    "Calabacita, elote, chile poblano y queso.",
+    "Frijol, aguacate, limon y cilantro.",
+)
+
+
+@dataclass
+class Knobs:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    async def delay(self) -> None:
+        ms = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if ms > 0:
+            await asyncio.sleep(ms / 1000.0)
+
+    def fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def _slug(text: str) -> str:
+    out = "".join(c if c.isalnum() else "-" for c in text.lower()).strip("-")
+    return "-".join(p for p in out.split("-") if p)[:60] or "item"
+
+
+def brave_results(q: str, count: int, offset: int = 0) -> List[Dict[str, object]]:
+    """Resultados deterministas por q (misma q -> mismas URLs, para que el cache y el indice se comporten igual)."""
+    seed = int(hashlib.sha1(q.encode("utf-8")).hexdigest()[:8], 16)
+    text = q.split(" site:")[0].split(" precio")[0]
+    slug = _slug(text)
+    prices = "precio" in q.lower()
+    stores = list(STORE_PATHS)
+    out: List[Dict[str, object]] = []
+    for i in range(offset * count, offset * count + count):
+        n = (seed + i) % 100000
+        if prices:
+            url = STORE_PATHS[stores[(seed + i) % len(stores)]].format(slug=slug, n=n)
+            title = f"{text.title()} {i + 1} kg | precio"
+        else:
+            url = RECIPE_SITES[(seed + i) % len(RECIPE_SITES)].format(slug=slug, n=n)
+            title = f"{text.capitalize()} receta {i + 1}"
+        snippet = SNIPPETS[(seed + i) % len(SNIPPETS)]
+        out.append({
+            "title": title,
+            "url": url,
+            "description": f"{text.capitalize()}: {snippet}",
+            "extra_snippets": [SNIPPETS[(seed + i + 1) % len(SNIPPETS)]],
+        })
+    return out
+
+
+def brave_app(knobs: Knobs) -> web.Application:
+    stats = {"requests": 0, "errors": 0}
+
+    async def search(request: web.Request) -> web.Response:
+        stats["requests"] += 1
+        await knobs.delay()
+        if knobs.fail():
+            stats["errors"] += 1
+            return web.json_response({"error": "stand-in"}, status=random.choice((429, 503)))
+        q = request.query.get("q", "")
+        count = min(20, max(1, int(request.query.get("count", "10") or 10)))
+        offset = int(request.query.get("offset", "0") or 0)
+        return web.json_response({
+            "type": "search",
+            "query": {"original": q, "more_results_available": offset < 9},
+            "web": {"type": "search", "results": brave_results(q, count, offset)},
+        })
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/res/v1/web/search", search)
+    return app
+
+
+def _load_fixtures(page_kb: int) -> Dict[str, bytes]:
+    pages: Dict[str, bytes] = {}
+    for domain, name in STORE_FIXTURES.items():
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            body = f.read()
+        missing = page_kb * 1024 - len(body)
+        if missing > 0:
+            # Relleno al final (despues de los datos de producto), como el resto de una pagina real
+            body = body.replace(b"</body>", b"<!--" + b"x" * missing + b"--></body>", 1)
+        pages[domain] = body
+    return pages
+
+
+def stores_app(knobs: Knobs, page_kb: int = 0, etag: bool = True) -> web.Application:
+    pages = _load_fixtures(page_kb)
+    stats = {"requests": 0, "errors": 0, "not_modified": 0, "bytes": 0}
+
+    async def page(request: web.Request) -> web.StreamResponse:
+        stats["requests"] += 1
+        host = (request.headers.get("Host") or "").split(":")[0].lower()
+        domain = next((d for d in pages if host == d or host.endswith("." + d)), None)
+        await knobs.delay()
+        if domain is None:
+            return web.Response(status=404, text="unknown store")
+        if knobs.fail():
+            stats["errors"] += 1
+            return web.Response(status=500, text="stand-in error")
+        tag = '"' + hashlib.sha1((domain + request.path).encode("utf-8")).hexdigest()[:16] + '"'
+        if etag and request.headers.get("If-None-Match") == tag:
+            stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": tag})
+        body = pages[domain]
+        stats["bytes"] += len(body)
+        headers = {"ETag": tag} if etag else {}
+        return web.Response(body=body, content_type="text/html", charset="utf-8", headers=headers)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/{tail:.*}", page)
+    return app
+
+
+def host_overrides(brave_port: int, stores_port: int, host: str = "127.0.0.1") -> str:
+    """Valor de BENCH_HOST_OVERRIDES: Brave y todas las tiendas a sus sustitutos."""
+    targets = [f"{BRAVE_HOST}={host}:{brave_port}"] + [f"{domain}={host}:{stores_port}" for domain in STORE_FIXTURES]
+    return ",".join(targets)
+
+
+def parse_host_overrides(raw: str) -> Dict[str, str]:
+    """"host=destino,host2=destino" -> {host: destino}."""
+    out: Dict[str, str] = {}
+    for item in raw.split(","):
+        host, sep, target = item.partition("=")
+        if sep and host.strip() and target.strip():
+            out[host.strip().lower()] = target.strip()
+    return out
+
+
+def route_to_standins(client: Any, overrides: Dict[str, str]) -> None:
+    """
+    Solo benchmarks: envuelve client.request (app.net.client.HttpClient) para que las peticiones a
+    esos hosts (y sus subdominios) vayan por http al destino indicado, con la cabecera Host original.
+    """
+    if not overrides:
+        return
+    request: Callable[..., Any] = client.request
+
+    def routed(method: str, url: str, **kwargs: Any) -> Any:
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.hostname or "").lower()
+        target = overrides.get(host)
+        if target is None:
+            target = next((t for h, t in overrides.items() if host.endswith("." + h)), None)
+        if target is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "Host": parts.netloc}
+            url = urllib.parse.urlunsplit(("http", target, parts.path, parts.query, ""))
+        return request(method, url, **kwargs)
+
+    client.request = routed
+
+
+class StandIns:
+    """Levanta los dos sustitutos en el event loop actual (bench/run.py los usa asi)."""
+
+    def __init__(self, brave: Knobs, stores: Knobs, brave_port: int = 8766, stores_port: int = 8767, page_kb: int = 0, etag: bool = True):
+        self.brave_port = brave_port
+        self.stores_port = stores_port
+        self._apps = [(brave_app(brave), brave_port), (stores_app(stores, page_kb, etag), stores_port)]
+        self._runners: List[web.AppRunner] = []
+
+    async def start(self, host: str = "127.0.0.1") -> None:
+        for app, port in self._apps:
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, port).start()
+            self._runners.append(runner)
+
+    async def close(self) -> None:
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"brave": dict(self._apps[0][0]["stats"]), "stores": dict(self._apps[1][0]["stats"])}
+
+    def env(self, host: str = "127.0.0.1") -> Dict[str, str]:
+        """Variables para que el servicio, arrancado con bench/serve.py, use los sustitutos."""
+        return {
+            "BRAVE_API_KEY": "bench",
+            "BENCH_HOST_OVERRIDES": host_overrides(self.brave_port, self.stores_port, host),
+        }
+
+
+def add_knob_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--brave-port", type=int, default=8766)
+    ap.add_argument("--stores-port", type=int, default=8767)
+    ap.add_argument("--brave-latency-ms", type=float, default=80.0, help="latencia de Brave (ms)")
+    ap.add_argument("--brave-jitter-ms", type=float, default=20.0)
+    ap.add_argument("--brave-error-rate", type=float, default=0.0, help="fraccion de respuestas 429/503")
+    ap.add_argument("--store-latency-ms", type=float, default=150.0, help="latencia de las tiendas (ms)")
+    ap.add_argument("--store-jitter-ms", type=float, default=50.0)
+    ap.add_argument("--store-error-rate", type=float, default=0.0, help="fraccion de respuestas 500")
+    ap.add_argument("--page-kb", type=int, default=0, help="tamano minimo de pagina (relleno); 0 = fixture tal cual")
+    ap.add_argument("--no-etag", action="store_true", help="sin ETag / 304")
+
+
+def from_args(args: argparse.Namespace) -> StandIns:
+    return StandIns(
+        Knobs(args.brave_latency_ms, args.brave_jitter_ms, args.brave_error_rate),
+        Knobs(args.store_latency_ms, args.store_jitter_ms, args.store_error_rate),
+        brave_port=args.brave_port,
+        stores_port=args.stores_port,
+        page_kb=args.page_kb,
+        etag=not args.no_etag,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_knob_args(ap)
+    ap.add_argument("--print-overrides", action="store_true", help="imprime BENCH_HOST_OVERRIDES y sale")
+    args = ap.parse_args(argv)
+    if args.print_overrides:
+        print(host_overrides(args.brave_port, args.stores_port))
+        return
+
+    async def serve() -> None:
+        standins = from_args(args)
+        await standins.start()
+        for key, value in standins.env().items():
+            print(f"{key}={value}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await standins.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Configuracion comun de pytest: sin red ni archivos fuera de tmp al importar app.* (los singletons
+leen el entorno al importarse).
+"""
+import os
+
+os.environ.setdefault("BRAVE_API_KEY", "test")
+os.environ.setdefault("PREWARM_ENABLED", "0")
+os.environ.setdefault("PRICE_HISTORY_LOG", "")
+os.environ.setdefault("CAPTURE_FILE", "")
+os.environ.pop("REDIS_URL", None)
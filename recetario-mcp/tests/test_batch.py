@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""RecetarioMCPServer.handle_batch (app/mcp/server.py): validacion de entrada y deduplicacion."""
+import asyncio
+
+import pytest
+
+from app.mcp.server import RecetarioMCPServer
+
+TOOL = "recetario.test_echo"
+
+
+def _server():
+    server = RecetarioMCPServer()
+    calls = {"n": 0}
+
+    async def echo(params):
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return {"echo": params.get("q")}
+
+    server.tools[TOOL] = echo
+    return server, calls
+
+
+@pytest.mark.parametrize("value", ["fast", [], {}, 0, -2, 1.5, True, "inf", "nan"])
+def test_invalid_max_concurrency_is_a_client_error(value):
+    server, calls = _server()
+    out = asyncio.run(server.handle_batch([{"tool": TOOL, "params": {}}], value))
+    assert out["success"] is False and "max_concurrency" in out["error"]
+    assert calls["n"] == 0
+
+
+@pytest.mark.parametrize("value", [None, "", 2, "3", 2.0, 100])
+def test_valid_max_concurrency(value):
+    server, _ = _server()
+    out = asyncio.run(server.handle_batch([{"tool": TOOL, "params": {"q": 1}}], value))
+    assert out["success"] is True and out["results"][0]["success"] is True
+
+
+@pytest.mark.parametrize("calls, error", [
+    ("abc", "calls must be a non-empty list"),
+    ([], "calls must be a non-empty list"),
+    ([{"tool": TOOL}, "x"], "calls[1]"),
+    ([{"tool": TOOL, "params": [1]}], "calls[0].params"),
+])
+def test_invalid_calls_are_client_errors(calls, error):
+    server, _ = _server()
+    out = asyncio.run(server.handle_batch(calls))
+    assert out["success"] is False and error in out["error"]
+
+
+def test_identical_calls_run_once_in_order():
+    server, calls = _server()
+    batch = [{"tool": TOOL, "params": {"q": q}} for q in ("a", "b", "a")]
+    out = asyncio.run(server.handle_batch(batch, 2))
+    assert [r["result"]["echo"] for r in out["results"]] == ["a", "b", "a"]
+    assert [r["deduplicated"] for r in out["results"]] == [False, False, True]
+    assert out["unique_calls"] == 2 and calls["n"] == 2
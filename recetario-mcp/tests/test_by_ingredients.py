@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""recetario.recipes_by_ingredients (app/search/by_ingredients.py): extraccion, puntaje y topK."""
+import asyncio
+
+import pytest
+
+from app.search import by_ingredients
+from app.search.by_ingredients import IngredientIndex, recipes_by_ingredients
+from app.search.ingredient_catalog import INGREDIENT_IDS, extract, resolve
+
+HUEVO, JITOMATE, CEBOLLA, POLLO = (INGREDIENT_IDS[n] for n in ("Huevo", "Jitomate", "Cebolla", "Pollo"))
+
+
+def test_extract_and_resolve_mexican_names():
+    assert extract("Huevos a la mexicana con jitomates y cebolla") == ["Huevo", "Jitomate", "Cebolla"]
+    assert resolve("chiles jalapeños") == INGREDIENT_IDS["Chile jalapeno"]
+    assert resolve("algo que no existe") is None
+
+
+def test_score_ranks_by_coverage_and_drops_dislikes():
+    index = IngredientIndex()
+    index.load([
+        (1, [HUEVO, JITOMATE, CEBOLLA]),
+        (2, [HUEVO]),
+        (3, [HUEVO, JITOMATE, POLLO]),
+        (4, [POLLO]),
+    ])
+    ranked = index.score([HUEVO, JITOMATE], dislikes=[POLLO])
+    assert [doc for doc, _, _ in ranked] == [1, 2]
+    assert [matched for _, _, matched in ranked] == [2, 1]
+    assert [doc for doc, _, _ in index.score([HUEVO], top_k=1)] == [2]  # receta cubierta por completo
+
+
+class _Docs:
+    available = False
+
+    def docs_sync(self, ids):
+        return {i: {"title": f"Receta {i} con huevo", "url": f"https://x/{i}"} for i in ids}
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    index = IngredientIndex()
+    index.load([(i, [HUEVO]) for i in range(1, 61)])
+    monkeypatch.setattr(by_ingredients, "ingredient_index", index)
+    monkeypatch.setattr(by_ingredients, "local_index", _Docs())
+    return index
+
+
+@pytest.mark.parametrize("top_k, count", [(None, 10), ("3", 3), (5.0, 5), (100, 50)])
+def test_top_k_is_clamped(loaded, top_k, count):
+    params = {"ingredientes": "huevo"}
+    if top_k is not None:
+        params["topK"] = top_k
+    out = asyncio.run(recipes_by_ingredients(params))
+    assert out["count"] == count and out["source"] == "local"
+
+
+@pytest.mark.parametrize("top_k", ["abc", -1, 0, 2.5, True, [3]])
+def test_invalid_top_k_is_an_error(loaded, top_k):
+    out = asyncio.run(recipes_by_ingredients({"ingredientes": "huevo", "topK": top_k}))
+    assert out["error"] == "topK debe ser un entero positivo"
+    assert out["recetas"] == [] and out["ingredientes"] == ["Huevo"]
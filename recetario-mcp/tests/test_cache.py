@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""SearchCache (app/search/cache.py): LRU con TTL, copias stale y L2 compartido en Redis."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.search import cache as cache_mod
+from app.search.cache import KEY_PREFIX, SearchCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_mod, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _cache(max_entries=3, ttl=60, stale_ttl=600, redis=None):
+    c = SearchCache()
+    c.max_entries, c.default_ttl, c.stale_ttl = max_entries, ttl, stale_ttl
+    c._redis = redis
+    return c
+
+
+def _fakeredis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def test_make_key_normalizes_query_and_params():
+    a = SearchCache.make_key("  Tacos   AL Pastor ", 5, "mx", "ES", False, None, 0)
+    b = SearchCache.make_key("tacos al pastor", 5, "MX", "es", False, "", 0)
+    assert a == b
+    assert a != SearchCache.make_key("tacos al pastor", 10, "MX", "es", False, None, 0)
+
+
+def test_lru_eviction(clock):
+    c = _cache(max_entries=2)
+
+    async def run():
+        await c.set("a", {"v": 1})
+        await c.set("b", {"v": 2})
+        assert await c.get("a") is not None  # "a" pasa a ser la mas reciente
+        await c.set("c", {"v": 3})
+        return await c.get("a"), await c.get("b"), await c.get("c")
+
+    a, b, cc = asyncio.run(run())
+    assert a.value == {"v": 1} and b is None and cc.value == {"v": 3}
+    assert c.stats["evictions"] == 1
+
+
+def test_expired_entry_served_only_as_stale_within_window(clock):
+    c = _cache(ttl=60, stale_ttl=600)
+
+    async def run():
+        await c.set("k", {"v": 1})
+        clock[0] += 61
+        expired = await c.get("k")
+        stale = await c.get("k", allow_stale=True)
+        clock[0] += 600
+        gone = await c.get("k", allow_stale=True)
+        return expired, stale, gone
+
+    expired, stale, gone = asyncio.run(run())
+    assert expired is None
+    assert stale is not None and not stale.fresh and stale.value == {"v": 1}
+    assert gone is None
+    assert c.stats["stale_hits"] == 1 and c.stats["misses"] == 2
+
+
+def test_zero_ttl_is_not_stored(clock):
+    c = _cache()
+    asyncio.run(c.set("k", {"v": 1}, ttl=0))
+    assert c.entry("k") is None and c.stats["sets"] == 0
+
+
+def test_l2_shared_between_workers(clock):
+    async def run():
+        redis = _fakeredis()
+        first, second = _cache(redis=redis), _cache(redis=redis)
+        await first.set("k", {"v": 1})
+        ttl = await redis.ttl(KEY_PREFIX + "k")
+        entry = await second.get("k")
+        return ttl, entry, second
+
+    ttl, entry, second = asyncio.run(run())
+    # Redis guarda la entrada tambien durante la ventana stale
+    assert 60 < ttl <= 660
+    assert entry is not None and entry.value == {"v": 1}
+    assert second.stats["hits_l2"] == 1 and second.peek("k")
+
+
+def test_l2_newer_copy_replaces_expired_l1(clock):
+    async def run():
+        redis = _fakeredis()
+        first, second = _cache(redis=redis), _cache(redis=redis)
+        await second.set("k", {"v": "old"})
+        clock[0] += 61
+        await first.set("k", {"v": "new"})
+        return await second.get("k")
+
+    entry = asyncio.run(run())
+    assert entry is not None and entry.value == {"v": "new"}
+
+
+def test_l2_errors_fall_back_to_l1(clock):
+    class Broken:
+        async def get(self, *a, **k):
+            raise ConnectionError("redis caido")
+
+        async def set(self, *a, **k):
+            raise ConnectionError("redis caido")
+
+    c = _cache(redis=Broken())
+
+    async def run():
+        await c.set("k", {"v": 1})
+        hit = await c.get("k")
+        miss = await c.get("otra")
+        return hit, miss
+
+    hit, miss = asyncio.run(run())
+    assert hit is not None and miss is None
+    assert c.stats["l2_errors"] == 2
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Canonicalizacion de consultas (app/search/canonical.py): claves equivalentes y conteo de variantes."""
+import pytest
+
+from app.search.canonical import Canonicalizer, canonical_forms
+from app.search.ingredient_catalog import CATALOG, alias_forms, fold
+from app.search.price_history import product_key
+
+
+def key(text):
+    return canonical_forms(text)[1]
+
+
+@pytest.mark.parametrize("variants", [
+    # plurales
+    ("huevos", "huevo", "Huevos"),
+    # sinonimos MX
+    ("jitomate", "tomate rojo", "tomate", "jitomates"),
+    ("puerco", "cerdo", "carne de puerco"),
+    ("frijoles", "frijol", "frejol"),
+    ("yogurt", "yogur", "yoghurt"),
+    ("tomatillo", "tomate verde", "tomates verdes"),
+    # acentos, mayusculas, orden y relleno
+    ("Receta de huevos con tomate rojo", "huevo jitomate", "Jitomate y Huevo", "quiero una receta de huevo con jitomate"),
+    ("Chiles Jalapeños", "chile jalapeno", "cuaresmeño"),
+    ("Tacos de Puerco", "taco de cerdo", "tacos cerdo"),
+    ("precio de frijol", "cuanto cuesta el frijol", "frijoles"),
+    ("Pozole", "pozoles", "como hacer pozole"),
+])
+def test_variants_share_one_key(variants):
+    keys = {key(v) for v in variants}
+    assert len(keys) == 1, keys
+
+
+@pytest.mark.parametrize("a, b", [
+    ("tacos de carnitas", "tacos de cerdo"),  # variedad, no sinonimo
+    ("salsa verde", "salsa roja"),
+    ("tomate verde", "jitomate"),
+    ("pechuga", "pollo"),
+])
+def test_different_searches_keep_different_keys(a, b):
+    assert key(a) != key(b)
+
+
+def test_upstream_query_stays_readable():
+    assert canonical_forms("Receta de huevos con tomate rojo")[0] == "huevo con jitomate"
+    assert canonical_forms("Cómo hacer chiles rellenos")[0] == "chiles rellenos"
+    assert canonical_forms("precio de frijoles")[0] == "frijol"
+    assert canonical_forms("recetas mexicanas") == ("mexicanas", "mexicana")
+
+
+@pytest.mark.parametrize("name", list(CATALOG))
+def test_keys_agree_with_price_history_products(name):
+    """Cualquier sinonimo del catalogo cae en la clave del producto de price_history."""
+    expected = fold(product_key(name)).replace(" ", "_")
+    for alias in [name] + CATALOG[name]:
+        for words in alias_forms(alias):
+            text = " ".join(words)
+            assert key(text) == expected, (text, key(text), expected)
+            assert fold(product_key(text)).replace(" ", "_") == expected
+
+
+def test_canonicalizer_counts_collapsed_variants():
+    c = Canonicalizer(enabled=True, track_keys=10)
+    for q in ("Huevos con jitomate", "huevo jitomate", "huevo jitomate", "pozole"):
+        c.apply(q, "recipe")
+    c.apply("HUEVO TOMATE ROJO", "recipe", track=False)
+    snap = c.snapshot()
+    assert (snap["calls"], snap["new_keys"], snap["repeats"], snap["collapsed"]) == (4, 2, 1, 1)
+    assert snap["top"] == [{
+        "key": "recipe:huevo jitomate",
+        "variants": 2,
+        "calls": 3,
+        "examples": ["huevo jitomate", "huevos con jitomate"],
+    }]
+    # El tipo de tool separa claves
+    c.apply("huevo jitomate", "price")
+    assert c.snapshot()["new_keys"] == 3
+
+
+def test_tracking_is_bounded_and_disable_passes_through():
+    c = Canonicalizer(enabled=True, track_keys=2)
+    for q in ("pozole", "tamales", "mole"):
+        c.apply(q)
+    assert c.snapshot()["keys"] == 2 and c.stats["evicted_keys"] == 1
+    off = Canonicalizer(enabled=False)
+    assert off.apply("Huevos") == ("Huevos", None)
+    assert off.snapshot()["calls"] == 0
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Captura de trafico (app/capture.py): anonimizado, claves que definen la carga, buffer y lectura del log."""
+import asyncio
+import json
+import pathlib
+import re
+
+import pytest
+
+from app.capture import ALLOWED_PARAMS, Capture, read_log
+from app.mcp.server import RecetarioMCPServer
+
+# Claves de params que no viajan en "p": el deadline va en "d"
+NOT_IN_PARAMS = {"deadline_ms"}
+
+
+def _capture(tmp_path=None, **kw):
+    c = Capture()
+    c.path = str(tmp_path / "capture.jsonl") if tmp_path else "capture.jsonl"
+    c.sample_rate = 1.0
+    for k, v in kw.items():
+        setattr(c, k, v)
+    return c
+
+
+def test_every_param_a_tool_reads_is_captured():
+    """Si una tool lee una clave que no se captura, el replay corre otra carga (p. ej. scraping)."""
+    app_dir = pathlib.Path(__file__).resolve().parents[1] / "app" / "search"
+    read = set()
+    for path in app_dir.glob("*.py"):
+        read.update(re.findall(r'params\.get\("(\w+)"', path.read_text(encoding="utf-8")))
+    assert "scraping" in read
+    assert read - NOT_IN_PARAMS <= ALLOWED_PARAMS, sorted(read - NOT_IN_PARAMS - ALLOWED_PARAMS)
+
+
+def test_anonymize_keeps_the_workload_and_drops_identity():
+    c = _capture(max_str=30)
+    out = c.anonymize({
+        "query": "  huevos   rancheros para juan@example.com ",
+        "product": "tel 55 1234 5678 leche",
+        "scraping": False,
+        "topK": 5,
+        "userId": "amzn1.ask.account.XYZ",
+        "sessionId": "s-1",
+        "candidatos": {"desayuno": [{"title": "Molletes", "cost": 40, "url": "https://x", "owner": "ana"}]},
+        "ingredientes": ["huevo"] * 80,
+    })
+    assert out["query"] == "huevos rancheros para <email>"
+    assert out["product"] == "tel <num> leche"
+    assert out["scraping"] is False and out["topK"] == 5
+    assert "userId" not in out and "sessionId" not in out
+    assert out["candidatos"] == {"desayuno": [{"title": "Molletes", "cost": 40}]}
+    assert len(out["ingredientes"]) == 50
+    assert c.anonymize("no es dict") == {}
+    assert len(c.anonymize({"query": "x" * 100})["query"]) == 30
+
+
+def test_record_buffers_and_flush_writes_one_line_per_call(tmp_path):
+    c = _capture(tmp_path, max_buffer=2)
+    c.record("recetario.prices_search", {"query": "huevo", "scraping": False}, 2500)
+    c.record("recetario.recipes_search", {"query": "pozole"})
+    c.record("recetario.recipes_search", {"query": "de mas"})
+    assert c.snapshot()["buffered"] == 2 and c.stats["dropped"] == 1
+    assert not (tmp_path / "capture.jsonl").exists()
+    asyncio.run(c.flush())
+    calls = read_log(c.path)
+    assert [(x["tool"], x["p"]) for x in calls] == [
+        ("recetario.prices_search", {"query": "huevo", "scraping": False}),
+        ("recetario.recipes_search", {"query": "pozole"}),
+    ]
+    assert calls[0]["d"] == 2500 and "d" not in calls[1]
+
+
+def test_sampling_off_and_disabled_capture_nothing(tmp_path):
+    c = _capture(tmp_path, sample_rate=0.0)
+    c.record("recetario.recipes_search", {"query": "pozole"})
+    off = _capture(path="")
+    off.record("recetario.recipes_search", {"query": "pozole"})
+    assert c.stats["captured"] == 0 and off.stats["captured"] == 0 and not off.enabled
+
+
+def test_read_log_sorts_and_skips_garbage(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"t": 2.0, "k": "recipes_search", "p": {}}),
+        "no es json",
+        json.dumps({"k": "sin_t"}),
+        json.dumps({"t": 1.0, "k": "recetario.menu_search", "p": {}}),
+    ]) + "\n", encoding="utf-8")
+    assert [x["tool"] for x in read_log(str(path))] == ["recetario.menu_search", "recetario.recipes_search"]
+
+
+@pytest.mark.parametrize("request_extra, params_extra", [
+    ({"deadline_ms": 3000}, {}),
+    ({}, {"deadline_ms": 3000}),
+])
+def test_server_captures_the_remaining_deadline(monkeypatch, request_extra, params_extra):
+    from app.mcp import server as module
+
+    seen = []
+    monkeypatch.setattr(module.capture, "record", lambda tool, params, d=None: seen.append((tool, params, d)))
+    srv = RecetarioMCPServer()
+    params = {"product": "huevo", **params_extra}
+    asyncio.run(srv.handle_request({"tool": "recetario.price_history", "params": params, **request_extra}))
+    (tool, _, d), = seen
+    assert tool == "recetario.price_history" and 2900 <= d <= 3000
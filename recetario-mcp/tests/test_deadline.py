@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Deadline por peticion (app/deadline.py): formato, vencimiento, herencia en tareas y detach()."""
+import asyncio
+import time
+
+import pytest
+
+from app import deadline
+from app.mcp.server import RecetarioMCPServer
+
+TOOL = "recetario.test_deadline"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), ("", None), ("abc", None), ([], None),
+    (2500, 2.5), ("1500", 1.5), (-10, 0.0),
+])
+def test_parse_deadline(value, expected):
+    assert deadline.parse_deadline(value) == expected
+
+
+def test_parse_absolute_epoch_ms():
+    budget = deadline.parse_deadline(time.time() * 1000.0 + 3000.0)
+    assert budget == pytest.approx(3.0, abs=0.05)
+    assert deadline.parse_deadline(time.time() * 1000.0 - 1000.0) == 0.0
+
+
+def test_clamp_remaining_and_expiry():
+    assert deadline.clamp(5.0) == 5.0 and deadline.remaining() is None
+    token = deadline.start(0.05)
+    try:
+        assert deadline.clamp(5.0) <= 0.05
+        assert deadline.clamp(0.01) == 0.01
+        assert not deadline.current().expired
+        time.sleep(0.06)
+        assert deadline.current().expired
+        assert deadline.remaining() == 0.0 and deadline.clamp(5.0) == 0.0
+        deadline.cut("scrape_fetch", "no_time")
+        assert deadline.current().summary()["cut"] == [{"stage": "scrape_fetch", "reason": "no_time"}]
+    finally:
+        deadline.reset(token)
+    assert deadline.current() is None
+
+
+def test_tasks_inherit_the_deadline_but_detach_drops_it():
+    async def main():
+        token = deadline.start(0.05)
+        try:
+            async def observe():
+                await asyncio.sleep(0.08)
+                dl = deadline.current()
+                return None if dl is None else dl.expired
+
+            inherited = asyncio.ensure_future(observe())
+            detached = deadline.detach(observe())
+        finally:
+            deadline.reset(token)
+        # La tarea normal ve el deadline vencido; la separada no tiene deadline que vencer
+        assert await inherited is True
+        assert await detached is None
+
+    asyncio.run(main())
+
+
+def test_detach_does_not_leak_into_the_caller():
+    async def main():
+        token = deadline.start(1.0)
+        try:
+            before = deadline.current()
+            await deadline.detach(asyncio.sleep(0))
+            assert deadline.current() is before
+        finally:
+            deadline.reset(token)
+
+    asyncio.run(main())
+
+
+def test_handle_request_applies_and_resets_the_deadline():
+    async def main():
+        server = RecetarioMCPServer()
+        seen = []
+
+        async def tool(params):
+            seen.append(deadline.remaining())
+            return {}
+
+        server.tools[TOOL] = tool
+        out = await server.handle_request({"tool": TOOL, "params": {}, "deadline_ms": 200})
+        assert 0.0 < seen[0] <= 0.2
+        assert out["deadline"]["budget_ms"] == 200.0
+        assert deadline.current() is None
+        # Una llamada dentro de un lote no puede pasarse del deadline del lote
+        token = deadline.start(0.05)
+        try:
+            await server.handle_request({"tool": TOOL, "params": {"deadline_ms": 5000}})
+        finally:
+            deadline.reset(token)
+        assert seen[1] <= 0.05
+
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Camino rapido ASGI (app/api/fast.py): ruteo, API key, errores de cuerpo y streaming."""
+import asyncio
+import json
+
+import pytest
+
+from app.api.fast import McpFastPath
+from app.mcp.server import recetario_mcp_server
+
+TOOL = "recetario.test_fast_echo"
+
+
+@pytest.fixture
+def echo_tool(monkeypatch):
+    async def echo(params):
+        return {"echo": params.get("q")}
+
+    monkeypatch.setitem(recetario_mcp_server.tools, TOOL, echo)
+    monkeypatch.delenv("API_KEY", raising=False)
+
+
+def _call(path, body=b"", headers=(), method="POST"):
+    """Lanza una peticion contra McpFastPath; (status, cuerpo, paso_a_la_app)."""
+    forwarded = []
+
+    async def app(scope, receive, send):
+        forwarded.append(scope["path"])
+        await send({"type": "http.response.start", "status": 299, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "headers": list(headers)}
+        await McpFastPath(app)(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(run())
+    status = sent[0]["status"]
+    payload = b"".join(m.get("body", b"") for m in sent[1:])
+    return status, payload, bool(forwarded)
+
+
+def test_tool_call(echo_tool):
+    status, payload, forwarded = _call(f"/mcp/{TOOL}", b'{"q": "tacos"}')
+    assert status == 200 and not forwarded
+    out = json.loads(payload)
+    assert out["success"] is True and out["result"] == {"echo": "tacos"}
+
+
+@pytest.mark.parametrize("path, method, headers", [
+    ("/mcp/recetario.no_existe", "POST", ()),
+    ("/health", "POST", ()),
+    (f"/mcp/{TOOL}", "GET", ()),
+    (f"/mcp/{TOOL}", "POST", ((b"origin", b"https://example.com"),)),
+])
+def test_other_requests_go_to_the_app(echo_tool, path, method, headers):
+    status, _, forwarded = _call(path, b"{}", headers, method)
+    assert forwarded and status == 299
+
+
+@pytest.mark.parametrize("body, kind", [
+    (b"", "missing"),
+    (b"{no json", "json_invalid"),
+    (b"[1, 2]", "dict_type"),
+])
+def test_invalid_body_is_422(echo_tool, body, kind):
+    status, payload, _ = _call(f"/mcp/{TOOL}", body)
+    assert status == 422
+    assert json.loads(payload)["detail"][0]["type"] == kind
+
+
+def test_api_key(echo_tool, monkeypatch):
+    monkeypatch.setenv("API_KEY", "secreto")
+    assert _call(f"/mcp/{TOOL}", b"{}")[0] == 401
+    assert _call(f"/mcp/{TOOL}", b"{}", ((b"x-api-key", b"otro"),))[0] == 401
+    assert _call(f"/mcp/{TOOL}", b"{}", ((b"x-api-key", b"secreto"),))[0] == 200
+    assert _call(f"/mcp/{TOOL}", b"{}", ((b"authorization", b"Bearer secreto"),))[0] == 200
+
+
+def test_stream_tool_ndjson(echo_tool, monkeypatch):
+    async def events(params):
+        yield "results", {"count": 1}
+        yield "done", {"count": 1, "q": params.get("q")}
+
+    monkeypatch.setitem(recetario_mcp_server.stream_tools, TOOL, events)
+    status, payload, _ = _call(f"/mcp/{TOOL}", b'{"q": "huevo"}', ((b"accept", b"application/x-ndjson"),))
+    assert status == 200
+    lines = [json.loads(line) for line in payload.splitlines()]
+    assert [line["event"] for line in lines] == ["results", "done"]
+    assert lines[-1]["data"]["success"] is True
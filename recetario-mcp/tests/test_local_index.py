@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Indice local FTS5 (app/search/local_index.py): URLs canonicas, ranking y modos de tiered_search."""
+import asyncio
+
+import pytest
+
+from app.search import local_index as li
+from app.search.local_index import LocalIndex, canonical_url, query_terms, tiered_search
+
+DOCS = [
+    {"title": "Tinga de pollo", "url": "https://www.cocina.mx/tinga/?utm_source=x", "snippet": "Con chipotle y jitomate."},
+    {"title": "Caldo de res", "url": "https://cocina.mx/caldo", "snippet": "Receta con pollo opcional."},
+    {"title": "Pollo en mole", "url": "https://cocina.mx/mole", "snippet": "Mole poblano."},
+    {"title": "Jamón serrano", "url": "https://cocina.mx/jamon", "snippet": "Entrada fría.", "extra_snippets": ["tapas"]},
+]
+LIVE = [
+    {"title": "Tinga de pollo", "url": "https://cocina.mx/tinga"},
+    {"title": "Pollo nuevo", "url": "https://nuevo.mx/pollo"},
+]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    idx = LocalIndex(str(tmp_path / "recipes.sqlite3"))
+    idx.min_hits = 2
+    monkeypatch.setattr(li, "local_index", idx)
+    asyncio.run(idx.ingest("recipe", DOCS))
+    yield idx
+    idx.close()
+
+
+@pytest.fixture
+def brave(monkeypatch):
+    state = {"calls": 0, "peek": False, "res": {"results": LIVE, "cache": "miss"}}
+
+    async def search(**kwargs):
+        state["calls"] += 1
+        return state["res"]
+
+    monkeypatch.setattr(li.provider_search, "search", search)
+    monkeypatch.setattr(li.provider_search, "peek", lambda **kw: state["peek"])
+    return state
+
+
+def _tiered(source, query="tinga pollo", topK=5):
+    async def run():
+        out = await tiered_search("recipe", query, {"query": f"{query} receta", "topK": topK}, source=source)
+        await asyncio.gather(*li.local_index._pending)
+        return out
+
+    return asyncio.run(run())
+
+
+def test_canonical_url():
+    assert canonical_url("http://www.Cocina.mx//tinga/?b=2&utm_medium=x&a=1&fbclid=z#paso") == "https://cocina.mx/tinga?a=1&b=2"
+    assert canonical_url("https://cocina.mx") == "https://cocina.mx/"
+
+
+def test_query_terms_drop_stopwords():
+    assert query_terms("Recetas de tinga con pollo") == ["tinga", "pollo"]
+    assert query_terms("de la") == ["de", "la"]
+
+
+def test_ingest_dedups_by_canonical_url(index):
+    asyncio.run(index.ingest("recipe", [{"title": "Tinga de pollo", "url": "http://cocina.mx/tinga#x"}]))
+    assert index.stats["ingested"] == 4 and index.stats["updated"] == 1
+    assert index._counts_sync() == {"recipe": 4}
+
+
+def test_lookup_ranks_all_terms_then_title(index):
+    results, covered = asyncio.run(index.lookup("recipe", "pollo", 5))
+    # "pollo" en el titulo pesa mas que en el snippet
+    assert results[-1]["url"] == "https://cocina.mx/caldo"
+    assert covered and all(r["source"] == "local" for r in results)
+    results, covered = asyncio.run(index.lookup("recipe", "tinga pollo", 5))
+    assert results[0]["url"] == "https://www.cocina.mx/tinga/?utm_source=x"
+    assert not covered  # un solo documento tiene ambos terminos (min_hits=2)
+
+
+def test_accents_are_folded(index):
+    results, _ = asyncio.run(index.lookup("recipe", "jamon fria", 5))
+    assert results[0]["title"] == "Jamón serrano" and results[0]["extra_snippets"] == ["tapas"]
+
+
+def test_local_mode_never_calls_brave(index, brave):
+    out = _tiered("local")
+    assert out["source"] == "local" and out["results"] and brave["calls"] == 0
+
+
+def test_auto_serves_local_when_covered(index, brave):
+    out = _tiered("auto", query="pollo")
+    assert out["source"] == "local" and brave["calls"] == 0
+
+
+def test_auto_goes_live_when_not_covered_and_indexes_results(index, brave):
+    out = _tiered("auto")
+    assert out["source"] == "live" and out["results"] == LIVE and brave["calls"] == 1
+    assert index.stats["ingested"] == 5 and index.stats["updated"] == 1
+
+
+def test_auto_goes_live_when_brave_is_cached(index, brave):
+    brave["peek"] = True
+    out = _tiered("auto", query="pollo")
+    assert out["source"] == "live" and brave["calls"] == 1
+
+
+def test_live_error_falls_back_to_index(index, brave):
+    brave["res"] = {"results": [], "error": "budget_deferred"}
+    out = _tiered("live")
+    assert out["source"] == "local" and out["fallback"] == "budget_deferred" and out["results"]
+    assert index.stats["fallbacks"] == 1
+
+
+def test_merged_adds_local_without_duplicates(index, brave):
+    brave["res"] = {"results": LIVE, "cache": "hit"}
+    out = _tiered("merged", query="pollo")
+    urls = [canonical_url(r["url"]) for r in out["results"]]
+    assert out["source"] == "merged" and len(urls) == len(set(urls)) == 4
+    assert [r.get("source", "brave") for r in out["results"]][:2] == ["brave", "brave"]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""menu_search (app/search/menu.py): reserva compartida, tipos listos/pendientes al vencer el deadline."""
+import asyncio
+
+import pytest
+
+from app import deadline
+from app.search import menu as menu_mod
+
+DELAYS = {"desayuno": 0.0, "comida": 0.01, "cena": 0.3}
+
+
+class FakeReservation:
+    def __init__(self, n):
+        self.granted = n
+        self.retry_after = None
+        self.released = 0
+
+    async def release(self):
+        self.released += 1
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    state = {"reservations": [], "calls": [], "cached": set(), "fail": set()}
+
+    async def recipes_search(params, reservation=None):
+        tipo = params["tipo_comida"]
+        state["calls"].append((tipo, reservation))
+        await asyncio.sleep(DELAYS.get(tipo, 0.0))
+        if tipo in state["fail"]:
+            raise RuntimeError(f"fallo {tipo}")
+        return {"query": f"{params['query']} {tipo}", "recetas": [{"title": tipo}], "count": 1, "source": "live"}
+
+    async def reserve(n, priority="interactive"):
+        res = FakeReservation(n)
+        state["reservations"].append(res)
+        return res
+
+    def peek(query, **kwargs):
+        return any(t in query for t in state["cached"])
+
+    monkeypatch.setattr(menu_mod, "recipes_search", recipes_search)
+    monkeypatch.setattr(menu_mod.provider_search, "reserve", reserve)
+    monkeypatch.setattr(menu_mod.provider_search, "peek", peek)
+    return state
+
+
+def test_all_tipos_ready_with_one_reservation(fake):
+    fake["cached"].add("desayuno")
+    out = asyncio.run(menu_mod.menu_search({"tipos_comida": ["Desayuno", "comida", "cena", "comida"]}))
+    assert list(out["menu"]) == ["desayuno", "comida", "cena"]
+    assert all(slot["status"] == "ready" and slot["ready_ms"] >= 0 for slot in out["menu"].values())
+    assert out["complete"] is True and out["pending"] == []
+    # Solo las busquedas fuera de cache reservan hueco, y todas comparten la misma reserva
+    (reservation,) = fake["reservations"]
+    assert out["reserved"] == reservation.granted == 2 and reservation.released == 1
+    assert {r for _, r in fake["calls"]} == {reservation}
+
+
+def test_deadline_returns_ready_and_leaves_rest_pending(fake):
+    async def run():
+        token = deadline.start(0.1)
+        try:
+            out = await menu_mod.menu_search({})
+            cuts = deadline.current().cuts
+        finally:
+            deadline.reset(token)
+        released_early = fake["reservations"][0].released
+        await asyncio.sleep(0.35)
+        return out, cuts, released_early
+
+    out, cuts, released_early = asyncio.run(run())
+    assert out["complete"] is False and out["pending"] == ["cena"]
+    assert out["menu"]["cena"] == {"status": "pending"}
+    assert out["menu"]["desayuno"]["status"] == out["menu"]["comida"]["status"] == "ready"
+    assert {"stage": "menu", "reason": "1 slots pending"} in cuts
+    # La reserva se devuelve cuando termina la busqueda que siguio en segundo plano
+    assert released_early == 0 and fake["reservations"][0].released == 1
+
+
+def test_failed_tipo_is_reported(fake):
+    fake["fail"].add("comida")
+    out = asyncio.run(menu_mod.menu_search({"tipos_comida": "comida"}))
+    assert out["menu"]["comida"]["status"] == "error" and "fallo comida" in out["menu"]["comida"]["error"]
+    assert out["complete"] is True
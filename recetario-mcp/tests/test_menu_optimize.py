@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""recetario.menu_optimize (app/search/menu_optimize.py): solver y casos sin solucion."""
+import asyncio
+
+import numpy as np
+
+from app.search.menu_optimize import menu_optimize, solve
+
+
+def _arr(*xs):
+    return np.array(xs, dtype=np.float64)
+
+
+def test_solve_picks_best_combination_within_budget():
+    costs = [_arr(50, 20), _arr(80, 30)]
+    values = [_arr(-2, -1), _arr(-2, -1)]
+    # Lo mejor (50 + 80) no cabe en 100: gana el mejor par que cabe
+    picked, feasible = solve(costs, values, 100.0)
+    assert feasible and picked in ([0, 1], [1, 0])
+    assert sum(costs[k][j] for k, j in enumerate(picked)) <= 100.0
+    assert solve(costs, values, None) == ([0, 0], True)
+
+
+def test_solve_infeasible_returns_cheapest_and_false():
+    picked, feasible = solve([_arr(50, 40), _arr(80, 70)], [_arr(0, 0), _arr(0, 0)], 60.0)
+    assert picked == [1, 1] and feasible is False
+
+
+def test_solve_group_without_candidates():
+    assert solve([_arr(10), _arr()], [_arr(0), _arr()], 100.0) == (None, False)
+
+
+def _params(candidatos, budget=100):
+    return {"tipos_comida": list(candidatos), "presupuestoDiario": budget, "candidatos": candidatos}
+
+
+def test_menu_over_budget_is_reported():
+    out = asyncio.run(menu_optimize(_params({
+        "desayuno": [{"title": "Chilaquiles", "cost": 90}, {"title": "Molletes", "cost": 70}],
+        "comida": [{"title": "Pozole", "cost": 120}],
+    })))
+    assert out["dentro_presupuesto"] is False
+    assert out["menu"]["desayuno"]["title"] == "Molletes"
+    assert out["total_cost"] == 190.0
+    assert "error" not in out
+
+
+def test_menu_without_costed_candidates_is_an_error():
+    out = asyncio.run(menu_optimize(_params({
+        "desayuno": [{"title": "Misterio", "ingredients": ["ingrediente sin precio"]}],
+        "cena": [{"title": "Otro misterio", "ingredients": ["otro sin precio"]}],
+    })))
+    assert out["error"] == "sin candidatos con costo"
+    assert out["menu"] == {}
+    assert out["sin_candidatos"] == ["desayuno", "cena"]
+    assert "dentro_presupuesto" not in out and "total_cost" not in out
+
+
+def test_tipo_without_costed_candidates_is_left_out():
+    out = asyncio.run(menu_optimize(_params({
+        "desayuno": [{"title": "Molletes", "cost": 40}],
+        "cena": [{"title": "Misterio", "ingredients": ["ingrediente sin precio"]}],
+    })))
+    assert list(out["menu"]) == ["desayuno"]
+    assert out["sin_candidatos"] == ["cena"]
+    assert out["dentro_presupuesto"] is True
+
+
+def test_solve_never_indexes_past_the_budget_with_negative_costs():
+    picked, feasible = solve([_arr(-5, 30), _arr(0, 50)], [_arr(-1, 0), _arr(-1, 0)], 100.0)
+    assert feasible and picked == [0, 0]
+
+
+def test_negative_costs_are_dropped_and_zero_costs_kept():
+    out = asyncio.run(menu_optimize(_params({
+        "desayuno": [{"title": "Negativo", "cost": -5}, {"title": "Agua de jamaica", "costo": 0}],
+        "cena": [{"title": "Negativo", "cost": "-20"}],
+    })))
+    assert out["candidatos"] == {"desayuno": 1, "cena": 0}
+    assert out["menu"]["desayuno"]["title"] == "Agua de jamaica"
+    assert out["total_cost"] == 0.0 and out["dentro_presupuesto"] is True
+    assert out["sin_candidatos"] == ["cena"]
+
+
+def test_only_negative_costs_is_an_error():
+    out = asyncio.run(menu_optimize(_params({"desayuno": [{"title": "x", "cost": -5}]})))
+    assert out["error"] == "sin candidatos con costo"
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Metricas Prometheus (app/metrics.py): histogramas, combinacion entre workers y formato de texto."""
+import asyncio
+import json
+import os
+import time
+
+from app.metrics import OTHER, Histogram, Registry, aggregate, render
+
+
+def _registry(metrics_dir=None):
+    reg = Registry()
+    reg.dir = metrics_dir
+    return reg
+
+
+def test_histogram_buckets_and_series_cap():
+    h = Histogram("t_seconds", "t", ("tool",), buckets=(0.1, 1.0))
+    h.max_series = 2
+    h.observe(0.05, "a")
+    h.observe(0.1, "a")
+    h.observe(5.0, "a")
+    h.observe(0.5, "b")
+    h.observe(0.5, "c")
+    h.observe(0.5, "d")
+    series = {tuple(k): (counts, total, n) for k, counts, total, n in h.state()["series"]}
+    # le es inclusivo: 0.1 cae en la cubeta 0.1; 5.0 va a +Inf
+    assert series[("a",)] == ([2, 0, 1], 5.15, 3)
+    assert series[(OTHER,)][2] == 2 and set(series) == {("a",), ("b",), (OTHER,)}
+
+
+def test_render_cumulative_buckets():
+    reg = _registry()
+    h = reg.histogram("t_seconds", "Tiempo.", ("tool",), buckets=(0.1, 1.0))
+    h.observe(0.05, 'x"y')
+    h.observe(0.5, 'x"y')
+    reg.register(lambda: [("t_calls_total", "counter", "Llamadas.", {"tool": "a"}, 3, "sum")])
+    text = asyncio.run(reg.render())
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{tool="x\\"y",le="0.1"} 1' in text
+    assert 't_seconds_bucket{tool="x\\"y",le="1"} 2' in text
+    assert 't_seconds_bucket{tool="x\\"y",le="+Inf"} 2' in text
+    assert 't_seconds_count{tool="x\\"y"} 2' in text
+    assert 't_calls_total{tool="a"} 3' in text
+    assert "recetario_metrics_workers 1" in text
+
+
+def test_broken_collector_is_skipped():
+    reg = _registry()
+
+    def broken():
+        raise RuntimeError("x")
+
+    reg.register(broken)
+    reg.register(lambda: [("ok_total", "counter", "ok", {}, 1, "sum")])
+    assert "ok_total 1" in asyncio.run(reg.render())
+
+
+def _state(samples, hist_counts=None):
+    hists = {}
+    if hist_counts is not None:
+        hists["t_seconds"] = {"help": "t", "labelnames": [], "bounds": [1.0], "series": [[[], hist_counts, 1.0, sum(hist_counts)]]}
+    return {"pid": 1, "ts": time.time(), "histograms": hists, "samples": samples}
+
+
+def test_aggregate_counters_sum_and_gauges_by_rule():
+    a = _state([
+        ["c_total", "counter", "c", {}, 2, "max"],
+        ["g_sum", "gauge", "g", {}, 1, "sum"],
+        ["g_max", "gauge", "g", {}, 7, "max"],
+        ["g_min", "gauge", "g", {}, 7, "min"],
+    ], [1, 0])
+    b = _state([
+        ["c_total", "counter", "c", {}, 3, "max"],
+        ["g_sum", "gauge", "g", {}, 4, "sum"],
+        ["g_max", "gauge", "g", {}, 9, "max"],
+        ["g_min", "gauge", "g", {}, 5, "min"],
+    ], [0, 2])
+    agg = aggregate([a, b])
+    values = {name: fam["values"][()] for name, fam in agg["families"].items()}
+    # Un contador siempre se suma, aunque declare otra combinacion
+    assert values == {"c_total": 5, "g_sum": 5, "g_max": 9, "g_min": 5}
+    assert agg["histograms"]["t_seconds"]["series"][()] == [[1, 2], 2.0, 3]
+    assert "t_seconds_count 3" in render(agg, workers=2)
+
+
+def test_worker_files_are_combined_and_stale_ones_ignored(tmp_path):
+    reg = _registry(str(tmp_path))
+    reg.register(lambda: [("calls_total", "counter", "c", {}, 1, "sum")])
+    other = _state([["calls_total", "counter", "c", {}, 10, "sum"]])
+    (tmp_path / "worker-99999991.json").write_text(json.dumps(other))
+    stale = tmp_path / "worker-99999992.json"
+    stale.write_text(json.dumps(other))
+    old = time.time() - reg.stale_s - 5
+    os.utime(stale, (old, old))
+
+    text = asyncio.run(reg.render())
+    assert "calls_total 11" in text and "recetario_metrics_workers 2" in text
+
+
+def test_derived_gauges_see_combined_families():
+    reg = _registry()
+    reg.register(lambda: [
+        ("hits_total", "counter", "h", {}, 3, "sum"),
+        ("lookups_total", "counter", "l", {}, 4, "sum"),
+    ])
+    reg.derive("hit_ratio", "Ratio.", lambda fams: [({}, fams["hits_total"]["values"][()] / fams["lookups_total"]["values"][()])])
+    assert "hit_ratio 0.75" in asyncio.run(reg.render())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""ParserPool (app/scraping/parser_pool.py): micro-batching, modos de ejecucion y limite por trabajo."""
+import asyncio
+import time
+
+import pytest
+
+from app.scraping import parser_pool as pool_mod
+from app.scraping.parser_pool import ParserPool
+
+HTML = '<h1>Huevo {n} pzas</h1><span class="price">${n}.00</span>'
+
+
+def _pool(mode, **kw):
+    pool = ParserPool()
+    pool.mode = mode
+    pool.workers = kw.get("workers", 2)
+    pool.batch_window_s = kw.get("window", 0.01)
+    pool.batch_max = kw.get("batch_max", 8)
+    pool.job_timeout_s = kw.get("job_timeout", 2.0)
+    return pool
+
+
+def _url(n):
+    return f"https://www.soriana.com/huevo-{n}"
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+def test_parse_returns_each_result_to_its_caller(mode):
+    pool = _pool(mode)
+
+    async def run():
+        try:
+            return await asyncio.gather(*[pool.parse(HTML.format(n=n), _url(n)) for n in range(5)])
+        finally:
+            pool.close()
+
+    results = asyncio.run(run())
+    assert [r["price"] for r in results] == [f"{n}.00" for n in range(5)]
+    assert [r["url"] for r in results] == [_url(n) for n in range(5)]
+    # Las 5 llegaron en la misma ventana: un lote repartido entre los 2 workers
+    assert pool.stats["jobs"] == 5 and pool.stats["batches"] == 2
+    assert pool.snapshot()["queue_depth"] == 0
+
+
+def test_batch_max_flushes_without_waiting_for_window():
+    pool = _pool("inline", window=10.0, batch_max=3, workers=1)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*[pool.parse(HTML.format(n=n), _url(n)) for n in range(3)]), timeout=1.0
+        )
+
+    assert len(asyncio.run(run())) == 3
+    assert pool.stats["batches"] == 1
+
+
+def test_parse_many_preserves_order():
+    pool = _pool("inline", workers=3)
+    jobs = [(HTML.format(n=n), _url(n)) for n in range(7)]
+    results = asyncio.run(pool.parse_many(jobs))
+    assert [r["price"] for r in results] == [f"{n}.00" for n in range(7)]
+    assert pool.stats["batches"] == 3
+
+
+def test_timeout_returns_empty_results(monkeypatch):
+    def slow(jobs):
+        time.sleep(0.3)
+        return [({"url": url, "store": "X", "price": "1", "name": "x"}, 1.0) for _, url in jobs]
+
+    monkeypatch.setattr(pool_mod, "_parse_batch", slow)
+    pool = _pool("thread", workers=1, job_timeout=0.05)
+
+    async def run():
+        try:
+            return await pool.parse_many([("<h1>a</h1>", _url(1)), ("<h1>b</h1>", _url(2))])
+        finally:
+            pool.close()
+
+    results = asyncio.run(run())
+    assert results == [{"url": _url(n), "store": None, "price": None, "name": None} for n in (1, 2)]
+    assert pool.stats["timeouts"] == 2
+
+
+def test_process_mode():
+    pool = _pool("process", workers=1)
+
+    async def run():
+        try:
+            return await pool.parse(HTML.format(n=7), _url(7))
+        finally:
+            pool.close()
+
+    assert asyncio.run(run())["price"] == "7.00"
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Historial de precios (app/search/price_history.py): claves de producto, agregados y compactacion."""
+import asyncio
+import time
+
+import pytest
+
+from app.search.price_history import DAY_S, PriceHistory, price_history_search, product_key, unit_of
+
+NOW = float(int(time.time()))
+
+
+def _history(**kw):
+    h = PriceHistory(log_path="")
+    h.min_gap_s = 0.0
+    for k, v in kw.items():
+        setattr(h, k, v)
+    return h
+
+
+@pytest.mark.parametrize("text, key", [
+    ("huevos", "Huevo"),
+    ("Precio de huevos", "Huevo"),
+    ("tomate", "Jitomate"),
+    ("chiles jalapeños", "Chile jalapeno"),
+    ("carne de puerco", "Cerdo"),
+    # variedades y productos compuestos: serie propia
+    ("salmon", "salmon"),
+    ("Leche Condensada", "leche condensada"),
+    ("aceite de oliva", "aceite de oliva"),
+    ("carnitas", "carnitas"),
+])
+def test_product_key_merges_synonyms_only(text, key):
+    assert product_key(text) == key
+
+
+def test_unit_of():
+    assert unit_of("Arroz Verde Valle 1 Kg") == "1 kg"
+    assert unit_of("Leche Lala 1,5 L") == "1.5 l"
+    assert unit_of("Aguacate Hass") is None
+
+
+def test_aggregates_latest_min_median_and_trend():
+    h = _history()
+    for day, price in enumerate([30.0, 32.0, 34.0, 36.0]):
+        assert h.record("huevos", "Walmart", f"${price}", ts=NOW - (3 - day) * DAY_S)
+    s = h.stores("huevo")[0]
+    assert s.product == "Huevo"
+    out = s.summary()
+    assert (out["latest"], out["min"], out["median_30d"], out["observations_30d"]) == (36.0, 30.0, 33.0, 4)
+    # +2 pesos por dia sobre una media de 33 -> ~+182% en 30 dias
+    assert out["trend_30d_pct"] == round(2.0 * 30 / 33.0 * 100.0, 2)
+
+
+def test_invalid_and_repeated_prices_are_not_recorded():
+    h = _history(min_gap_s=300.0)
+    assert not h.record("huevo", "Walmart", "sin precio")
+    assert not h.record("huevo", "Walmart", 0)
+    assert not h.record("", "Walmart", 10)
+    assert h.record("huevo", "Walmart", 10, ts=NOW)
+    assert not h.record("huevo", "Walmart", 10, ts=NOW + 60)
+    assert h.stats["deduplicated"] == 1
+    assert h.stores("huevo")[0].agg["latest_ts"] == NOW + 60
+
+
+def test_old_observations_become_daily_points():
+    h = _history(raw_days=1.0)
+    day0 = (NOW // DAY_S - 5) * DAY_S
+    for price in (10.0, 20.0):
+        h.record("arroz", "Soriana", price, ts=day0 + price)
+    h.record("arroz", "Soriana", 5.0, ts=NOW)
+    s = h.stores("arroz")[0]
+    assert list(s.day_ts) == [day0] and list(s.day_mean) == [15.0] and list(s.day_n) == [2]
+    assert list(s.price) == [5.0]
+    assert s.agg["min"] == 5.0
+
+
+def test_cheapest_store_first_and_search_payload():
+    h = _history()
+    h.record("frijol", "Walmart", 40, ts=NOW)
+    h.record("frijoles", "Chedraui", 35, ts=NOW)
+    h.record("salmon", "Walmart", 300, ts=NOW)
+    assert [s.store for s in h.stores("frijol")] == ["Chedraui", "Walmart"]
+    assert [s.store for s in h.stores("frijol", store="walmart")] == ["Walmart"]
+    assert h.stores("pescado") == []
+
+
+def test_each_package_size_is_its_own_series():
+    h = _history()
+    h.record("arroz", "Walmart", 30, unit="1 kg", name="Arroz 1 kg", ts=NOW - 60)
+    h.record("arroz", "Walmart", 120, unit="5 kg", name="Arroz 5 kg", ts=NOW - 30)
+    h.record("arroz", "Walmart", 32, unit="1 kg", name="Arroz 1 kg", ts=NOW)
+    series = h.stores("arroz")
+    assert [(s.unit, s.agg["median_30d"]) for s in series] == [("1 kg", 31.0), ("5 kg", 120.0)]
+    assert [s.summary()["name"] for s in series] == ["Arroz 1 kg", "Arroz 5 kg"]
+
+
+def test_evicting_a_series_keeps_the_other_sizes():
+    h = _history(max_series=2)
+    h.record("arroz", "Walmart", 30, unit="1 kg", ts=NOW - 60)
+    h.record("arroz", "Walmart", 120, unit="5 kg", ts=NOW - 30)
+    h.record("frijol", "Walmart", 40, ts=NOW)
+    assert h.stats["evicted_series"] == 1
+    assert [s.unit for s in h.stores("arroz")] == ["5 kg"]
+    assert h.snapshot()["series"] == 2
+
+
+def test_price_history_search_uses_the_module_history(monkeypatch):
+    from app.search import price_history as module
+
+    h = _history()
+    h.record("huevo", "Walmart", 50, ts=NOW)
+    h.record("huevo", "Soriana", 45, ts=NOW)
+    monkeypatch.setattr(module, "price_history", h)
+    out = asyncio.run(price_history_search({"product": "huevos", "points": True}))
+    assert out["product"] == "Huevo" and out["count"] == 2
+    assert out["mas_barata"]["store"] == "Soriana"
+    assert out["tiendas"][0]["points"] == [(out["tiendas"][0]["latest_at"], 45.0)]
+    assert asyncio.run(price_history_search({}))["error"] == "product requerido"
+
+
+def test_log_is_written_off_the_loop_and_replayed(tmp_path):
+    path = str(tmp_path / "hist" / "price_history.jsonl")
+
+    async def write():
+        h = _history(log_path=path)
+        await h.load()
+        h.record("huevo", "Walmart", 50, unit="30 pz", ts=NOW - 60)
+        h.record("huevo", "Walmart", 48, unit="30 pz", ts=NOW)
+        # record() solo encola; el archivo se escribe en flush() / close()
+        assert h.snapshot()["log_pending"] == 2 and not (tmp_path / "hist").exists()
+        await h.close()
+        assert h.snapshot()["log_lines"] == 2
+
+    async def read():
+        h = _history(log_path=path)
+        await h.load()
+        return h.stores("huevos")
+
+    asyncio.run(write())
+    series = asyncio.run(read())
+    assert [(s.unit, s.agg["latest"], s.agg["min"]) for s in series] == [("30 pz", 48.0, 48.0)]
+
+
+def test_load_compacts_a_log_twice_the_retained_size(tmp_path):
+    path = tmp_path / "price_history.jsonl"
+    old = NOW - 400 * DAY_S  # fuera de PRICE_HISTORY_MAX_DAYS
+    lines = [f'{{"product": "Arroz", "store": "Soriana", "price": {20 + i}, "ts": {old + i}}}' for i in range(5)]
+    lines.append(f'{{"product": "Arroz", "store": "Soriana", "price": 30, "ts": {NOW}}}')
+    path.write_text("\n".join(lines + ["no es json"]) + "\n", encoding="utf-8")
+
+    h = _history(log_path=str(path))
+    asyncio.run(h.load())
+    assert h.points() == 1 and h.snapshot()["log_lines"] == 1
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Almacen de precios (app/scraping/store.py) y revalidacion con GET condicional en scrape_price."""
+import asyncio
+
+import pytest
+
+from app.scraping import supermarkets
+from app.scraping.scheduler import scrape_scheduler
+from app.scraping.store import PriceStore
+from app.scraping.supermarkets import FetchResult
+
+URL = "https://www.walmart.com.mx/ip/huevo-blanco-12-pzas/123"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = PriceStore(str(tmp_path / "prices.sqlite3"))
+    monkeypatch.setattr(supermarkets, "price_store", s)
+    monkeypatch.setattr(scrape_scheduler, "delay_s", 0.0)
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Respuestas de fetch_page en orden; anota las cabeceras condicionales de cada peticion."""
+    calls = []
+    responses = []
+
+    async def fetch_page(url, timeout=10, etag=None, last_modified=None, extract=False, max_bytes=None):
+        calls.append({"etag": etag, "last_modified": last_modified})
+        return responses.pop(0)
+
+    monkeypatch.setattr(supermarkets, "fetch_page", fetch_page)
+    return calls, responses
+
+
+def _page(price="$39.90", etag='"v1"'):
+    return FetchResult(
+        200, "<html></html>", etag, "Tue, 01 Apr 2025 10:00:00 GMT",
+        extracted={"price": price, "name": "Huevo blanco 12 pzas"}, truncated=True,
+    )
+
+
+def test_put_get_round_trip(store):
+    async def run():
+        await store.put(URL, {"store": "Walmart", "price": "39.90", "name": "Huevo"}, etag='"v1"')
+        return await store.get(URL), await store.get("https://otra")
+
+    record, missing = asyncio.run(run())
+    assert record["price"] == "39.90" and record["etag"] == '"v1"' and record["store"] == "Walmart"
+    assert missing is None
+    assert store.is_fresh(record)
+    store.fresh_s = 0
+    assert not store.is_fresh(record)
+
+
+def test_live_then_cached_without_network(store, fetches):
+    calls, responses = fetches
+    responses.append(_page())
+
+    async def run():
+        return await supermarkets.scrape_price(URL), await supermarkets.scrape_price(URL)
+
+    live, cached = asyncio.run(run())
+    assert live["freshness"] == "live" and live["price"] == "39.90"
+    assert cached["freshness"] == "cached" and cached["price"] == "39.90"
+    assert len(calls) == 1 and calls[0] == {"etag": None, "last_modified": None}
+    assert store.stats["hits"] == 1 and store.stats["writes"] == 1
+
+
+def test_304_revalidates_without_parsing(store, fetches, monkeypatch):
+    calls, responses = fetches
+    responses.extend([_page(), FetchResult(304)])
+
+    async def no_parse(text, url):
+        raise AssertionError("un 304 no se parsea")
+
+    monkeypatch.setattr(supermarkets.parser_pool, "parse", no_parse)
+
+    async def run():
+        await supermarkets.scrape_price(URL)
+        store.fresh_s = 0
+        return await supermarkets.scrape_price(URL)
+
+    out = asyncio.run(run())
+    assert out["freshness"] == "revalidated" and out["price"] == "39.90"
+    assert calls[1] == {"etag": '"v1"', "last_modified": "Tue, 01 Apr 2025 10:00:00 GMT"}
+    assert store.stats["revalidated"] == 1 and store.stats["writes"] == 1
+
+
+def test_failed_revalidation_serves_last_known_price(store, fetches):
+    calls, responses = fetches
+    responses.extend([_page(), FetchResult(404)])
+
+    async def run():
+        await supermarkets.scrape_price(URL)
+        store.fresh_s = 0
+        return await supermarkets.scrape_price(URL)
+
+    out = asyncio.run(run())
+    assert out["freshness"] == "stale" and out["price"] == "39.90"
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""ProviderSearch.search (app/search/provider.py): stale-while-revalidate, copias stale de respaldo y prewarming."""
+import asyncio
+import time
+
+from app.search.cache import CacheEntry
+from app.search.provider import ProviderSearch
+
+ARGS = {
+    "query": "tacos", "topK": 5, "country": "MX", "search_lang": "es",
+    "extra_snippets": False, "freshness": None, "offset": 0,
+}
+
+
+def _provider(results=None, error=None):
+    provider = ProviderSearch()
+    provider.calls = []
+
+    async def brave(**kwargs):
+        provider.calls.append(kwargs)
+        await asyncio.sleep(0)
+        if error:
+            return {"results": [], "error": error}
+        return {"results": results or [{"url": "https://nuevo"}]}
+
+    provider._search_brave = brave
+    return provider
+
+
+def _seed(provider, expired_s, value=None):
+    """Entrada en cache vencida hace expired_s segundos (negativo = aun vigente)."""
+    key = provider.cache.make_key(**ARGS)
+    now = time.time()
+    value = value or {"results": [{"url": "https://viejo"}]}
+    provider.cache._put_l1(key, CacheEntry(value, now - 60 - expired_s, now - expired_s))
+    return key
+
+
+async def _search(provider):
+    return await provider.search("tacos", topK=5, country="MX", search_lang="es")
+
+
+async def _settle(provider):
+    while provider._revalidating:
+        await asyncio.sleep(0)
+
+
+def test_fresh_hit_does_not_fetch():
+    provider = _provider()
+    _seed(provider, expired_s=-30)
+    res = asyncio.run(_search(provider))
+    assert res["cache"] == "hit" and res["results"][0]["url"] == "https://viejo"
+    assert provider.calls == []
+
+
+def test_recently_expired_is_served_stale_and_revalidated():
+    provider = _provider()
+    key = _seed(provider, expired_s=10)
+
+    async def run():
+        res = await _search(provider)
+        await _settle(provider)
+        return res, await _search(provider)
+
+    stale, fresh = asyncio.run(run())
+    assert stale["cache"] == "stale" and stale["revalidating"] is True
+    assert stale["results"][0]["url"] == "https://viejo"
+    assert fresh["cache"] == "hit" and fresh["results"][0]["url"] == "https://nuevo"
+    assert len(provider.calls) == 1 and provider.calls[0]["priority"] == "background"
+    assert provider.stats["swr_served"] == 1 and provider.stats["revalidations"] == 1
+    assert provider.cache.peek(key)
+
+
+def test_old_copy_covers_upstream_error():
+    provider = _provider(error="http_500")
+    _seed(provider, expired_s=provider.swr_window_s + 10)
+    res = asyncio.run(_search(provider))
+    assert res["cache"] == "stale" and res["error"] == "http_500"
+    assert res["results"][0]["url"] == "https://viejo"
+
+
+def test_miss_without_copy_returns_error():
+    provider = _provider(error="http_500")
+    res = asyncio.run(_search(provider))
+    assert res["cache"] == "miss" and res["error"] == "http_500" and res["results"] == []
+
+
+def test_over_budget_serves_stale_without_fetch():
+    provider = _provider()
+    _seed(provider, expired_s=provider.swr_window_s + 10)
+
+    async def admit(priority, has_substitute):
+        return not has_substitute
+
+    provider.planner.admit = admit
+    res = asyncio.run(_search(provider))
+    assert res["cache"] == "stale" and "error" not in res
+    assert provider.calls == []
+
+
+def test_prewarm_tick_refreshes_only_hot_keys_due():
+    provider = _provider()
+    prewarmer = provider.prewarmer
+    prewarmer.min_score, prewarmer.lead_s = 2.0, 120.0
+    hot_args = dict(ARGS)
+    cold_args = {**ARGS, "query": "pozole"}
+    fresh_args = {**ARGS, "query": "mole"}
+    now = time.time()
+    for args, expires_in, hits in ((hot_args, 60, 3), (cold_args, 60, 1), (fresh_args, 3600, 3)):
+        key = provider.cache.make_key(**args)
+        provider.cache._put_l1(key, CacheEntry({"results": []}, now, now + expires_in))
+        for _ in range(hits):
+            provider.hot.note(key, args, None)
+
+    refreshed = asyncio.run(prewarmer.tick())
+    assert refreshed == 1
+    assert [c["query"] for c in provider.calls] == ["tacos"]
+    assert provider.hot.lag_snapshot()["samples"] == 1
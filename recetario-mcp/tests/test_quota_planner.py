@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""QuotaPlanner (app/search/provider.py): curva de presupuesto mensual y admision segun prioridad."""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.search.provider import QuotaPlanner
+
+
+class FakeLimiter:
+    def __init__(self, monthly_quota=3000, used=0):
+        self.monthly_quota = monthly_quota
+        self.used = used
+        self.reads = 0
+
+    async def quota_used(self):
+        self.reads += 1
+        return self.used
+
+
+def _planner(used=0, quota=3000, slack=0.02):
+    planner = QuotaPlanner(FakeLimiter(quota, used))
+    planner.slack = slack
+    planner.refresh_s = 0.0
+    return planner
+
+
+def test_budget_curve_is_linear_with_flat_profile():
+    planner = _planner()
+    # Abril tiene 30 dias: con perfil plano el dia 16 a las 00:00 va justo a la mitad
+    assert planner.budget_now(datetime(2025, 4, 1, tzinfo=timezone.utc)) == 0.0
+    assert planner.budget_now(datetime(2025, 4, 16, tzinfo=timezone.utc)) == pytest.approx(1500.0)
+    assert planner.budget_now(datetime(2025, 4, 30, 23, 59, 59, tzinfo=timezone.utc)) == pytest.approx(3000.0, abs=0.1)
+
+
+def test_demand_profile_moves_budget_to_busy_hours():
+    planner = _planner()
+    day = datetime(2025, 4, 1, 20, tzinfo=timezone.utc)
+    for _ in range(100):
+        planner.note_demand(day)
+    # Las 20 h concentran la demanda: al empezar esa hora casi nada del dia se ha gastado
+    start = datetime(2025, 4, 2, 20, tzinfo=timezone.utc)
+    end = datetime(2025, 4, 2, 21, tzinfo=timezone.utc)
+    per_day = 3000 / 30
+    assert planner.budget_now(start) - planner.budget_now(datetime(2025, 4, 2, tzinfo=timezone.utc)) < 0.3 * per_day
+    assert planner.budget_now(end) - planner.budget_now(start) > 0.7 * per_day
+
+
+def test_under_budget_admits_everything():
+    planner = _planner(used=0)
+
+    async def run():
+        return [await planner.admit(p, s) for p in ("interactive", "background") for s in (False, True)]
+
+    assert asyncio.run(run()) == [True] * 4
+    assert planner.stats == {"admitted": 4, "deferred": 0}
+
+
+def test_over_budget_defers_background_and_substitutes():
+    planner = _planner(used=10_000)
+
+    async def run():
+        return (
+            await planner.admit("interactive", has_substitute=False),
+            await planner.admit("interactive", has_substitute=True),
+            await planner.admit("background", has_substitute=False),
+        )
+
+    assert asyncio.run(run()) == (True, False, False)
+    assert planner.stats == {"admitted": 1, "deferred": 2}
+
+
+def test_used_refreshes_at_most_every_refresh_s():
+    planner = _planner(used=5)
+    planner.refresh_s = 3600.0
+
+    async def run():
+        await planner.admit("interactive", False)
+        planner.limiter.used = 7
+        await planner.admit("interactive", False)
+
+    asyncio.run(run())
+    assert planner.limiter.reads == 1 and planner.used == 5
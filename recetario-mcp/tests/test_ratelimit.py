@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""BraveLimiter (app/search/ratelimit.py): GCRA y cuota, en memoria y con los scripts Lua sobre Redis."""
+import asyncio
+
+import pytest
+
+from app.search import ratelimit
+from app.search.ratelimit import BraveLimiter
+
+
+def _limiter(max_rps=20.0, quota=1000, redis=None):
+    lim = BraveLimiter(max_rps, quota)
+    lim.max_wait = {"interactive": 0.2, "background": 0.0}
+    if redis is not None:
+        lim._redis = redis
+        lim._rate_script = redis.register_script(ratelimit._RATE_LUA)
+        lim._quota_script = redis.register_script(ratelimit._QUOTA_LUA)
+    return lim
+
+
+def _fakeredis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_limiter(request):
+    def make(**kw):
+        return _limiter(redis=_fakeredis() if request.param == "redis" else None, **kw)
+
+    return make
+
+
+def test_admit_then_deny_background_until_refill(make_limiter):
+    async def main():
+        lim = make_limiter(max_rps=20.0)
+        first = await lim.acquire("background")
+        assert first.ok and first.wait_s == pytest.approx(0.0, abs=0.01)
+        # Sin hueco libre: background no espera
+        denied = await lim.acquire("background")
+        assert not denied.ok and denied.reason == "rate_limited"
+        assert 0.0 < denied.retry_after <= 0.05
+        assert await lim.quota_used() == 1  # la cuota del rechazo se devolvio
+        await asyncio.sleep(0.06)
+        assert (await lim.acquire("background")).ok
+        assert lim.stats["admitted"]["background"] == 2
+        assert lim.stats["rejected_rate"]["background"] == 1
+
+    asyncio.run(main())
+
+
+def test_interactive_waits_within_tolerance(make_limiter):
+    async def main():
+        lim = make_limiter(max_rps=20.0)
+        waits = []
+        for _ in range(5):
+            adm = await lim.acquire("interactive")
+            assert adm.ok
+            waits.append(adm.wait_s)
+        # Cada admision reserva el siguiente hueco: 0, 50, 100, 150, 200 ms
+        assert waits == pytest.approx([0.0, 0.05, 0.10, 0.15, 0.20], abs=0.02)
+        over = await lim.acquire("interactive")
+        assert not over.ok and over.retry_after > 0
+        # max_wait del llamador (p. ej. deadline) recorta la tolerancia
+        assert not (await lim.acquire("interactive", max_wait=0.0)).ok
+
+    asyncio.run(main())
+
+
+def test_cost_reserves_several_slots(make_limiter):
+    async def main():
+        lim = make_limiter(max_rps=20.0)
+        assert (await lim.acquire("interactive", cost=3)).ok
+        nxt = await lim.acquire("interactive")
+        assert nxt.ok and nxt.wait_s == pytest.approx(0.15, abs=0.02)
+        assert await lim.quota_used() == 4
+
+    asyncio.run(main())
+
+
+def test_monthly_quota_exhaustion_and_release(make_limiter):
+    async def main():
+        lim = make_limiter(max_rps=1000.0, quota=2)
+        assert (await lim.acquire()).ok
+        assert (await lim.acquire()).ok
+        denied = await lim.acquire()
+        assert not denied.ok and denied.reason == "quota_exceeded" and denied.retry_after > 0
+        assert await lim.quota_used() == 2
+        await lim.release_quota(1)
+        assert (await lim.acquire()).ok
+        assert lim.stats["rejected_quota"] == 1
+
+    asyncio.run(main())
+
+
+def test_redis_errors_fall_back_to_memory():
+    class Broken:
+        def register_script(self, _):
+            async def script(**_kw):
+                raise ConnectionError("redis caido")
+
+            return script
+
+        async def get(self, _):
+            raise ConnectionError("redis caido")
+
+    async def main():
+        lim = _limiter(max_rps=20.0, redis=Broken())
+        assert (await lim.acquire("background")).ok
+        assert not (await lim.acquire("background")).ok
+        assert await lim.quota_used() == 1
+        assert lim.stats["redis_errors"] >= 4
+
+    asyncio.run(main())
+
+
+def test_disabled_limits_reject():
+    async def main():
+        assert (await _limiter(max_rps=0).acquire()).reason == "rate_limited"
+        assert (await _limiter(quota=0).acquire()).reason == "quota_exceeded"
+
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Reglas XPath por dominio (app/scraping/rules.py)."""
+import pytest
+
+from app.scraping.rules import extract, parse_price_text, rule_for, store_for
+
+
+@pytest.mark.parametrize("url, store", [
+    ("https://www.walmart.com.mx/ip/huevo/1", "Walmart"),
+    ("https://super.walmart.com.mx/ip/huevo/1", "Walmart"),
+    ("https://www.soriana.com/huevo", "Soriana"),
+    ("https://www.chedraui.com.mx/huevo", "Chedraui"),
+    ("https://www.heb.com.mx/huevo/p", "HEB"),
+    ("https://www.lacomer.com.mx/huevo", "La Comer"),
+    ("https://notwalmart.com.mx/huevo", "Otro"),
+    ("https://ejemplo.com/huevo", "Otro"),
+])
+def test_store_by_domain(url, store):
+    assert store_for(url) == store
+
+
+@pytest.mark.parametrize("text, price", [
+    ("$12.50", "12.50"),
+    ("$ 1,299.00", "1299.00"),
+    ("99 MXN", "99"),
+    ("Precio: 45.9 pesos", "45.9"),
+    ("", None),
+    ("Agotado", None),
+])
+def test_parse_price_text(text, price):
+    assert parse_price_text(text) == price
+
+
+@pytest.mark.parametrize("url, html, price, name", [
+    (
+        "https://www.walmart.com.mx/ip/huevo/1",
+        '<h1 data-automation="product-title">Huevo blanco 12 pzas</h1>'
+        '<span class="price">$1.00</span><div data-automation="product-price">$39.90</div>',
+        "39.90", "Huevo blanco 12 pzas",
+    ),
+    (
+        "https://www.walmart.com.mx/ip/leche/2",
+        '<div class="product-title">Leche entera 1 L</div><meta itemprop="price" content="27.50">',
+        "27.50", "Leche entera 1 L",
+    ),
+    (
+        "https://www.soriana.com/arroz",
+        '<h1> Arroz   super extra 1 kg </h1><span class="price product-price">$ 32.00</span>',
+        "32.00", "Arroz super extra 1 kg",
+    ),
+    (
+        "https://www.chedraui.com.mx/frijol",
+        '<h1>Frijol negro 900 g</h1><div data-price="41.5"></div>',
+        "41.5", "Frijol negro 900 g",
+    ),
+    (
+        "https://www.heb.com.mx/tortilla/p",
+        '<span class="vtex-store-components-3-x-productBrand">Tortilla de maiz</span>'
+        '<span class="vtex-product-price-1-x-sellingPriceValue">$22.90</span>',
+        "22.90", "Tortilla de maiz",
+    ),
+    (
+        "https://www.lacomer.com.mx/aceite",
+        '<h1>Aceite 1 L</h1><span class="precio_normal">$58.00</span>',
+        "58.00", "Aceite 1 L",
+    ),
+])
+def test_extract_per_domain(url, html, price, name):
+    out = extract(html, url)
+    assert out == {"url": url, "store": store_for(url), "price": price, "name": name}
+
+
+def test_first_match_in_document_order():
+    # Los XPath de una regla se unen con "|": gana el primer elemento del documento, no el primer XPath
+    # (en Soriana .price va antes que itemprop=price en la lista)
+    html = '<meta itemprop="price" content="10.00"><span class="price">$20.00</span>'
+    assert extract(html, "https://www.soriana.com/x")["price"] == "10.00"
+
+
+def test_generic_rule_scans_until_parseable_price():
+    html = '<span class="price">Agotado</span><span class="price">$15.00</span><h1></h1><h1>Azucar 1 kg</h1>'
+    out = extract(html, "https://tienda.ejemplo.com/azucar")
+    assert out["store"] == "Otro" and out["price"] == "15.00" and out["name"] == "Azucar 1 kg"
+    assert rule_for("https://tienda.ejemplo.com").scan_all
+
+
+@pytest.mark.parametrize("html", ["", "   ", "<html></html>"])
+def test_empty_pages(html):
+    out = extract(html, "https://www.soriana.com/x")
+    assert out["price"] is None and out["name"] is None and out["store"] == "Soriana"
+
+
+def test_encoding_declaration_is_accepted():
+    html = '<?xml version="1.0" encoding="utf-8"?><html><body><h1>Cafe</h1><span class="price">$80</span></body></html>'
+    out = extract(html, "https://www.soriana.com/cafe")
+    assert out["price"] == "80" and out["name"] == "Cafe"
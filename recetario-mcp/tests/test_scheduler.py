@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""CircuitBreaker y ScrapeScheduler (app/scraping/scheduler.py): open -> half_open -> closed y probes."""
+import asyncio
+import time
+
+import pytest
+
+from app import deadline, tracing
+from app.scraping.scheduler import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ScrapeScheduler
+
+URL = "https://www.walmart.com.mx/ip/huevo/1"
+
+
+def _scheduler(open_s=0.05, threshold=2):
+    sched = ScrapeScheduler()
+    sched.retries = 0
+    sched.delay_s = 0.0
+    sched.min_attempt_s = 0.0
+    sched.failure_threshold = threshold
+    sched.open_s = open_s
+    sched.max_open_s = 1.0
+    return sched
+
+
+async def _ok(_timeout):
+    return "page", False, False
+
+
+async def _fail(_timeout):
+    return None, True, False
+
+
+async def _open(sched):
+    for _ in range(sched.failure_threshold):
+        await sched.run(URL, _fail)
+    return sched._state(sched.domain_of(URL)).breaker
+
+
+def test_breaker_opens_after_threshold_and_grants_one_probe():
+    b = CircuitBreaker(failure_threshold=2, open_s=0.05, max_open_s=1.0)
+    assert b.allow()
+    assert not b.record_failure()
+    assert b.record_failure() and b.state == OPEN
+    assert not b.allow()
+    time.sleep(0.06)
+    assert b.allow() and b.state == HALF_OPEN
+    assert not b.allow()  # un solo hueco de prueba
+    b.record_success()
+    assert b.state == CLOSED and b.allow()
+
+
+def test_failed_probe_reopens_with_double_wait():
+    b = CircuitBreaker(failure_threshold=1, open_s=0.05, max_open_s=0.08)
+    b.record_failure()
+    time.sleep(0.06)
+    assert b.allow()
+    assert b.record_failure() and b.state == OPEN
+    assert b.open_s == pytest.approx(0.08)  # el doble con tope max_open_s
+
+
+def test_scheduler_recovers_through_half_open_request():
+    async def main():
+        sched = _scheduler()
+        breaker = await _open(sched)
+        assert breaker.state == OPEN
+        assert await sched.run(URL, _ok) == (None, "circuit_open")
+        await asyncio.sleep(0.06)
+        assert await sched.run(URL, _ok) == ("page", "ok")
+        assert breaker.state == CLOSED
+
+    asyncio.run(main())
+
+
+def test_cancelled_half_open_attempt_releases_the_probe():
+    async def main():
+        sched = _scheduler()
+        breaker = await _open(sched)
+        await asyncio.sleep(0.06)
+
+        async def hang(_timeout):
+            await asyncio.sleep(10)
+            return "page", False, False
+
+        task = asyncio.ensure_future(sched.run(URL, hang))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN and not breaker.allow()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # El hueco quedo libre: la siguiente peticion prueba y cierra
+        assert await sched.run(URL, _ok) == ("page", "ok")
+        assert breaker.state == CLOSED
+
+    asyncio.run(main())
+
+
+def test_half_open_deadline_skip_releases_the_probe():
+    async def main():
+        sched = _scheduler()
+        sched.min_attempt_s = 0.2
+        breaker = await _open(sched)
+        await asyncio.sleep(0.06)
+        token = deadline.start(0.05)
+        try:
+            assert await sched.run(URL, _ok) == (None, "deadline")
+        finally:
+            deadline.reset(token)
+        assert breaker.state == HALF_OPEN
+        sched.min_attempt_s = 0.0
+        assert await sched.run(URL, _ok) == ("page", "ok")
+
+    asyncio.run(main())
+
+
+def test_timeout_cut_by_the_request_deadline_does_not_open_the_breaker():
+    async def main():
+        sched = _scheduler(threshold=1)
+
+        async def slow(_timeout):
+            await asyncio.sleep(1.0)
+            return "page", False, False
+
+        token = deadline.start(0.05)
+        try:
+            assert await sched.run(URL, slow, timeout=5.0) == (None, "deadline")
+            assert deadline.current().cuts == [{"stage": "scrape_fetch", "reason": "timeout"}]
+        finally:
+            deadline.reset(token)
+        state = sched._state(sched.domain_of(URL))
+        assert state.breaker.state == CLOSED and state.breaker.consecutive_failures == 0
+        assert state.stats["deadline_cuts"] == 1 and state.stats["failures"] == 0
+        # Un timeout propio del dominio (sin recorte) si cuenta
+        assert await sched.run(URL, slow, timeout=0.05) == (None, "failed")
+        assert state.breaker.state == OPEN
+
+    asyncio.run(main())
+
+
+def test_background_probe_runs_in_a_clean_context_and_closes():
+    async def main():
+        sched = _scheduler()
+        seen = []
+
+        async def probe(url, _timeout):
+            seen.append((url, deadline.current(), tracing.current()))
+            return "page", False, False
+
+        sched.set_probe(probe)
+        token = deadline.start(30.0)
+        trace_token = tracing.start("tool test", debug=True)
+        try:
+            breaker = await _open(sched)
+        finally:
+            tracing.finish(trace_token)
+            deadline.reset(token)
+        assert breaker.state == OPEN
+        await asyncio.sleep(0.1)
+        assert seen == [(URL, None, None)]
+        assert breaker.state == CLOSED
+
+    asyncio.run(main())
+
+
+def test_background_probe_waits_for_the_probe_holder_then_recovers():
+    async def main():
+        sched = _scheduler()
+        breaker = await _open(sched)  # sin probe configurado: no queda ninguno programado
+        await asyncio.sleep(0.06)
+
+        async def hang(_timeout):
+            await asyncio.sleep(10)
+            return "page", False, False
+
+        holder = asyncio.ensure_future(sched.run(URL, hang))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN
+        probes = []
+
+        async def probe(url, _timeout):
+            probes.append(url)
+            return "page", False, False
+
+        sched.set_probe(probe)
+        state = sched._state(sched.domain_of(URL))
+        sched._schedule_probe(state, 0.0)
+        await asyncio.sleep(0.01)
+        assert probes == [] and state.probe_pending  # hueco ocupado: reprogramado, no descartado
+        holder.cancel()
+        await asyncio.gather(holder, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        assert probes == [URL] and breaker.state == CLOSED
+
+    asyncio.run(main())
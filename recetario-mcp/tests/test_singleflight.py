@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""SingleFlight (app/search/singleflight.py): coalescencia, cancelacion y errores."""
+import asyncio
+
+import pytest
+
+from app.search.singleflight import SingleFlight
+
+
+def _counting(result="r", delay=0.05):
+    calls = {"n": 0, "cancelled": 0}
+
+    async def fn():
+        calls["n"] += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        return result
+
+    return fn, calls
+
+
+def test_identical_calls_share_one_flight():
+    async def main():
+        sf = SingleFlight()
+        fn, calls = _counting()
+        results = await asyncio.gather(*[sf.do("k", fn) for _ in range(5)])
+        assert results == ["r"] * 5
+        assert calls["n"] == 1
+        assert sf.stats["leaders"] == 1 and sf.stats["collapsed"] == 4
+        assert sf.snapshot()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_distinct_keys_do_not_coalesce():
+    async def main():
+        sf = SingleFlight()
+        fn, calls = _counting()
+        await asyncio.gather(sf.do("a", fn), sf.do("b", fn))
+        assert calls["n"] == 2
+        assert sf.stats["collapsed"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        sf = SingleFlight()
+        fn, calls = _counting(delay=0.1)
+        leader = asyncio.ensure_future(sf.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(sf.do("k", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "r"
+        assert calls == {"n": 1, "cancelled": 0}
+        assert sf.stats["cancelled"] == 0
+
+    asyncio.run(main())
+
+
+def test_all_callers_cancelled_cancels_the_flight():
+    async def main():
+        sf = SingleFlight()
+        fn, calls = _counting(delay=1.0)
+        waiters = [asyncio.ensure_future(sf.do("k", fn)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert calls["cancelled"] == 1
+        assert sf.stats["cancelled"] == 1
+        assert sf.snapshot()["in_flight"] == 0
+        # La clave queda libre: la siguiente llamada lanza un vuelo nuevo
+        fn2, calls2 = _counting(delay=0.0)
+        assert await sf.do("k", fn2) == "r"
+        assert calls2["n"] == 1
+
+    asyncio.run(main())
+
+
+def test_caller_arriving_while_the_flight_dies_starts_a_new_one():
+    async def main():
+        sf = SingleFlight()
+        fn, calls = _counting(delay=1.0)
+        waiter = asyncio.ensure_future(sf.do("k", fn))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        # Se encola justo despues de la cancelacion, antes de que la tarea termine de morir
+        fn2, calls2 = _counting(result="nuevo", delay=0.01)
+        newcomer = asyncio.ensure_future(sf.do("k", fn2))
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await newcomer == "nuevo"
+        assert calls["cancelled"] == 1 and calls2["n"] == 1
+        assert sf.stats["leaders"] == 2 and sf.stats["collapsed"] == 0
+        assert sf.snapshot()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_exception_reaches_every_waiter_and_frees_the_key():
+    async def main():
+        sf = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("brave caido")
+
+        results = await asyncio.gather(*[sf.do("k", boom) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert sf.stats["errors"] == 1
+        fn, calls = _counting(delay=0.0)
+        assert await sf.do("k", fn) == "r"
+        assert calls["n"] == 1
+
+    asyncio.run(main())
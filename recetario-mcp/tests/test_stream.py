@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Streaming de prices_search (app/search/prices.py) y su codificacion NDJSON / SSE (app/api/stream.py)."""
+import asyncio
+import json
+
+import pytest
+
+from app.api import stream
+from app.scraping import supermarkets
+from app.search import prices
+
+URLS = ["https://www.walmart.com.mx/ip/huevo/1", "https://www.soriana.com/huevo/2"]
+
+
+@pytest.mark.parametrize("accept, fmt", [
+    ("application/x-ndjson", stream.NDJSON),
+    ("application/jsonl", stream.NDJSON),
+    ("text/event-stream", stream.SSE),
+    ("application/json", None),
+    (None, None),
+])
+def test_stream_format(accept, fmt):
+    assert stream.stream_format(accept) == fmt
+
+
+def test_ndjson_framing():
+    line = stream.encode(stream.NDJSON, "price", {"index": 0, "price": 42.5})
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert json.loads(line) == {"event": "price", "data": {"index": 0, "price": 42.5}}
+
+
+def test_sse_framing():
+    frame = stream.encode(stream.SSE, "done", {"count": 2})
+    head, data = frame.split(b"\n", 1)
+    assert head == b"event: done"
+    assert data.startswith(b"data: ") and data.endswith(b"\n\n")
+    assert json.loads(data[len(b"data: "):]) == {"count": 2}
+
+
+def test_encoded_closes_events():
+    closed = []
+
+    async def events():
+        try:
+            yield "results", {"count": 1}
+            yield "done", {"count": 1}
+        finally:
+            closed.append(True)
+
+    async def collect():
+        return [chunk async for chunk in stream.encoded(stream.NDJSON, events())]
+
+    chunks = asyncio.run(collect())
+    assert [json.loads(c)["event"] for c in chunks] == ["results", "done"]
+    assert closed == [True]
+
+
+def _fake_search(monkeypatch, scrape):
+    async def search(*args, **kwargs):
+        return {"results": [{"title": f"Huevo {i}", "url": u, "snippet": ""} for i, u in enumerate(URLS)]}
+
+    monkeypatch.setattr(prices.provider_search, "search", search)
+    monkeypatch.setattr(supermarkets, "scrape_price", scrape)
+    monkeypatch.setattr(prices.price_history, "record", lambda *a, **k: None)
+
+
+def _events(params):
+    async def collect():
+        return [item async for item in prices.prices_search_events(params)]
+
+    return asyncio.run(collect())
+
+
+def test_failed_scrape_emits_no_price_event(monkeypatch):
+    async def scrape(url, timeout=10):
+        if "soriana" in url:
+            raise RuntimeError("boom")
+        return {"url": url, "store": "Walmart", "price": 39.9, "name": "Huevo 12 pzas", "freshness": "live"}
+
+    _fake_search(monkeypatch, scrape)
+    errors = supermarkets.scrape_stats["errors"]
+    events = _events({"product": "huevo"})
+
+    assert [e for e, _ in events] == ["results", "price", "done"]
+    price = events[1][1]
+    assert price["index"] == 0 and price["url"] == URLS[0] and price["price"] == 39.9
+    done = events[-1][1]
+    failed = done["precios"][1]
+    # La entrada que fallo se queda como resultado de Brave, con su URL
+    assert failed["url"] == URLS[1] and failed["source"] == "brave" and failed["price"] is None
+    assert supermarkets.scrape_stats["errors"] == errors + 1
+
+
+def test_without_scraping_only_results_and_done(monkeypatch):
+    async def scrape(url, timeout=10):
+        raise AssertionError("no deberia scrapear")
+
+    _fake_search(monkeypatch, scrape)
+    events = _events({"product": "huevo", "scraping": False})
+    assert [e for e, _ in events] == ["results", "done"]
+    assert events[-1][1]["count"] == 2
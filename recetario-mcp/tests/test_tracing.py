@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Trazas por peticion (app/tracing.py) y profiler por muestreo (app/profiler.py)."""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app import profiler, tracing
+
+
+def test_no_trace_means_null_span():
+    assert tracing.start("tool x") is None
+    with tracing.span("brave.http") as sp:
+        sp.set(status=200)
+    assert tracing.current() is None and tracing.summary() is None
+
+
+def test_spans_nest_across_tasks():
+    async def fetch(i):
+        with tracing.span("scrape.fetch", i=i):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        token = tracing.start("tool prices", debug=True, tool="prices")
+        try:
+            with tracing.span("scrape") as sp:
+                await asyncio.gather(*[fetch(i) for i in range(3)])
+                sp.set(urls=3)
+            assert tracing.debugging()
+            return tracing.summary()
+        finally:
+            tracing.finish(token)
+
+    out = asyncio.run(run())
+    assert tracing.current() is None
+    root, scrape, *fetches = out["spans"]
+    assert root["parent"] is None and root["attrs"] == {"tool": "prices"}
+    assert scrape["parent"] == root["id"] and scrape["attrs"] == {"urls": 3}
+    assert [f["parent"] for f in fetches] == [scrape["id"]] * 3
+    # by_stage_ms suma los spans de cada etapa (los 3 fetch concurrentes suman mas que el total)
+    assert out["by_stage_ms"]["scrape.fetch"] >= 30 and out["total_ms"] >= 10
+    assert list(out["by_stage_ms"])[0] == "scrape.fetch"
+
+
+def test_nested_start_reuses_active_trace():
+    token = tracing.start("outer", debug=True)
+    try:
+        assert tracing.start("inner", debug=True) is None
+    finally:
+        tracing.finish(token)
+
+
+def test_span_records_error_and_span_cap(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_SPANS", 3)
+    token = tracing.start("root", debug=True)
+    try:
+        with pytest.raises(ValueError):
+            with tracing.span("boom"):
+                raise ValueError("x")
+        for _ in range(3):
+            with tracing.span("extra"):
+                pass
+        out = tracing.summary()
+    finally:
+        tracing.finish(token)
+    assert out["spans"][1]["attrs"] == {"error": "ValueError"}
+    assert len(out["spans"]) == 3 and out["dropped_spans"] == 2
+
+
+def test_otlp_record():
+    token = tracing.start("root", debug=True, n=2, ok=True)
+    try:
+        with tracing.span("child", ratio=0.5, status="ok"):
+            pass
+        trace = tracing.current()
+    finally:
+        tracing.finish(token)
+    scope = trace.otlp()["resourceSpans"][0]["scopeSpans"][0]
+    root, child = scope["spans"]
+    assert child["parentSpanId"] == root["spanId"] and "parentSpanId" not in root
+    assert root["attributes"] == [
+        {"key": "n", "value": {"intValue": "2"}},
+        {"key": "ok", "value": {"boolValue": True}},
+    ]
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+
+
+def test_sampled_trace_is_exported(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(path))
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 1.0)
+    token = tracing.start("tool recipes")
+    assert token is not None and not tracing.debugging()
+    tracing.finish(token)
+    line = json.loads(path.read_text())
+    assert line["spans"][0]["name"] == "tool recipes" and "ts" in line
+
+
+def test_profiler_collects_loop_stacks():
+    def busy_wait():
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+
+    async def run():
+        task = asyncio.ensure_future(profiler.profile(0.2, interval_ms=2, loop_only=True))
+        await asyncio.sleep(0.02)
+        busy_wait()
+        return await task
+
+    text, samples, elapsed = asyncio.run(run())
+    assert samples > 0 and elapsed >= 0.2
+    assert "test_tracing:busy_wait" in text
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in text.splitlines())
+
+
+def test_profiler_single_session():
+    async def run():
+        first = asyncio.ensure_future(profiler.profile(0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(profiler.Busy):
+            await profiler.profile(0.1)
+        await first
+
+    asyncio.run(run())